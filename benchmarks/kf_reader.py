@@ -0,0 +1,86 @@
+"""
+Benchmark for the rkf reader backends in :mod:`tcutility.results.cache`.
+The memory-mapped reader (:class:`MmapKFReader <tcutility.results.cache.MmapKFReader>`) is compared to :class:`plams.KFReader`.
+
+Run using:
+
+.. code-block:: console
+
+    python benchmarks/kf_reader.py path/to/adf.rkf
+"""
+
+import argparse
+import glob
+import os
+import timeit
+
+from scm import plams
+
+from tcutility.results.cache import MmapKFReader
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def largest_fixture() -> str:
+    """Get the largest rkf file stored in the test fixtures."""
+    return max(glob.glob(os.path.join(repo_root, "test", "fixtures", "**", "*.rkf"), recursive=True), key=os.path.getsize)
+
+
+def largest_variable(path: str):
+    """Get the section and name of the longest numeric variable in an rkf file."""
+    reader = plams.KFReader(path)
+    variables = [(section, variable) for section, variable in reader if reader.variable_type(section, variable) != 3]
+    return max(variables, key=lambda var: reader._sections[var[0]][var[1]][3])
+
+
+def open_and_index(cls, path, var):
+    reader = cls(path)
+    reader.read("General", "termination status")
+
+
+def read_everything(cls, path, var):
+    reader = cls(path)
+    for section, variable in reader:
+        reader.read(section, variable)
+
+
+def read_largest(cls, path, var):
+    reader = cls(path)
+    for _ in range(10):
+        reader.read(*var)
+
+
+def read_largest_array(cls, path, var):
+    reader = cls(path)
+    for _ in range(10):
+        reader.read_array(*var) if hasattr(reader, "read_array") else reader.read(*var)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", default=None, help="rkf file to read. Defaults to the largest rkf file in the test fixtures.")
+    parser.add_argument("--number", type=int, default=10, help="number of times to run each benchmark.")
+    args = parser.parse_args()
+
+    path = args.path or largest_fixture()
+    var = largest_variable(path)
+    print(f"Reading {path} ({os.path.getsize(path) / 1024**2:.1f} MB), largest variable is {var[0]}%{var[1]}")
+
+    classes = {"plams": plams.KFReader, "mmap": MmapKFReader}
+    benchmarks = {
+        "open and index": open_and_index,
+        "read all variables": read_everything,
+        "read largest variable": read_largest,
+        "read largest as array": read_largest_array,
+    }
+
+    print(f"{'benchmark':<25}{'plams (ms)':>15}{'mmap (ms)':>15}{'speedup':>10}")
+    for name, func in benchmarks.items():
+        timings = []
+        for cls in classes.values():
+            timings.append(timeit.timeit(lambda: func(cls, path, var), number=args.number) / args.number * 1000)
+        print(f"{name:<25}{timings[0]:>15.3f}{timings[1]:>15.3f}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
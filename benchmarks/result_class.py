@@ -0,0 +1,93 @@
+"""
+Benchmark for the :class:`Result <tcutility.results.result.Result>` class.
+The current implementation is compared to the implementation of Result in a git revision,
+which should be a revision from before the case-insensitive key index was added to Result.
+
+Run using:
+
+.. code-block:: console
+
+    python benchmarks/result_class.py --reference <revision>
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import tempfile
+import timeit
+
+from tcutility.results.result import Result
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_reference(revision: str):
+    """Load the Result class as it was implemented in a git revision."""
+    source = subprocess.check_output(["git", "show", f"{revision}:src/tcutility/results/result.py"], cwd=repo_root)
+    with open(os.path.join(repo_root, "src", "tcutility", "results", "result.py"), "rb") as file:
+        if file.read() == source:
+            raise SystemExit(f"Result is implemented the same in {revision} and the working tree, please use an older revision as the reference.")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "reference_result.py")
+        with open(path, "wb") as file:
+            file.write(source)
+
+        spec = importlib.util.spec_from_file_location("reference_result", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module.Result
+
+
+def make_data(width: int = 10, depth: int = 3) -> dict:
+    """Build a nested dictionary with ``width`` keys on each of ``depth`` levels."""
+    if depth == 0:
+        return 1
+    return {f"Key{i}": make_data(width, depth - 1) for i in range(width)}
+
+
+def attribute_access(cls, res):
+    for i in range(10):
+        res.key5.KEY3[f"key{i}"]
+
+
+def missing_access(cls, res):
+    res = cls()
+    for i in range(50):
+        res.properties.energy[f"term{i}"].value = i
+
+
+def nested_construction(cls, res):
+    cls(make_data())
+
+
+def multi_keys(cls, res):
+    res.multi_keys()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reference", required=True, help="git revision containing the reference implementation.")
+    parser.add_argument("--number", type=int, default=100, help="number of times to run each benchmark.")
+    args = parser.parse_args()
+
+    classes = {args.reference: load_reference(args.reference), "current": Result}
+    benchmarks = {
+        "attribute access": attribute_access,
+        "creating missing keys": missing_access,
+        "nested construction": nested_construction,
+        "multi_keys": multi_keys,
+    }
+
+    print(f"{'benchmark':<25}{args.reference + ' (ms)':>15}{'current (ms)':>15}{'speedup':>10}")
+    for name, func in benchmarks.items():
+        timings = []
+        for cls in classes.values():
+            res = cls(make_data())
+            timings.append(timeit.timeit(lambda: func(cls, res), number=args.number) / args.number * 1000)
+        print(f"{name:<25}{timings[0]:>15.3f}{timings[1]:>15.3f}{timings[0] / timings[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark for calculating all-pairs RMSD matrices of sets of structures, like comparing frames of a trajectory or conformers.
+:func:`tcutility.geometry.RMSD_matrix` is compared to calling :func:`tcutility.geometry.RMSD` for every pair of structures.
+
+Run using:
+
+.. code-block:: console
+
+    python benchmarks/rmsd.py --structures 500 --atoms 30 --workers 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tcutility import geometry
+
+
+def pairwise(X: np.ndarray) -> np.ndarray:
+    return np.array([[geometry.RMSD(x, y) for y in X] for x in X])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--structures", type=int, default=500, help="number of structures to compare.")
+    parser.add_argument("--atoms", type=int, default=30, help="number of atoms in each structure.")
+    parser.add_argument("--workers", type=int, default=4, help="number of processes used by the batched implementation.")
+    parser.add_argument("--pairwise-structures", type=int, default=100, help="number of structures used for the (slow) pairwise reference.")
+    args = parser.parse_args()
+
+    X = np.random.rand(args.structures, args.atoms, 3) * 5
+
+    # the pairwise implementation is too slow for large sets, so we time it on a subset and scale to the number of pairs
+    n = min(args.structures, args.pairwise_structures)
+    start = time.perf_counter()
+    reference = pairwise(X[:n])
+    pairwise_rate = n**2 / (time.perf_counter() - start)
+    assert np.allclose(geometry.RMSD_matrix(X[:n]), reference, atol=1e-5)
+
+    print(f"{'implementation':<30}{'pairs/s':>15}")
+    print(f"{'RMSD (pairwise)':<30}{pairwise_rate:>15.0f}")
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        geometry.RMSD_matrix(X, workers=workers, chunk_size=20_000)
+        rate = args.structures**2 / (time.perf_counter() - start)
+        print(f"{f'RMSD_matrix (workers={workers})':<30}{rate:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
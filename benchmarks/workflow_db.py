@@ -0,0 +1,110 @@
+"""
+Benchmark for the throughput of :func:`tcutility.job.workflow_db.update` when many processes write to the workflow database at the same time,
+like running workflows that report their stage and status.
+The current implementation is compared to the csv based implementation of the workflow database in a git revision,
+which should be a revision from before the workflow database was moved to SQLite.
+
+Run using:
+
+.. code-block:: console
+
+    python benchmarks/workflow_db.py --reference <revision> --workers 8
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def reference_source(revision: str) -> bytes:
+    """Get the source of the workflow database module in a git revision and check that it is the csv based implementation."""
+    source = subprocess.check_output(["git", "show", f"{revision}:src/tcutility/job/workflow_db.py"], cwd=repo_root)
+    # the csv based implementation locks the database file using DBPATH_LOCK
+    if b"DBPATH_LOCK" not in source:
+        raise SystemExit(f"The workflow database in {revision} is not the csv based implementation, please use an older revision as the reference.")
+    return source
+
+
+def load_module(revision: str, tmpdir: str):
+    """Load the workflow database module as it was implemented in a git revision, or the current module if no revision is given.
+    The database is stored in ``tmpdir``."""
+    if revision is None:
+        from tcutility.job import workflow_db
+
+        workflow_db.DBPATH = os.path.join(tmpdir, "workflows.sqlite")
+        workflow_db.CSV_DBPATH = os.path.join(tmpdir, "workflows.csv")
+        return workflow_db
+
+    source = reference_source(revision)
+    path = os.path.join(tmpdir, "reference_workflow_db.py")
+    with open(path, "wb") as file:
+        file.write(source)
+
+    spec = importlib.util.spec_from_file_location("reference_workflow_db", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # the csv based implementation stores its path and lock in module variables
+    from filelock import FileLock
+
+    module.DBPATH = os.path.join(tmpdir, "workflows.csv")
+    module.DBPATH_LOCK = FileLock(module.DBPATH + ".lock")
+    open(module.DBPATH, "a").close()
+    return module
+
+
+def writer(revision: str, tmpdir: str, worker: int, workflows: int, updates: int):
+    """Write ``workflows`` records and update each of them ``updates`` times."""
+    workflow_db = load_module(revision, tmpdir)
+    for i in range(workflows):
+        workflow_db.write(f"{worker}-{i}", workflow_name="benchmark", status="PENDING")
+    for step in range(updates):
+        for i in range(workflows):
+            workflow_db.update(f"{worker}-{i}", stage=f"step {step}", status="RUNNING")
+
+
+def run(revision: str, workers: int, workflows: int, updates: int) -> float:
+    """Run the writers in separate processes and return the number of updates per second."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # load the module once, so that the database is created before the writers start
+        load_module(revision, tmpdir)
+        processes = [multiprocessing.Process(target=writer, args=(revision, tmpdir, worker, workflows, updates)) for worker in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        duration = time.perf_counter() - start
+
+        # check that no records were lost
+        records = load_module(revision, tmpdir).read_all()
+        if len(records) != workers * workflows:
+            print(f"WARNING: expected {workers * workflows} records, found {len(records)}")
+
+    return workers * workflows * updates / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reference", required=True, help="git revision containing the csv based implementation.")
+    parser.add_argument("--workers", type=int, default=8, help="number of processes writing at the same time.")
+    parser.add_argument("--workflows", type=int, default=50, help="number of workflows written by each process.")
+    parser.add_argument("--updates", type=int, default=5, help="number of times each workflow is updated.")
+    args = parser.parse_args()
+    reference_source(args.reference)
+
+    print(f"{'workers':<10}{args.reference + ' (updates/s)':>25}{'current (updates/s)':>25}{'speedup':>10}")
+    for workers in sorted({1, args.workers}):
+        reference = run(args.reference, workers, args.workflows, args.updates)
+        current = run(None, workers, args.workflows, args.updates)
+        print(f"{workers:<10}{reference:>25.0f}{current:>25.0f}{current / reference:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,10 +20,11 @@ from tcutility.job.crest import CRESTJob, QCGJob
 from tcutility.job.dftb import DFTBJob
 from tcutility.job.nmr import NMRJob
 from tcutility.job.orca import ORCAJob
+from tcutility.job.queue import JobQueue
 from tcutility.job.xtb import XTBJob
 from tcutility.molecule import from_string, guess_fragments, load, number_of_electrons, save, write_mol_to_amv_file, write_mol_to_xyz_file
 # from tcutility.report.report import SI
-from tcutility.results.read import get_info, quick_status, read
+from tcutility.results.read import get_info, quick_status, quick_status_many, read
 from tcutility.results.result import Result
 from tcutility.timer import timer
 
@@ -38,6 +39,7 @@ __all__ = [
     "NMRJob",
     "ORCAJob",
     "XTBJob",
+    "JobQueue",
     "log",
     "from_string",
     "guess_fragments",
@@ -48,6 +50,7 @@ __all__ = [
     "write_mol_to_xyz_file",
     "get_info",
     "quick_status",
+    "quick_status_many",
     "read",
     "Result",
     "timer",
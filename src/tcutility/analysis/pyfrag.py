@@ -8,7 +8,7 @@ import tcutility
 from tcutility.cache import cache
 from tcutility.environment import requires_optional_package
 from tcutility.geometry import parameter
-from tcutility.pathfunc import match
+from tcutility.pathfunc import iter_match
 
 
 def get_pyfrag_results(path):
@@ -30,17 +30,23 @@ class PyFragResult:
         self._load()
 
     def _load(self):
-        for frag_path, info in tcutility.log.loadbar(match(self.path, "frag_{frag}").items()):
+        # the calculations are read while the remaining directories are still being scanned
+        for frag_path, info in tcutility.log.loadbar(iter_match(self.path, "frag_{frag}")):
             self._frag_results[info.frag] = tcutility.read(frag_path)
 
-        for step_path, info in tcutility.log.loadbar(match(self.path, self.step_prefix + "{step}", sort_by="step").items()):
-            self._step_results.append({})
+        steps = []
+        for step_path, info in tcutility.log.loadbar(iter_match(self.path, self.step_prefix + "{step}")):
+            step_results = {}
             for dir_name in os.listdir(step_path):
                 p = os.path.join(step_path, dir_name)
                 res = tcutility.read(p)
-                self._step_results[-1][dir_name] = res
+                step_results[dir_name] = res
+            steps.append((info.step, step_results))
 
-            self._order.append(int(info.step.removeprefix("0")))
+        # the steps are found in arbitrary order, so we sort them afterwards
+        for step, step_results in sorted(steps, key=lambda x: x[0]):
+            self._step_results.append(step_results)
+            self._order.append(int(step.removeprefix("0")))
             self._mask.append(True)
 
         self._mask = np.array(self._mask)
@@ -4,6 +4,7 @@ from typing import List, Tuple, Union
 import numpy as np
 from scm.plams import Molecule
 
+from tcutility import geometry
 from tcutility.log import log
 from tcutility.results.read import read
 from tcutility.results.result import Result
@@ -44,7 +45,9 @@ def _concatenate_irc_trajectories_by_rmsd(irc_trajectories: List[List[Molecule]]
 
     for traj_index in range(len(irc_trajectories) - 1):
         # Calculate RMSD values of two connected trajectories to compare the connection points / molecules
-        rmsd_matrix = np.array([[Molecule.rmsd(irc_trajectories[traj_index][i], irc_trajectories[traj_index + 1][j]) for j in [0, -1]] for i in [0, -1]])
+        ends = [irc_trajectories[traj_index][i].as_array() for i in [0, -1]]
+        next_ends = [irc_trajectories[traj_index + 1][j].as_array() for j in [0, -1]]
+        rmsd_matrix = geometry.RMSD_matrix(ends, next_ends)
 
         # Flatten the matrix and find the index of the minimum value
         lowest_index = np.argmin(rmsd_matrix.flatten())
@@ -1,20 +1,14 @@
+import glob
 from pprint import pprint
 from typing import List
 
 import click
 
-from tcutility.results.read import read
+from tcutility.results.read import read_many
+from tcutility.results.result import Result
 
 
-@click.command("read")
-@click.option("-s", "--status", is_flag=True, help="Shortcut to only print the status of the calculation.")
-@click.option("-p", "--properties", is_flag=True, help="Shortcut to only print calculated properties for the calculation.")
-@click.argument("workdir")
-@click.argument("keys", nargs=-1)
-def read_results(status: bool, properties: bool, workdir: str, keys: List[str]):
-    """Read results from a calculation."""
-    res = read(workdir)
-
+def _print_result(res: Result, status: bool, properties: bool, keys: List[str]):
     if status:
         print(res.status.name)  # type: ignore # status is a str
         return
@@ -32,3 +26,25 @@ def read_results(status: bool, properties: bool, workdir: str, keys: List[str]):
         return
 
     pprint(res)
+
+
+@click.command("read")
+@click.option("-s", "--status", is_flag=True, help="Shortcut to only print the status of the calculation.")
+@click.option("-p", "--properties", is_flag=True, help="Shortcut to only print calculated properties for the calculation.")
+@click.option("-j", "--jobs", type=int, default=1, show_default=True, help="Number of processes used to read calculations. Useful when WORKDIR is a glob pattern matching many calculations.")
+@click.argument("workdir")
+@click.argument("keys", nargs=-1)
+def read_results(status: bool, properties: bool, jobs: int, workdir: str, keys: List[str]):
+    """Read results from a calculation.
+
+    WORKDIR may also be a glob pattern (e.g. "calculations/*"), in which case every matching calculation is read and its results are printed after its path.
+    """
+    # a single directory is read and printed as-is
+    if not glob.has_magic(workdir):
+        for _, res in read_many([workdir], workers=1):
+            _print_result(res, status, properties, keys)
+        return
+
+    for calc_dir, res in read_many(sorted(glob.glob(workdir)), workers=jobs):
+        print(f"{calc_dir}:", end=" " if status or len(keys) == 1 else "\n")
+        _print_result(res, status, properties, keys)
@@ -5,6 +5,7 @@ from tcutility.cli_scripts.geo import calculate_geometry_parameter
 from tcutility.cli_scripts.job_script import optimize_geometry
 from tcutility.cli_scripts.read import read_results
 from tcutility.cli_scripts.resize_figures import resize
+from tcutility.cli_scripts.trim import trim_calculations
 from tcutility.cli_scripts.workflow import workflow
 
 
@@ -21,3 +22,4 @@ tcutility.add_command(calculate_geometry_parameter)
 tcutility.add_command(concatenate_irc_paths)
 tcutility.add_command(resize)
 tcutility.add_command(workflow)
+tcutility.add_command(trim_calculations)
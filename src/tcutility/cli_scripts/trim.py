@@ -0,0 +1,35 @@
+"""Module containing CLI functionality for trimming rkf files"""
+
+import os
+from typing import List, Optional
+
+import click
+
+from tcutility.results import trim
+
+
+@click.command("trim")
+@click.option("-r", "--reference", "references", multiple=True, type=click.Path(exists=True), help="Representative calculation used to determine which variables are accessed. Can be given multiple times.")
+@click.option("-l", "--log", "log_paths", multiple=True, type=click.Path(exists=True), help="Access log written by an earlier run using ``--save-log``. Can be given multiple times.")
+@click.option("--save-log", type=click.Path(), default=None, help="Write the access log to this JSON file, so that it can be reused.")
+@click.option("-o", "--output", type=click.Path(), default="trimmed", show_default=True, help="Directory to write the trimmed calculations to.")
+@click.argument("calc_dirs", nargs=-1, type=click.Path(exists=True))
+def trim_calculations(references: List[str], log_paths: List[str], save_log: Optional[str], output: str, calc_dirs: List[str]):
+    """Write slim copies of calculations, where the rkf files only contain the variables that are actually read.
+
+    The variables are determined by reading the representative calculations given using ``--reference`` and/or loaded from access logs given using ``--log``.
+    If neither is given, the variables accessed when reading CALC_DIRS are kept.
+    Each calculation in CALC_DIRS is copied to the output directory, with its rkf files replaced by trimmed copies.
+    """
+    logs = [trim.load_access_log(path) for path in log_paths]
+    if references or not logs:
+        logs.append(trim.collect_accessed_variables(references or calc_dirs))
+    log = trim.merge_access_logs(*logs)
+
+    if save_log:
+        trim.save_access_log(log, save_log)
+
+    for calc_dir in calc_dirs:
+        res = trim.trim_directory(calc_dir, os.path.join(output, os.path.basename(os.path.abspath(calc_dir))), log)
+        reduction = 1 - res.trimmed_size / res.original_size if res.original_size else 0
+        print(f"{calc_dir}: {res.original_size / 1024**2:.1f} MB -> {res.trimmed_size / 1024**2:.1f} MB ({reduction:.0%} smaller)")
@@ -1,11 +1,18 @@
 import atexit
+import concurrent.futures
+import fnmatch
+import hashlib
 import os
 import platform
+import shlex
 import shutil
 import subprocess as sp
+import tarfile
+import threading
 import uuid
 from datetime import datetime
 from enum import Enum, auto
+from typing import IO, Dict, List, Tuple, Union
 
 from tcutility import environment, log
 import tcutility.cache as cache
@@ -24,6 +31,240 @@ class OSName(Enum):
 
 _open_connections = []
 
+# whether commands are run using a single long-lived shell for each server, see :class:`Shell`
+# if disabled, every command opens a new channel to the server
+use_persistent_shell = True
+
+# sessions shared by all connections to the same server, indexed by the username, server address and key file, see :class:`_Session`
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class Shell:
+    """
+    Long-lived shell that runs the commands written to its standard input. Running commands in an open shell avoids
+    opening a new channel for every command, and many commands can be sent at once and read back in a single round-trip (see :meth:`run_many`).
+
+    Every command is run in a subshell with its standard input redirected from ``/dev/null``, so that commands such as ``cd`` and ``exit`` do not affect the shell
+    and commands cannot read the commands that follow them. The outputs of the commands are separated by a random marker.
+
+    Args:
+        stdin: the standard input of the shell, commands are written to this file.
+        stdout: the standard output of the shell.
+    """
+
+    def __init__(self, stdin: IO, stdout: IO):
+        self.stdin = stdin
+        self.stdout = stdout
+        self.marker = f"TCUTILITY_{uuid.uuid4().hex}"
+        self._lock = threading.Lock()
+        # the standard error of each command is written to a temporary file and printed after its output
+        self._write('_tcutility_stderr=$(mktemp)\n')
+
+    def _write(self, script: str):
+        self.stdin.write(script)
+        self.stdin.flush()
+
+    def _script(self, command: str, directory: str = None) -> str:
+        cd = f"cd {directory}; " if directory else ""
+        script = f"({cd}{command}\n) < /dev/null 2> $_tcutility_stderr\n"
+        script += f"printf '\\n{self.marker} %d\\n' $?\n"
+        script += f"cat $_tcutility_stderr; printf '\\n{self.marker}\\n'\n"
+        return script
+
+    def _read_until_marker(self) -> Tuple[str, str]:
+        """Read lines until the marker is found. Returns the lines that were read, without the newline added before the marker, and the line containing the marker."""
+        lines = []
+        while True:
+            line = self.stdout.readline()
+            if isinstance(line, bytes):
+                line = line.decode()
+            if not line:
+                raise ConnectionError("The shell was closed.")
+            if line.startswith(self.marker):
+                return "".join(lines)[:-1], line.strip()
+            lines.append(line)
+
+    def run_many(self, commands: List[str], directory: str = None) -> List[Tuple[str, str, int]]:
+        """
+        Run commands in the shell. All commands are sent at once, before reading their outputs.
+
+        Args:
+            commands: the commands to run.
+            directory: the directory to run the commands in.
+
+        Returns:
+            A list containing the standard output, standard error and exit code of each command.
+        """
+        script = "".join(self._script(command, directory) for command in commands)
+        with self._lock:
+            # the script is written while reading the outputs, otherwise the shell could block on writing output that we are not reading yet
+            writer = threading.Thread(target=self._write, args=(script,), daemon=True)
+            writer.start()
+            outputs = []
+            for _ in commands:
+                stdout, marker = self._read_until_marker()
+                stderr, _ = self._read_until_marker()
+                outputs.append((stdout, stderr, int(marker.split()[1])))
+            writer.join()
+            return outputs
+
+    def run(self, command: str, directory: str = None) -> Tuple[str, str, int]:
+        """Run a single command in the shell, see :meth:`run_many`."""
+        return self.run_many([command], directory)[0]
+
+    def close(self):
+        try:
+            self._write("rm -f $_tcutility_stderr; exit\n")
+        except (OSError, EOFError):
+            pass
+
+
+def _matches(path: str, include: List[str] = None, exclude: List[str] = None) -> bool:
+    """Check whether a relative file path is selected by include and exclude patterns. Patterns are matched against the relative path and against the file name."""
+    def match(patterns):
+        return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(os.path.basename(path), pattern) for pattern in patterns)
+
+    if include and not match(include):
+        return False
+    return not (exclude and match(exclude))
+
+
+def _list_local_files(root: str) -> Dict[str, Tuple[int, float]]:
+    """List the files below a local directory, together with their sizes and modification times. The paths are relative to the directory."""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            files[os.path.relpath(path, root).replace(os.sep, "/")] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def _local_checksum(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def _select_changed(source: Dict[str, Tuple[int, float]], target: Dict[str, Tuple[int, float]], check: str, checksums) -> List[str]:
+    """
+    Select the source files that differ from the target files.
+
+    Args:
+        source: the sizes and modification times of the source files.
+        target: the sizes and modification times of the target files.
+        check: how to check whether a file changed. ``"mtime"`` compares sizes and modification times, ``"checksum"`` compares sizes and MD5 checksums
+            and ``None`` transfers all files.
+        checksums: function that returns the source and target checksums of a list of files.
+    """
+    if check is None:
+        return list(source)
+    if check not in ["mtime", "checksum"]:
+        raise ValueError(f'check must be one of ("mtime", "checksum", None), not {check}')
+
+    # files with a different size always changed
+    changed = [path for path in source if path not in target or source[path][0] != target[path][0]]
+    candidates = [path for path in source if path in target and source[path][0] == target[path][0]]
+    if check == "mtime":
+        # tar only stores whole seconds, so we only compare whole seconds
+        changed.extend(path for path in candidates if int(source[path][1]) != int(target[path][1]))
+    elif candidates:
+        source_checksums, target_checksums = checksums(candidates)
+        changed.extend(path for path in candidates if source_checksums.get(path) != target_checksums.get(path))
+    return sorted(changed)
+
+
+def _split_transfers(paths: List[str], sizes: Dict[str, Tuple[int, float]], workers: int) -> List[List[str]]:
+    """Divide files into at most ``workers`` groups of roughly the same total size."""
+    groups = [[] for _ in range(max(1, min(workers, len(paths))))]
+    totals = [0] * len(groups)
+    for path in sorted(paths, key=lambda path: sizes[path][0], reverse=True):
+        i = totals.index(min(totals))
+        groups[i].append(path)
+        totals[i] += sizes[path][0]
+    return [group for group in groups if group]
+
+
+def _extract(tar: tarfile.TarFile, path: str):
+    # only extract regular files and directories inside the target directory when supported by this Python version
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(path, filter="data")
+    else:
+        tar.extractall(path)
+
+
+def _transfer_result(transferred: List[str], files: Dict[str, Tuple[int, float]]) -> "results.Result":
+    ret = results.Result()
+    ret.transferred = transferred
+    ret.skipped = len(files) - len(transferred)
+    ret.bytes = sum(files[path][0] for path in transferred)
+    return ret
+
+
+def _copy_tree(source: str, target: str, include: List[str] = None, exclude: List[str] = None, workers: int = 4, check: str = "mtime") -> "results.Result":
+    """Copy the files below a local directory to another local directory, see :meth:`Connection.download_tree`."""
+    source_files = {path: stat for path, stat in _list_local_files(source).items() if _matches(path, include, exclude)}
+    target_files = _list_local_files(target) if os.path.exists(target) else {}
+
+    def checksums(paths):
+        return {path: _local_checksum(os.path.join(source, path)) for path in paths}, {path: _local_checksum(os.path.join(target, path)) for path in paths}
+
+    changed = _select_changed(source_files, target_files, check, checksums)
+
+    def copy(path):
+        os.makedirs(os.path.dirname(os.path.join(target, path)), exist_ok=True)
+        shutil.copy2(os.path.join(source, path), os.path.join(target, path))
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        list(executor.map(copy, changed))
+    return _transfer_result(changed, source_files)
+
+
+class _Session:
+    """
+    SSH connection to a server that is shared by all :class:`Connection` objects for that server.
+    The SFTP session and the shell are opened the first time they are needed and are kept open until the last connection is closed.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.refcount = 0
+        self.home = client.exec_command("pwd")[1].read().decode().strip()
+        self._sftp = None
+        self._shell = None
+        self.lock = threading.RLock()
+
+    @property
+    def sftp(self):
+        with self.lock:
+            if self._sftp is None:
+                self._sftp = self.client.open_sftp()
+            return self._sftp
+
+    @property
+    def shell(self) -> Shell:
+        with self.lock:
+            if self._shell is None:
+                stdin, stdout, _ = self.client.exec_command("bash -s")
+                # functions and variables defined in the bashrc, such as the module command, should be available to the commands
+                stdin.write("[ -f ~/.bashrc ] && . ~/.bashrc < /dev/null > /dev/null 2>&1\n")
+                self._shell = Shell(stdin, stdout)
+            return self._shell
+
+    def reset_shell(self):
+        with self.lock:
+            self._shell = None
+
+    def close(self):
+        if self._shell is not None:
+            self._shell.close()
+        if self._sftp is not None:
+            self._sftp.close()
+        self.client.close()
+
 
 class Connection:
     """
@@ -77,13 +318,22 @@ class Connection:
     def __enter__(self):
         import paramiko
 
-        log.debug(f"{self}: opening connection ...")
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.client.connect(self.server, username=self.username, key_filename=self.key_filename)
-        log.debug(f"{self}: connection opened!")
+        # connections to the same server share a single SSH session
+        key = (self.username, self.server, self.key_filename)
+        with _sessions_lock:
+            if key not in _sessions:
+                log.debug(f"{self}: opening connection ...")
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                client.connect(self.server, username=self.username, key_filename=self.key_filename)
+                _sessions[key] = _Session(client)
+                log.debug(f"{self}: connection opened!")
+            self._session = _sessions[key]
+            self._session.refcount += 1
+
+        self.client = self._session.client
         # store the home directory so we can use it later to get absolute paths
-        self.home = self.client.exec_command("pwd")[1].read().decode().strip()
+        self.home = self._session.home
         self.currdir = self.home
         _open_connections.append(self)
         return self
@@ -93,7 +343,13 @@ class Connection:
 
     def __exit__(self, *args, **kwargs):
         _open_connections.remove(self)
-        self.client.close()
+        key = (self.username, self.server, self.key_filename)
+        with _sessions_lock:
+            self._session.refcount -= 1
+            if self._session.refcount > 0:
+                return
+            _sessions.pop(key, None)
+        self._session.close()
         log.debug(f"{self}: connection closed.")
 
     def __repr__(self):
@@ -120,15 +376,50 @@ class Connection:
         .. note::
             The ``__call__`` method redirects to this method. This means you can directly call the ``Connection`` object with your command.
         """
-        log.debug(f"{self}[{self.currdir}]: {command}")
-        command = f"cd {self.currdir}; {command}"
-        _, stdout, stderr = self.client.exec_command(command)
-        stdout = stdout.read().decode()
-        stderr = stderr.read().decode()
-        if stderr:
-            print(RuntimeError(stderr))
+        return self.execute_many([command])[0]
 
-        return stdout.strip()
+    def execute_many(self, commands: List[str]) -> List[str]:
+        """
+        Run many commands on the server and return their outputs. The commands are sent to the server together and their outputs are read back in a single round-trip.
+
+        Args:
+            commands: the commands to run on the server.
+
+        Returns:
+            A list containing the data written in ``stdout`` by each command.
+        """
+        for command in commands:
+            log.debug(f"{self}[{self.currdir}]: {command}")
+
+        shell = None
+        if use_persistent_shell:
+            try:
+                shell = self._session.shell
+            except Exception as exp:
+                log.debug(f"{self}: could not open a shell, running commands separately ({exp})")
+
+        if shell is not None:
+            try:
+                outputs = shell.run_many(commands, directory=self.currdir)
+            except (ConnectionError, OSError, EOFError):
+                # the shell was closed, for example because the connection was interrupted, so we open a new one the next time
+                self._session.reset_shell()
+                raise
+
+            for stdout, stderr, _ in outputs:
+                if stderr:
+                    print(RuntimeError(stderr))
+            return [stdout.strip() for stdout, _, _ in outputs]
+
+        outputs = []
+        for command in commands:
+            _, stdout, stderr = self.client.exec_command(f"cd {self.currdir}; {command}")
+            stdout = stdout.read().decode()
+            stderr = stderr.read().decode()
+            if stderr:
+                print(RuntimeError(stderr))
+            outputs.append(stdout.strip())
+        return outputs
 
     def __call__(self, *args, **kwargs):
         return self.execute(*args, **kwargs)
@@ -227,8 +518,9 @@ class Connection:
         server_path = os.path.normpath(self.full_path(server_path))
 
         log.debug(f"{self}: download {server_path} {local_path}")
-        with self.client.open_sftp() as sftp:
-            sftp.get(server_path, local_path)
+        # the SFTP session is kept open and shared by all connections to this server
+        with self._session.lock:
+            self._session.sftp.get(server_path, local_path)
         log.debug(f"{self}: download completed!")
 
     def upload(self, local_path: str, server_path: str = None):
@@ -248,9 +540,139 @@ class Connection:
         server_path = os.path.normpath(server_path)
 
         log.debug(f"{self}: upload {local_path} {server_path}")
-        with self.client.open_sftp() as sftp:
-            sftp.put(local_path, server_path)
+        with self._session.lock:
+            self._session.sftp.put(local_path, server_path)
+        log.debug(f"{self}: upload completed!")
+
+    def _remote_path(self, path: str) -> str:
+        return os.path.normpath(self.full_path(path.replace("~", self.home)))
+
+    def _exec_with_input(self, command: str, data: bytes):
+        """Open a new channel running a command and write data to its standard input in a separate thread, so that its output can be read at the same time."""
+        stdin, stdout, stderr = self.client.exec_command(command)
+
+        def write():
+            # if the command exits before reading all input, the error can be read from its standard error
+            try:
+                stdin.write(data)
+                stdin.close()
+            except OSError:
+                pass
+
+        threading.Thread(target=write, daemon=True).start()
+        return stdout, stderr
+
+    def _list_files(self, root: str) -> Dict[str, Tuple[int, float]]:
+        """List the files below a directory on the server, together with their sizes and modification times. The paths are relative to the directory."""
+        files = {}
+        for line in self.execute(f"find {shlex.quote(root)} -type f -printf '%P\\t%s\\t%T@\\n' 2> /dev/null").splitlines():
+            path, size, mtime = line.rsplit("\t", 2)
+            files[path] = (int(size), float(mtime))
+        return files
+
+    def _checksums(self, root: str, paths: List[str]) -> Dict[str, str]:
+        """Calculate the MD5 checksums of files below a directory on the server."""
+        stdout, _ = self._exec_with_input(f"cd {shlex.quote(root)} && xargs -0 md5sum --", "\0".join(paths).encode())
+        checksums = {}
+        for line in stdout.read().decode().splitlines():
+            checksum, path = line.split("  ", 1)
+            checksums[path] = checksum
+        return checksums
+
+    def download_tree(self, server_path: str, local_path: str, include: List[str] = None, exclude: List[str] = None, compress: bool = False, workers: int = 4, check: Union[str, None] = "mtime") -> results.Result:
+        """
+        Download a directory from the server. Instead of transferring the files one at a time, the files are packed using ``tar`` on the server and streamed to your local machine.
+        Files are divided over multiple streams that are transferred in parallel. Files that did not change since they were last downloaded are skipped.
+
+        Args:
+            server_path: the path on the server to the directory to download. The path is relative to the current directory.
+            local_path: the path on the local machine where the files are stored.
+            include: glob patterns of files to download, e.g. ``["adf.rkf", "ams.log"]``. Patterns are matched against the file names and against the paths relative to ``server_path``.
+                By default all files are downloaded.
+            exclude: glob patterns of files that should not be downloaded.
+            compress: whether to compress the streams using gzip. This is useful for slow connections, but costs time on fast connections.
+            workers: the number of streams to transfer in parallel.
+            check: how to check whether a file changed. ``"mtime"`` compares the sizes and modification times of the files,
+                ``"checksum"`` compares the sizes and MD5 checksums of the files and ``None`` downloads all files.
+
+        Returns:
+            :Result object containing information about the download:
+
+                - **transferred (list[str])** – the paths of the downloaded files, relative to ``server_path``.
+                - **skipped (int)** – the number of files that were skipped because they did not change.
+                - **bytes (int)** – the total size of the downloaded files.
+
+        Example:
+            .. code-block:: python
+
+                with Snellius() as server:
+                    server.download_tree("calculations", "calculations", include=["adf.rkf", "ams.log"])
+        """
+        root = self._remote_path(server_path)
+        remote_files = {path: stat for path, stat in self._list_files(root).items() if _matches(path, include, exclude)}
+        local_files = _list_local_files(local_path) if os.path.exists(local_path) else {}
+
+        def checksums(paths):
+            return self._checksums(root, paths), {path: _local_checksum(os.path.join(local_path, path)) for path in paths}
+
+        changed = _select_changed(remote_files, local_files, check, checksums)
+        log.debug(f"{self}: download {len(changed)}/{len(remote_files)} files from {root} to {local_path}")
+        os.makedirs(local_path, exist_ok=True)
+
+        def transfer(paths):
+            stdout, stderr = self._exec_with_input(f"cd {shlex.quote(root)} && tar -c{'z' if compress else ''}f - --null -T -", "\0".join(paths).encode())
+            with tarfile.open(fileobj=stdout, mode="r|gz" if compress else "r|") as tar:
+                _extract(tar, local_path)
+            errors = stderr.read().decode()
+            if errors:
+                log.warn(f"{self}: error while downloading from {root}: {errors}")
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            list(executor.map(transfer, _split_transfers(changed, remote_files, workers)))
+        log.debug(f"{self}: download completed!")
+        return _transfer_result(changed, remote_files)
+
+    def upload_tree(self, local_path: str, server_path: str, include: List[str] = None, exclude: List[str] = None, compress: bool = False, workers: int = 4, check: Union[str, None] = "mtime") -> results.Result:
+        """
+        Upload a directory to the server. The files are packed using ``tar`` and streamed to the server, see :meth:`download_tree`.
+
+        Args:
+            local_path: the path on the local machine to the directory to upload.
+            server_path: the path on the server where the files are stored. The path is relative to the current directory.
+            include: glob patterns of files to upload. Patterns are matched against the file names and against the paths relative to ``local_path``.
+            exclude: glob patterns of files that should not be uploaded.
+            compress: whether to compress the streams using gzip.
+            workers: the number of streams to transfer in parallel.
+            check: how to check whether a file changed, see :meth:`download_tree`.
+
+        Returns:
+            :Result object containing information about the upload, see :meth:`download_tree`.
+        """
+        root = self._remote_path(server_path)
+        local_files = {path: stat for path, stat in _list_local_files(local_path).items() if _matches(path, include, exclude)}
+        remote_files = self._list_files(root)
+
+        def checksums(paths):
+            return {path: _local_checksum(os.path.join(local_path, path)) for path in paths}, self._checksums(root, paths)
+
+        changed = _select_changed(local_files, remote_files, check, checksums)
+        log.debug(f"{self}: upload {len(changed)}/{len(local_files)} files from {local_path} to {root}")
+
+        def transfer(paths):
+            stdin, stdout, stderr = self.client.exec_command(f"mkdir -p {shlex.quote(root)} && cd {shlex.quote(root)} && tar -x{'z' if compress else ''}f -")
+            with tarfile.open(fileobj=stdin, mode="w|gz" if compress else "w|") as tar:
+                for path in paths:
+                    tar.add(os.path.join(local_path, path), arcname=path)
+            stdin.close()
+            stdout.read()
+            errors = stderr.read().decode()
+            if errors:
+                log.warn(f"{self}: error while uploading to {root}: {errors}")
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            list(executor.map(transfer, _split_transfers(changed, local_files, workers)))
         log.debug(f"{self}: upload completed!")
+        return _transfer_result(changed, local_files)
 
     def path_exists(self, path: str):
         test = self.execute(f"test -e {path}; echo $?")
@@ -332,6 +754,12 @@ class Local(Server):
             print("COMMAND: ", command)
             raise
 
+    def execute_many(self, commands: List[str]) -> List[str]:
+        """
+        Execute many commands on the local machine and return their outputs, see :meth:`execute`.
+        """
+        return [self.execute(command) for command in commands]
+
     def mkdir(self, dirname):
         os.makedirs(os.path.join(self.currdir, dirname), exist_ok=True)
 
@@ -347,6 +775,12 @@ class Local(Server):
     def upload(self, local_path: str, server_path: str = None):
         shutil.copy2(os.path.join(self.currdir, local_path), os.path.join(self.currdir, server_path))
 
+    def download_tree(self, server_path: str, local_path: str, include: List[str] = None, exclude: List[str] = None, compress: bool = False, workers: int = 4, check: Union[str, None] = "mtime") -> results.Result:
+        return _copy_tree(os.path.join(self.currdir, server_path), os.path.join(self.currdir, local_path), include, exclude, workers, check)
+
+    def upload_tree(self, local_path: str, server_path: str, include: List[str] = None, exclude: List[str] = None, compress: bool = False, workers: int = 4, check: Union[str, None] = "mtime") -> results.Result:
+        return _copy_tree(os.path.join(self.currdir, local_path), os.path.join(self.currdir, server_path), include, exclude, workers, check)
+
     def path_exists(self, path: str) -> bool:
         return os.path.exists(os.path.join(self.currdir, path))
 
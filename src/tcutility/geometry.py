@@ -1,3 +1,4 @@
+import concurrent.futures
 from math import atan2, cos, sin, sqrt
 from typing import Sequence, Tuple, Union
 
@@ -565,6 +566,105 @@ def RMSD(X: np.ndarray, Y: np.ndarray, axis: Union[int, None] = None, use_kabsch
     return rmsd
 
 
+def _center_stack(X: np.ndarray) -> np.ndarray:
+    """Convert coordinates to an array of shape (M, N, 3) and center each structure on its centroid."""
+    X = np.array(X, dtype=float)
+    if X.ndim == 2:
+        X = X[np.newaxis]
+    assert X.ndim == 3, f"Coordinates must have shape (M, N, 3) or (N, 3), not {X.shape}"
+    return X - X.mean(axis=1, keepdims=True)
+
+
+def kabsch_rotmats(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Calculate the Kabsch rotation matrices for many pairs of structures at once, using stacked singular value decompositions.
+    This is the batched version of the rotation used in :class:`KabschTransform`.
+
+    Args:
+        X: array of shape (M, N, 3) containing the structures to rotate.
+        Y: array of shape (M, N, 3) containing the structures to rotate onto.
+
+    Returns:
+        Array of shape (M, 3, 3) containing rotation matrices :math:`R_i`, such that ``apply_rotmat(X[i] - X[i].mean(axis=0), R[i])``
+        is optimally aligned with ``Y[i] - Y[i].mean(axis=0)``.
+    """
+    Xc, Yc = _center_stack(X), _center_stack(Y)
+    assert Xc.shape == Yc.shape, f"Matrices X with shape {Xc.shape} and Y with shape {Yc.shape} are not the same size"
+
+    # covariance matrices of each pair of structures
+    H = np.einsum("mni,mnj->mij", Xc, Yc)
+    U, _, Vt = np.linalg.svd(H)
+    V, Ut = np.swapaxes(Vt, 1, 2), np.swapaxes(U, 1, 2)
+
+    # flip the last axis where needed to get proper rotations instead of reflections
+    d = np.ones((len(H), 3))
+    d[:, 2] = np.where(np.linalg.det(V @ Ut) < 0, -1, 1)
+    return V @ (d[:, :, np.newaxis] * Ut)
+
+
+def _rmsd_block(Xc: np.ndarray, Yc: np.ndarray, include_mirror: bool) -> np.ndarray:
+    """Calculate the Kabsch RMSD between all structures in two centered stacks."""
+    H = np.einsum("mni,knj->mkij", Xc, Yc)
+    s = np.linalg.svd(H, compute_uv=False)
+    # the optimal rotation is a reflection if the determinant of H is negative. Allowing reflections (mirror images) means we can use the singular values directly
+    if not include_mirror:
+        s[..., 2] *= np.where(np.linalg.det(H) < 0, -1, 1)
+
+    # after optimal alignment the sum of squared deviations is |X|^2 + |Y|^2 - 2 * sum(s)
+    squared_deviation = np.sum(Xc**2, axis=(1, 2))[:, np.newaxis] + np.sum(Yc**2, axis=(1, 2))[np.newaxis, :] - 2 * s.sum(axis=-1)
+    return np.sqrt(np.maximum(squared_deviation, 0) / Xc.shape[1])
+
+
+def RMSD_matrix(X: np.ndarray, Y: np.ndarray = None, include_mirror: bool = False, chunk_size: int = 100_000, workers: int = 1) -> np.ndarray:
+    """
+    Calculate the RMSD between all pairs of structures in two sets of structures, after aligning them using Kabsch' algorithm.
+    This gives the same values as calling :func:`RMSD` for every pair, but computes the optimal rotations for many pairs at once.
+    The RMSD is obtained directly from the singular values of the covariance matrices, so the aligned coordinates are never built.
+    This is useful for comparing frames of trajectories or removing duplicate conformers.
+
+    Args:
+        X: array of shape (M, N, 3) containing M structures with N atoms each.
+        Y: array of shape (K, N, 3) containing K structures with N atoms each. If not given, the structures in ``X`` are compared with each other.
+        include_mirror: also consider the mirror images of the structures in ``X``, see :func:`RMSD`.
+        chunk_size: the maximum number of pairs of structures that are handled at once. This bounds the memory used.
+        workers: the number of processes used to calculate the RMSD values. By default the values are calculated in the current process.
+
+    Returns:
+        Array of shape (M, K) containing the RMSD between structure ``X[i]`` and ``Y[j]`` at position ``[i, j]``.
+
+    .. note::
+        Because the RMSD is obtained from the difference of squared values, RMSD values of nearly identical structures
+        have an absolute error of about :math:`10^{-6}` in the units of the coordinates.
+
+    Example:
+        .. code-block:: python
+
+            from tcutility import geometry, results
+
+            res = results.read("calculations/water_md")
+            frames = [mol.as_array() for mol in res.history.molecule]
+            rmsds = geometry.RMSD_matrix(frames)
+    """
+    Xc = _center_stack(X)
+    Yc = Xc if Y is None else _center_stack(Y)
+    assert Xc.shape[1:] == Yc.shape[1:], f"Structures in X with shape {Xc.shape[1:]} and Y with shape {Yc.shape[1:]} are not the same size"
+
+    rows_per_chunk = max(1, chunk_size // max(len(Yc), 1))
+    chunks = [Xc[start : start + rows_per_chunk] for start in range(0, len(Xc), rows_per_chunk)]
+
+    if workers == 1 or len(chunks) == 1:
+        blocks = [_rmsd_block(chunk, Yc, include_mirror) for chunk in chunks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(_rmsd_block, chunks, [Yc] * len(chunks), [include_mirror] * len(chunks)))
+
+    rmsd = np.concatenate(blocks, axis=0) if blocks else np.zeros((0, len(Yc)))
+    # structures are identical to themselves
+    if Y is None:
+        np.fill_diagonal(rmsd, 0)
+    return rmsd
+
+
 def random_points_on_sphere(shape: Tuple[int], radius: float = 1) -> np.ndarray:
     """
     Generate random points on a sphere with a specified radius.
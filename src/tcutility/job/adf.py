@@ -12,6 +12,7 @@ from tcutility.data import basis_sets, cosmo, functionals
 from tcutility.errors import TCCompDetailsError, TCJobError
 from tcutility.job.ams import AMSJob
 from tcutility.job.generic import Job
+from tcutility.job.graph import JobGraph
 from tcutility.results.result import Result
 
 j = os.path.join
@@ -612,8 +613,10 @@ class ADFFragmentJob(ADFJob):
             self.settings.input.adf.UnrestrictedFragments = "Yes"
 
         elstat_jobs = {}
+        # the fragment jobs do not depend on each other, so they are checked, set up and submitted together
+        graph = JobGraph()
 
-        # now we are going to run each child job
+        # now we are going to set up each child job
         for i, (child_name, child) in enumerate(self.child_jobs.items(), start=1):
             # the child name will be prepended with SP showing that it is the singlepoint calculation
             child.name = f"frag_{child_name}"
@@ -624,22 +627,14 @@ class ADFFragmentJob(ADFJob):
             self.settings.input.adf.fragments[child_name] = j("..", f"frag_{child_name}", "adf.rkf")
 
             child.settings = plams.Settings(child_setts[child_name])
+            [child._sbatch.pop(key, None) for key in ["D", "chdir", "J", "job_name", "o", "output"]]
+            graph.add(child)
 
             log.flow(f"Fragment ({i}/{len(self.child_jobs)}) {child_name} [{formula.molecule(child._molecule)}]", ["split"], level=10)
             log.flow(f"Charge:            {child.settings.input.ams.System.charge or 0}", ["straight", "straight"], level=10)
             log.flow(f"Spin-Polarization: {child.settings.input.adf.SpinPolarization or 0}", ["straight", "straight"], level=10)
-            log.flow(f"Work dir:          {child.workdir}", ["straight", "straight"], level=10)
-
-            if child.can_skip():
-                log.flow(log.Emojis.warning + " Already ran, skipping", ["straight", "end"], level=10)
-                log.flow(level=10)
-            else:
-                log.flow(log.Emojis.good + " Submitting", ["straight", "end"], level=10)
-                [child._sbatch.pop(key, None) for key in ["D", "chdir", "J", "job_name", "o", "output"]]
-                child.run()
-                self.dependency(child)
-                log.flow(f"SlurmID:  {child.slurm_job_id}", ["straight", "skip", "end"], level=10)
-                log.flow(level=10)
+            log.flow(f"Work dir:          {child.workdir}", ["straight", "end"], level=10)
+            log.flow(level=10)
 
             if self.decompose_elstat:
                 child_STOFIT = ADFJob(child)
@@ -649,22 +644,13 @@ class ADFFragmentJob(ADFJob):
                 child_STOFIT.settings.input.adf.PRINT += " Elstat"
                 child_STOFIT.settings.input.adf.pop("NumericalQuality")
                 child_STOFIT.settings.input.adf.BeckeGrid.Quality = "Excellent"
+                graph.add(child_STOFIT)
 
                 log.flow(f"Fragment ({i}/{len(self.child_jobs)}) {child_name} [{formula.molecule(child._molecule)}] with STOFIT", ["split"], level=10)
                 log.flow(f"Charge:            {child_STOFIT.settings.input.ams.System.charge or 0}", ["straight", "straight"], level=10)
                 log.flow(f"Spin-Polarization: {child_STOFIT.settings.input.adf.SpinPolarization or 0}", ["straight", "straight"], level=10)
-                log.flow(f"Work dir:          {child_STOFIT.workdir}", ["straight", "straight"], level=10)
-
-                if child_STOFIT.can_skip():
-                    log.flow(log.Emojis.warning + " Already ran, skipping", ["straight", "end"], level=10)
-                    log.flow(level=10)
-                else:
-                    log.flow(log.Emojis.good + " Submitting", ["straight", "end"], level=10)
-                    [child_STOFIT._sbatch.pop(key, None) for key in ["D", "chdir", "J", "job_name", "o", "output"]]
-                    child_STOFIT.run()
-                    self.dependency(child_STOFIT)
-                    log.flow(f"SlurmID:  {child_STOFIT.slurm_job_id}", ["straight", "skip", "end"], level=10)
-                    log.flow(level=10)
+                log.flow(f"Work dir:          {child_STOFIT.workdir}", ["straight", "end"], level=10)
+                log.flow(level=10)
 
                 child_NoElectrons = ADFJob(child)
                 child_NoElectrons.name += "_NoElectrons"
@@ -676,22 +662,25 @@ class ADFFragmentJob(ADFJob):
                 child_NoElectrons.spin_polarization(0)
                 child_NoElectrons.settings.input.adf.pop("NumericalQuality")
                 child_NoElectrons.settings.input.adf.BeckeGrid.Quality = "Excellent"
+                graph.add(child_NoElectrons)
 
                 log.flow(f"Fragment ({i}/{len(self.child_jobs)}) {child_name} [{formula.molecule(child._molecule)}] without Electrons", ["split"], level=10)
                 log.flow(f"Charge:            {child_NoElectrons.settings.input.ams.System.charge or 0}", ["straight", "straight"], level=10)
                 log.flow(f"Spin-Polarization: {child_NoElectrons.settings.input.adf.SpinPolarization or 0}", ["straight", "straight"], level=10)
-                log.flow(f"Work dir:          {child_NoElectrons.workdir}", ["straight", "straight"], level=10)
+                log.flow(f"Work dir:          {child_NoElectrons.workdir}", ["straight", "end"], level=10)
+                log.flow(level=10)
 
-                if child_NoElectrons.can_skip():
-                    log.flow(log.Emojis.warning + " Already ran, skipping", ["straight", "end"], level=10)
-                    log.flow(level=10)
-                else:
-                    log.flow(log.Emojis.good + " Submitting", ["straight", "end"], level=10)
-                    [child_NoElectrons._sbatch.pop(key, None) for key in ["D", "chdir", "J", "job_name", "o", "output"]]
-                    child_NoElectrons.run()
-                    self.dependency(child_NoElectrons)
-                    log.flow(f"SlurmID:  {child_NoElectrons.slurm_job_id}", ["straight", "skip", "end"], level=10)
-                    log.flow(level=10)
+        # the plan is printed before the fragment jobs are submitted
+        for step in graph.run(level=10):
+            if step.skip:
+                log.flow(log.Emojis.warning + f" {step.job.name}: already ran, skipping", ["split"], level=10)
+                continue
+
+            log.flow(log.Emojis.good + f" {step.job.name}: submitted", ["split"], level=10)
+            log.flow(f"SlurmID:  {step.job.slurm_job_id}", ["straight", "end"], level=10)
+            # the parent jobs can only start after the fragment jobs are finished
+            self.dependency(step.job)
+        log.flow(level=10)
 
         # in the parent job the atoms should have the region and adf.f defined as options
         atom_lines = []
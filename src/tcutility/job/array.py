@@ -0,0 +1,212 @@
+"""
+Module used to submit many similar jobs as a single slurm job array.
+Submitting hundreds of jobs using one sbatch call per job is slow and can hit the rate limits of the scheduler.
+A job array is submitted using a single sbatch call and its tasks are scheduled like separate jobs.
+
+Every job is set up like it normally would, including its own working directory, input file and runscript.
+The array gets a single runscript that selects the working directory of a job using the ``SLURM_ARRAY_TASK_ID`` environment variable and runs the runscript of that job.
+Because of this, the calculations can be read using :func:`tcutility.results.read` as usual.
+The working directories of the tasks are also written to a small file next to the array runscript, so that :func:`tcutility.slurm.snapshot` can find the working directory of each task.
+
+Jobs can only share a job array if they run on the same server using the same sbatch options, e.g. the same partition and number of cores.
+The working directory, job name and output file options are set for every task separately.
+
+Example:
+    .. code-block:: python
+
+        from tcutility import ADFJob
+        from tcutility.job.array import JobArray
+
+        array = JobArray(name="conformers")
+        for xyz_file in xyz_files:
+            job = ADFJob()
+            job.molecule(xyz_file)
+            job.name = os.path.basename(xyz_file).removesuffix(".xyz")
+            job.rundir = "conformers"
+            job.sbatch(p="tc", n=16)
+            array.add(job)
+        array.run()
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+import tcutility.connect as connect
+import tcutility.log as log
+import tcutility.slurm as slurm
+from tcutility.job.generic import Job
+from tcutility.results.result import Result
+
+j = os.path.join
+
+# sbatch options that are set for each task separately by the array runscript
+_task_options = ["D", "chdir", "J", "job_name", "o", "output"]
+
+
+def _shared_options(job: Job) -> Dict[str, str]:
+    """Get the sbatch options of a job that have to be the same for all tasks of an array."""
+    return {key: val for key, val in job._sbatch_options().items() if key not in _task_options}
+
+
+def _output_name(job: Job) -> str:
+    options = job._sbatch_options()
+    return options.get("o", options.get("output", f"{job.name}.out"))
+
+
+def group_compatible(jobs: List[Job]) -> List[List[Job]]:
+    """
+    Group jobs that can share a job array. Jobs can share an array if they run on the same server using the same sbatch options.
+    The options that are set for each task separately (the working directory, job name and output file) are ignored.
+
+    Args:
+        jobs: the jobs to group, they should be prepared already.
+
+    Returns:
+        A list of groups of jobs, in the order in which the first job of each group was given.
+    """
+    groups: Dict[Tuple, List[Job]] = {}
+    for job in jobs:
+        key = (slurm._server_key(job._select_server()), tuple(sorted((key, str(val)) for key, val in _shared_options(job).items())))
+        groups.setdefault(key, []).append(job)
+    return list(groups.values())
+
+
+def _write_runscript(server: connect.Server, path: str, jobs: List[Job]):
+    def quote(path: str) -> str:
+        # the home directory is not expanded inside quotes, so we replace it by $HOME
+        if path.startswith("~"):
+            path = "$HOME" + path[1:]
+        return '"' + path + '"'
+
+    with server.open_file(path) as runscript:
+        runscript.write("#!/bin/bash\n\n")
+        runscript.write("# job array generated by TCutility, every task runs one of the jobs below in its own working directory\n")
+        runscript.write("workdirs=(\n" + "".join(f"    {quote(job.workdir)}\n" for job in jobs) + ")\n")
+        runscript.write("runfiles=(\n" + "".join(f"    {quote(os.path.split(job.runfile_path)[1])}\n" for job in jobs) + ")\n")
+        runscript.write("outputs=(\n" + "".join(f"    {quote(_output_name(job))}\n" for job in jobs) + ")\n\n")
+        runscript.write('cd "${workdirs[$SLURM_ARRAY_TASK_ID]}" || exit 1\n')
+        runscript.write('chmod +x "${runfiles[$SLURM_ARRAY_TASK_ID]}"\n')
+        runscript.write('./"${runfiles[$SLURM_ARRAY_TASK_ID]}" > "${outputs[$SLURM_ARRAY_TASK_ID]}" 2>&1\n')
+    server.chmod(744, path)
+
+
+def submit_array(jobs: List[Job], name: str = "array", max_running: int = None) -> Result:
+    """
+    Submit prepared jobs as a single slurm job array. The jobs must be compatible, see :func:`group_compatible`.
+    The array runscript is written to the deepest directory containing the working directories of all jobs.
+
+    Args:
+        jobs: the jobs to submit, they should be prepared already.
+        name: the name of the job array, used for the job name and the runscript.
+        max_running: the maximum number of tasks of this array that are allowed to run at the same time.
+
+    Returns:
+        :Result object containing information about the submitted job array, see :func:`tcutility.slurm.sbatch`.
+        The slurm job ids of the tasks are stored in the ``slurm_job_id`` attribute of the jobs and are formatted as ``{array_id}_{task_index}``.
+    """
+    if len(group_compatible(jobs)) > 1:
+        raise ValueError("Jobs in a job array must run on the same server using the same sbatch options.")
+
+    server = jobs[0]._select_server()
+    array_dir = os.path.commonpath([job.workdir for job in jobs])
+    # if there is only a single job we do not want to write the array files inside its working directory
+    if len(jobs) == 1:
+        array_dir = os.path.dirname(array_dir)
+
+    runscript = f"{name}.array.run"
+    _write_runscript(server, j(array_dir, runscript), jobs)
+
+    options = _shared_options(jobs[0])
+    options["array"] = f"0-{len(jobs) - 1}" + (f"%{max_running}" if max_running else "")
+    options["D"] = array_dir
+    options["J"] = name
+    # the output of the calculations is written by the runscript, so the array output only contains errors from the runscript
+    options["o"] = f"{name}.array.out"
+    options["open_mode"] = "append"
+    ret = slurm.sbatch(runscript, server=server, **options)
+    if not ret.id:
+        log.warn(f"Could not submit job array {j(array_dir, runscript)} using command: {ret.command}")
+        return ret
+
+    # store the working directories of the tasks, so that we can find them in the slurm queue
+    # slurm reports absolute paths, so paths in the home directory are expanded
+    with server.open_file(j(array_dir, slurm._array_workdirs_file(ret.id))) as workdirs:
+        workdirs.write("".join(f"{slurm._expand_home(job.workdir, server)}\n" for job in jobs))
+
+    for i, job in enumerate(jobs):
+        task = Result()
+        task.id = f"{ret.id}_{i}"
+        # the command written to submit.sh submits only this job, so that it can be rerun separately
+        task.command = slurm._sbatch_command(os.path.split(job.runfile_path)[1], **job._sbatch_options())
+        job._submitted(task)
+
+    return ret
+
+
+def submit_arrays(jobs: List[Job], name: str = "array", max_running: int = None, max_size: int = 1000) -> List[Result]:
+    """
+    Submit prepared jobs as job arrays. Compatible jobs are grouped using :func:`group_compatible` and each group is submitted using :func:`submit_array`.
+    If there are multiple arrays, their names are numbered.
+
+    Args:
+        jobs: the jobs to submit, they should be prepared already.
+        name: the name of the job arrays.
+        max_running: the maximum number of tasks of each array that are allowed to run at the same time.
+        max_size: the maximum number of tasks in one array.
+
+    Returns:
+        A list of :class:`Result <tcutility.results.result.Result>` objects containing information about the submitted job arrays.
+    """
+    chunks = [group[start : start + max_size] for group in group_compatible(jobs) for start in range(0, len(group), max_size)]
+    rets = []
+    for i, chunk in enumerate(chunks):
+        rets.append(submit_array(chunk, name=name if len(chunks) == 1 else f"{name}{i}", max_running=max_running))
+    return rets
+
+
+class JobArray:
+    """
+    Collection of jobs that are submitted as slurm job arrays.
+    Jobs that cannot share an array are submitted as separate arrays (see :func:`group_compatible`) and jobs that do not use slurm are run as usual.
+
+    Args:
+        jobs: the jobs to add to the array.
+        name: the name of the job array, used for the job name and the runscript.
+        max_running: the maximum number of tasks of each array that are allowed to run at the same time.
+        max_size: the maximum number of tasks in one array. Larger groups of jobs are split into multiple arrays.
+            Slurm limits the size of job arrays using the ``MaxArraySize`` option, which is 1001 by default.
+    """
+
+    def __init__(self, *jobs: Job, name: str = "array", max_running: int = None, max_size: int = 1000):
+        self.jobs = list(jobs)
+        self.name = name
+        self.max_running = max_running
+        self.max_size = max_size
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job: Job):
+        """Add a job to this array."""
+        self.jobs.append(job)
+
+    def run(self) -> List[Result]:
+        """
+        Set up all jobs and submit them as job arrays.
+
+        Returns:
+            A list of :class:`Result <tcutility.results.result.Result>` objects containing information about the submitted job arrays, see :func:`tcutility.slurm.sbatch`.
+        """
+        prepared = []
+        for job in self.jobs:
+            # jobs with their own run method cannot be split into a preparation and a submission step
+            if type(job).run is not Job.run:
+                job.run()
+            elif not job._prepare():
+                continue
+            elif not job._uses_slurm():
+                job._run_locally()
+            else:
+                prepared.append(job)
+
+        return submit_arrays(prepared, name=self.name, max_running=self.max_running, max_size=self.max_size)
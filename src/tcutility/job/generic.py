@@ -203,10 +203,30 @@ class Job:
         """
         Run this job. We detect if we are using slurm. If we are we submit this job using sbatch. Otherwise, we will run the job locally.
         """
-        if self.can_skip():
-            log.debug(f"Skipping calculation {j(self.rundir, self.name)}, it is already finished or currently pending or running.")
+        if not self._prepare():
             return
 
+        server = self._select_server()
+        if self._uses_slurm():
+            # submit the job with sbatch
+            sbatch_result = slurm.sbatch(os.path.split(self.runfile_path)[1], server=server, **self._sbatch_options())
+            self._submitted(sbatch_result)
+
+            # if we requested the job to hold we will wait for the slurm job to finish
+            if self.wait_for_finish:
+                slurm.wait_for_job(self.slurm_job_id, server=server)
+        else:
+            self._run_locally()
+
+    def _prepare(self, check_skip: bool = True) -> bool:
+        """
+        Prepare this job for running: check if it can be skipped, write the post-ambles and set up the working directory, runscript and input file.
+        Returns whether the job should be run. Use ``check_skip=False`` if it is already known that the job cannot be skipped.
+        """
+        if check_skip and self.can_skip():
+            log.debug(f"Skipping calculation {j(self.rundir, self.name)}, it is already finished or currently pending or running.")
+            return False
+
         server = self._select_server()
         if self.overwrite:
             server.rmtree(self.workdir)
@@ -226,51 +246,52 @@ class Job:
         # setup the job and check if it was successfull
         setup_success = self._setup_job()
 
-        if self.test_mode or not setup_success:
-            return
-
-        if slurm.has_slurm(server) and self.use_slurm:
-            # set some default sbatch settings
-            if any(option not in self._sbatch for option in ["D", "chdir"]):
-                self._sbatch.setdefault("D", self.workdir)
-            if any(option not in self._sbatch for option in ["J", "job_name"]):
-                self._sbatch.setdefault("J", f"{self.rundir}/{self.name}")
-            if any(option not in self._sbatch for option in ["o", "output"]):
-                self._sbatch.setdefault("o", f"{self.name}.out")
-            self._sbatch.prune()
-
-            # submit the job with sbatch
-            sbatch_result = slurm.sbatch(os.path.split(self.runfile_path)[1], server=server, **self._sbatch)
-
-            # store the slurm job ID
-            self.slurm_job_id = sbatch_result.id
-            # and write the command to a file so we can rerun it later
-            with server.open_file(j(self.workdir, "submit.sh")) as cmd_file:
-                cmd_file.write(sbatch_result.command)
-            # make the submit command executable
-            server.chmod(744, j(self.workdir, "submit.sh"))
-
-            # if we requested the job to hold we will wait for the slurm job to finish
-            if self.wait_for_finish:
-                slurm.wait_for_job(self.slurm_job_id, server=server)
+        return not self.test_mode and setup_success
+
+    def _uses_slurm(self) -> bool:
+        """Whether this job will be submitted using slurm."""
+        return self.use_slurm and slurm.has_slurm(self._select_server())
+
+    def _sbatch_options(self) -> Result:
+        """Get the options used to submit this job using sbatch, including the default options described in :meth:`sbatch`."""
+        # set some default sbatch settings
+        if any(option not in self._sbatch for option in ["D", "chdir"]):
+            self._sbatch.setdefault("D", self.workdir)
+        if any(option not in self._sbatch for option in ["J", "job_name"]):
+            self._sbatch.setdefault("J", f"{self.rundir}/{self.name}")
+        if any(option not in self._sbatch for option in ["o", "output"]):
+            self._sbatch.setdefault("o", f"{self.name}.out")
+        self._sbatch.prune()
+        return self._sbatch
+
+    def _submitted(self, sbatch_result: Result):
+        """Store the slurm job ID after this job was submitted and write the submit command to a file, so we can rerun it later."""
+        server = self._select_server()
+        self.slurm_job_id = sbatch_result.id
+        with server.open_file(j(self.workdir, "submit.sh")) as cmd_file:
+            cmd_file.write(sbatch_result.command)
+        # make the submit command executable
+        server.chmod(744, j(self.workdir, "submit.sh"))
+
+    def _run_locally(self):
+        """Run the runscript of this job on the local machine and wait for it to finish."""
+        os_name = connect.get_os_name()
+
+        # if we are not using slurm, we can execute the file. For this we need special permissions, so we have to set that first.
+        os.chmod(self.runfile_path, os.stat(self.runfile_path).st_mode | stat.S_IEXEC)
+
+        runfile_dir, runscript = os.path.split(self.runfile_path)
+        if os_name == connect.OSName.WINDOWS:
+            command = [runscript]
+        elif os.name == "posix":
+            command = ["./" + runscript]
         else:
-            os_name = connect.get_os_name()
-
-            # if we are not using slurm, we can execute the file. For this we need special permissions, so we have to set that first.
-            os.chmod(self.runfile_path, os.stat(self.runfile_path).st_mode | stat.S_IEXEC)
-
-            runfile_dir, runscript = os.path.split(self.runfile_path)
-            if os_name == connect.OSName.WINDOWS:
-                command = [runscript]
-            elif os.name == "posix":
-                command = ["./" + runscript]
-            else:
-                command = ["sh", runscript]
+            command = ["sh", runscript]
 
-            print(f"Running command: {command} in directory: {runfile_dir}")
+        print(f"Running command: {command} in directory: {runfile_dir}")
 
-            with open(f"{os.path.split(self.runfile_path)[0]}/{self.name}.out", "w+") as out:
-                sp.run(command, cwd=runfile_dir, stdout=out, shell=True)
+        with open(f"{os.path.split(self.runfile_path)[0]}/{self.name}.out", "w+") as out:
+            sp.run(command, cwd=runfile_dir, stdout=out, shell=True)
 
     def add_preamble(self, line: str):
         """
@@ -0,0 +1,195 @@
+"""
+Module containing the :class:`JobGraph` class, which runs jobs that depend on each other.
+Jobs are added to the graph together with the jobs they depend on. When the graph is run, jobs are run in stages:
+the first stage contains the jobs without dependencies, the second stage the jobs that only depend on jobs in the first stage, and so on.
+
+Checking whether the jobs can be skipped and setting up their working directories is done concurrently for all jobs in the graph,
+which is where most of the time is spent when running many small jobs. All slurm jobs of a stage are submitted using a single call to the server
+(see :func:`tcutility.slurm.sbatch_many`) and their slurm job ids are added as dependencies to the jobs in later stages.
+
+Example:
+    .. code-block:: python
+
+        from tcutility import ADFJob
+        from tcutility.job.graph import JobGraph
+
+        graph = JobGraph()
+        fragments = [graph.add(fragment_job) for fragment_job in fragment_jobs]
+        graph.add(complex_job, depends_on=fragments)
+        graph.run()
+"""
+
+import concurrent.futures
+import os
+from typing import Dict, List
+
+import tcutility.log as log
+import tcutility.slurm as slurm
+from tcutility.job.generic import Job
+from tcutility.results.result import Result
+
+j = os.path.join
+
+
+class JobGraph:
+    """
+    Collection of jobs and the dependencies between them.
+
+    Args:
+        workers: the number of threads used to check and set up the jobs.
+    """
+
+    def __init__(self, workers: int = 8):
+        self.workers = workers
+        self.jobs: List[Job] = []
+        # the jobs each job depends on, indexed by the id of the job
+        self._dependencies: Dict[int, List[Job]] = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job: Job, depends_on: List[Job] = None) -> Job:
+        """
+        Add a job to the graph.
+
+        Args:
+            job: the job to add.
+            depends_on: the jobs that have to finish before this job can start. They are added to the graph if they were not added yet.
+
+        Returns:
+            The added job, so that it can be used as a dependency of other jobs.
+        """
+        for dependency in depends_on or []:
+            if id(dependency) not in self._dependencies:
+                self.add(dependency)
+
+        if id(job) not in self._dependencies:
+            self.jobs.append(job)
+        self._dependencies[id(job)] = self._dependencies.get(id(job), []) + list(depends_on or [])
+        return job
+
+    def dependencies(self, job: Job) -> List[Job]:
+        """Get the jobs a job depends on."""
+        return self._dependencies[id(job)]
+
+    def stages(self) -> List[List[Job]]:
+        """
+        Divide the jobs into stages. Jobs only depend on jobs in earlier stages.
+
+        Raises:
+            ValueError: if the dependencies between the jobs contain a cycle.
+        """
+        stage_index = {}
+        remaining = list(self.jobs)
+        while remaining:
+            ready = [job for job in remaining if all(id(dependency) in stage_index for dependency in self.dependencies(job))]
+            if not ready:
+                raise ValueError(f"The dependencies between the jobs contain a cycle: {', '.join(j(job.rundir, job.name) for job in remaining)}")
+
+            for job in ready:
+                stage_index[id(job)] = max((stage_index[id(dependency)] + 1 for dependency in self.dependencies(job)), default=0)
+            remaining = [job for job in remaining if id(job) not in stage_index]
+
+        stages = [[] for _ in range(max(stage_index.values(), default=-1) + 1)]
+        for job in self.jobs:
+            stages[stage_index[id(job)]].append(job)
+        return stages
+
+    def plan(self) -> List[Result]:
+        """
+        Determine what will happen when running the graph. Whether jobs can be skipped is checked concurrently.
+
+        Returns:
+            A list containing a :Result object for each job, in the order in which they will be run, containing:
+
+                - **job (Job)** – the job.
+                - **name (str)** – the name of the job, including its run directory.
+                - **stage (int)** – the stage in which the job is run.
+                - **depends_on (list[str])** – the names of the jobs this job depends on.
+                - **skip (bool)** – whether the job will be skipped because it already ran or is currently managed by slurm.
+        """
+        stages = self.stages()
+        jobs = [job for stage in stages for job in stage]
+        stage_index = {id(job): i for i, stage in enumerate(stages) for job in stage}
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            skips = list(executor.map(lambda job: job.can_skip(), jobs))
+
+        plan = []
+        for job, skip in zip(jobs, skips):
+            step = Result()
+            step.job = job
+            step.name = j(job.rundir, job.name)
+            step.stage = stage_index[id(job)]
+            step.depends_on = [j(dependency.rundir, dependency.name) for dependency in self.dependencies(job)]
+            step.skip = skip
+            plan.append(step)
+        return plan
+
+    def log_plan(self, plan: List[Result], level: int = 20):
+        """Print the plan made by :meth:`plan` as a table."""
+        rows = [[step.stage, step.name, "skip" if step.skip else "run", ", ".join(step.depends_on)] for step in plan]
+        log.table(rows, header=["Stage", "Job", "Action", "Depends on"], level=level)
+
+    def run(self, level: int = 20) -> List[Result]:
+        """
+        Run all jobs in the graph. The plan is printed before any job is run.
+        Jobs in the same stage are set up concurrently. Slurm jobs in the same stage are submitted together and are given dependencies on
+        the slurm jobs they depend on. Jobs that are run locally are run one at a time in the order in which they were added.
+        Jobs with ``wait_for_finish`` enabled are waited for at the end of their stage, using a single squeue call per check (see :class:`tcutility.slurm.JobWaiter`).
+
+        Args:
+            level: the log level used for printing the plan.
+
+        Returns:
+            The plan made by :meth:`plan`.
+        """
+        plan = self.plan()
+        self.log_plan(plan, level=level)
+
+        skipped = {id(step.job) for step in plan if step.skip}
+        for stage in self.stages():
+            stage = [job for job in stage if id(job) not in skipped]
+            for job in stage:
+                # jobs copied from other jobs can still have the slurm job id of the original job
+                job.slurm_job_id = None
+                for dependency in self.dependencies(job):
+                    if dependency.slurm_job_id is not None:
+                        job.dependency(dependency)
+
+            with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+                prepared = list(executor.map(self._prepare, stage))
+
+            self._submit([job for job, ready in zip(stage, prepared) if ready and job._uses_slurm()])
+            for job, ready in zip(stage, prepared):
+                if ready and not job._uses_slurm():
+                    job._run_locally()
+
+            waiting = [slurm.get_waiter().add(job.slurm_job_id, server=job._select_server()) for job in stage if job.slurm_job_id is not None and job.wait_for_finish]
+            concurrent.futures.wait(waiting)
+
+        return plan
+
+    def _prepare(self, job: Job) -> bool:
+        # jobs with their own run method cannot be split into a preparation and a submission step
+        if type(job).run is not Job.run:
+            job.run()
+            return False
+
+        # we already checked whether the job can be skipped while making the plan
+        return job._prepare(check_skip=False)
+
+    def _submit(self, jobs: List[Job]):
+        # jobs have their own server objects, so we group them by the server they connect to
+        batches = {}
+        for job in jobs:
+            server = job._select_server()
+            batches.setdefault(slurm._server_key(server), (server, []))[1].append(job)
+
+        for server, batch in batches.values():
+            results = slurm.sbatch_many([(os.path.split(job.runfile_path)[1], job._sbatch_options()) for job in batch], server=server)
+            for job, result in zip(batch, results):
+                if not result.id:
+                    log.warn(f"Could not submit job {job.workdir} using command: {result.command}")
+                    continue
+
+                job._submitted(result)
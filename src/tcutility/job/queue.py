@@ -0,0 +1,206 @@
+"""
+Module containing the :class:`JobQueue` class, which is used to run many jobs at once.
+Running a job using :meth:`Job.run <tcutility.job.generic.Job.run>` checks whether it can be skipped, writes its input files and submits it using sbatch, one job at a time.
+When running thousands of jobs this takes a long time, especially when the jobs are run on a remote server.
+
+The queue prepares jobs concurrently using a pool of threads and submits the prepared jobs in batches, using a single call to the server for each batch (see :func:`tcutility.slurm.sbatch_many`).
+Instead of waiting for each job separately, submitted jobs are handed to the shared :class:`JobWaiter <tcutility.slurm.JobWaiter>`, which checks all jobs using a single squeue call per server.
+
+Example:
+    .. code-block:: python
+
+        from tcutility import ADFJob, JobQueue
+
+        with JobQueue() as queue:
+            for xyz_file in xyz_files:
+                job = ADFJob()
+                job.molecule(xyz_file)
+                job.name = os.path.basename(xyz_file).removesuffix(".xyz")
+                job.rundir = "calculations"
+                queue.add(job)
+"""
+
+import concurrent.futures
+import os
+import threading
+from typing import List, Tuple
+
+import tcutility.log as log
+import tcutility.slurm as slurm
+from tcutility.job import array
+from tcutility.job.generic import Job
+
+
+class JobQueue:
+    """
+    Queue that prepares, submits and waits for many jobs at once.
+    Jobs are prepared as soon as they are added to the queue. They are submitted when :meth:`submit` or :meth:`wait` is called or when the context manager is exited.
+
+    Args:
+        workers: the number of threads used to prepare the jobs.
+        batch_size: the maximum number of jobs submitted using a single call to the server.
+        wait_for_finish: whether to wait for all jobs to finish when the context manager is exited.
+        check_every: the maximum number of seconds to wait between checking whether submitted jobs have finished.
+        watch_workdirs: whether to also watch the working directories of submitted jobs, so that jobs are finished as soon as their calculation has finished, see :class:`JobWaiter <tcutility.slurm.JobWaiter>`.
+        use_arrays: whether to submit compatible jobs as slurm job arrays, see :mod:`tcutility.job.array`. In that case ``batch_size`` is the maximum size of an array.
+        array_name: the name used for the job arrays.
+
+    .. note::
+        Jobs that are not submitted using slurm are run one at a time in a separate thread.
+        Jobs that define their own ``run`` method, such as :class:`ADFFragmentJob <tcutility.job.adf.ADFFragmentJob>`, are run using that method in the preparation threads.
+    """
+
+    def __init__(self, workers: int = 8, batch_size: int = 100, wait_for_finish: bool = False, check_every: float = 60, use_arrays: bool = False, array_name: str = "array", watch_workdirs: bool = False):
+        self.batch_size = batch_size
+        self.wait_for_finish = wait_for_finish
+        self.check_every = check_every
+        self.watch_workdirs = watch_workdirs
+        self.use_arrays = use_arrays
+        self.array_name = array_name
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+        # jobs that do not use slurm are run one at a time, so that they do not compete for the same cores
+        self._local_executor = concurrent.futures.ThreadPoolExecutor(1)
+        self._lock = threading.Lock()
+
+        # futures for the preparation of each job and for the jobs that are run locally
+        self._preparing: List[concurrent.futures.Future] = []
+        self._running_locally: List[concurrent.futures.Future] = []
+        # jobs that are prepared and can be submitted, together with the future that is resolved when they finish
+        self._prepared: List[Tuple[Job, concurrent.futures.Future]] = []
+        # the futures of all jobs in this queue
+        self._futures: List[concurrent.futures.Future] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        failed = exc_type is not None
+        try:
+            if failed:
+                return
+
+            failed = True
+            if self.wait_for_finish:
+                self.wait()
+            else:
+                self.submit()
+            failed = False
+        finally:
+            # after an error the jobs that did not start yet are cancelled
+            self._shutdown(cancel_futures=failed)
+
+    def _shutdown(self, cancel_futures: bool = False):
+        # the cancel_futures argument of Executor.shutdown is only available from Python 3.9, so we cancel the futures ourselves
+        if cancel_futures:
+            for future in self._preparing + self._running_locally:
+                future.cancel()
+        self._executor.shutdown()
+        self._local_executor.shutdown()
+
+    def __len__(self):
+        return len(self._preparing)
+
+    def add(self, job: Job) -> concurrent.futures.Future:
+        """
+        Add a job to the queue and start preparing it.
+
+        Args:
+            job: the job to run.
+
+        Returns:
+            A future that is resolved with the job once it has finished running, was skipped or could not be set up.
+            Use ``future.add_done_callback`` to start dependent work as soon as a job has finished.
+        """
+        future = concurrent.futures.Future()
+        self._futures.append(future)
+        self._preparing.append(self._executor.submit(self._prepare, job, future))
+        return future
+
+    def _prepare(self, job: Job, future: concurrent.futures.Future):
+        try:
+            # jobs with their own run method cannot be split into a preparation and a submission step
+            if type(job).run is not Job.run:
+                job.run()
+                future.set_result(job)
+                return
+
+            if not job._prepare():
+                future.set_result(job)
+                return
+
+            if job._uses_slurm():
+                with self._lock:
+                    self._prepared.append((job, future))
+            else:
+                with self._lock:
+                    self._running_locally.append(self._local_executor.submit(self._run_locally, job, future))
+        except Exception as exp:
+            future.set_exception(exp)
+
+    def _run_locally(self, job: Job, future: concurrent.futures.Future):
+        try:
+            job._run_locally()
+            future.set_result(job)
+        except Exception as exp:
+            future.set_exception(exp)
+
+    def submit(self):
+        """
+        Wait for all jobs to be prepared and submit them in batches. Jobs for different servers are submitted separately.
+        If ``use_arrays`` is enabled, compatible jobs are submitted as job arrays instead (see :mod:`tcutility.job.array`).
+        """
+        concurrent.futures.wait(self._preparing)
+
+        with self._lock:
+            prepared, self._prepared = self._prepared, []
+
+        # jobs copied from other jobs can still have the slurm job id of the original job
+        for job, _ in prepared:
+            job.slurm_job_id = None
+
+        if self.use_arrays:
+            array.submit_arrays([job for job, _ in prepared], name=self.array_name, max_size=self.batch_size)
+        else:
+            self._submit_batches(prepared)
+
+        waiter = slurm.get_waiter()
+        submitted = 0
+        for job, future in prepared:
+            if job.slurm_job_id is None:
+                future.set_result(job)
+                continue
+
+            workdir = job.workdir if self.watch_workdirs else None
+            finished = waiter.add(job.slurm_job_id, server=job._select_server(), workdir=workdir, max_interval=self.check_every)
+            finished.add_done_callback(lambda _, job=job, future=future: future.set_result(job))
+            submitted += 1
+
+        if prepared:
+            log.info(f"Submitted {submitted}/{len(prepared)} jobs")
+
+    def _submit_batches(self, prepared: List[Tuple[Job, concurrent.futures.Future]]):
+        # jobs have their own server objects, so we group them by the server they connect to
+        batches = {}
+        for job, future in prepared:
+            server = job._select_server()
+            batches.setdefault(slurm._server_key(server), (server, []))[1].append(job)
+
+        for server, jobs in batches.values():
+            for start in range(0, len(jobs), self.batch_size):
+                batch = jobs[start : start + self.batch_size]
+                results = slurm.sbatch_many([(os.path.split(job.runfile_path)[1], job._sbatch_options()) for job in batch], server=server)
+                for job, result in zip(batch, results):
+                    if not result.id:
+                        log.warn(f"Could not submit job {job.workdir} using command: {result.command}")
+                        continue
+
+                    job._submitted(result)
+
+    def wait(self):
+        """
+        Submit all remaining jobs and wait for all jobs in this queue to finish.
+        Submitted jobs are checked at most every ``check_every`` seconds using a single squeue call per server.
+        """
+        self.submit()
+        concurrent.futures.wait(self._futures)
@@ -1,47 +1,98 @@
+import json
 import os
+import sqlite3
+import tempfile
+import threading
 import platformdirs
-from typing import List, Tuple, Dict
+from typing import Tuple, Dict
 import tcutility
-from filelock import FileLock
 
 CACHEDIR = platformdirs.user_cache_dir(appname="TCutility", appauthor="TheoCheMVU", ensure_exists=True)
-DBPATH = CACHEDIR + '/workflows.csv'
-DBPATH_LOCK = FileLock(CACHEDIR + '/workflows.csv.lock')
-# DBPATH = 'test.csv'
-# create a new db file if it doesnt exist yet
-if not os.path.exists(DBPATH):
-    with open(DBPATH, 'w+'):
-        ...
+DBPATH = CACHEDIR + '/workflows.sqlite'
+# workflows used to be stored in a csv file, it is migrated to the database the first time the database is opened
+CSV_DBPATH = CACHEDIR + '/workflows.csv'
+
+# connections are reused for each thread, indexed by the path to the database
+_connections = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    '''
+    Get a connection to the database for the current thread.
+    The database is opened in WAL mode, so that reading does not block writing and jobs can update their status concurrently.
+    '''
+    connections = _connections.__dict__
+    if DBPATH not in connections:
+        connection = sqlite3.connect(DBPATH, timeout=60, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS workflows (hash TEXT PRIMARY KEY, data TEXT)')
+        _migrate_csv(connection)
+        connections[DBPATH] = connection
+    return connections[DBPATH]
+
+
+def _migrate_csv(connection: sqlite3.Connection) -> None:
+    '''
+    Move the workflows stored in the old csv file into the database.
+    The csv file is renamed afterwards, so that the migration only happens once.
+    '''
+    if not os.path.exists(CSV_DBPATH):
+        return
+
+    with connection:
+        # lock the database, so that only one process migrates the csv file
+        connection.execute('BEGIN IMMEDIATE')
+        if not os.path.exists(CSV_DBPATH):
+            return
+
+        records = {}
+        with open(CSV_DBPATH) as db:
+            for line in db.readlines():
+                try:
+                    hsh, data = parse_line(line)
+                except ValueError:
+                    continue
+                # later lines in the csv file overwrite earlier ones
+                records[hsh] = data
+
+        for hsh, data in records.items():
+            connection.execute('INSERT OR IGNORE INTO workflows VALUES (?, ?)', (hsh, json.dumps(data)))
+        os.replace(CSV_DBPATH, CSV_DBPATH + '.migrated')
+
+
+def _encode(data: dict) -> str:
+    # values are stored as strings, like they were in the csv file
+    return json.dumps({k: str(v) for k, v in data.items()})
+
 
 #### BASIC FUNCTIONS
 
 def write(hsh: str, **kwargs):
-    s = f'{hsh}'
-    for k, v in kwargs.items():
-        s += f', {k}={v}'
-    s += '\n'
+    '''
+    Write a new record to the database, replacing the record with the same hash.
+    '''
+    with _connect() as connection:
+        connection.execute('INSERT OR REPLACE INTO workflows VALUES (?, ?)', (hsh, _encode(kwargs)))
 
-    with DBPATH_LOCK:
-        with open(DBPATH, 'a') as db:
-            db.write(s)
 
 def read(hsh: str) -> dict:
     '''
     Get the status of a workflow with specific args and kwargs.
     '''
+    row = _connect().execute('SELECT data FROM workflows WHERE hash = ?', (hsh, )).fetchone()
     # default status is unknown
-    for _hsh, data in read_all().items():
-        if hsh == _hsh:
-            return data
-    return {}
+    if row is None:
+        return {}
+    return json.loads(row[0])
 
 
 def parse_line(line: str) -> Tuple[str, dict]:
     '''
-    Read information from a line from the database.
+    Read information from a line from the old csv database.
     '''
     # the hsh is always the first entry
-    hsh = line.split(',')[0]
+    hsh = line.split(',')[0].strip()
     data = {}
     # read anything after the hash
     for part in line.split(',')[1:]:
@@ -52,59 +103,53 @@ def parse_line(line: str) -> Tuple[str, dict]:
     return hsh, data
 
 
+def _read_all(connection: sqlite3.Connection) -> Dict[str, dict]:
+    return {hsh: json.loads(data) for hsh, data in connection.execute('SELECT hash, data FROM workflows')}
+
+
 def read_all() -> Dict[str, dict]:
     '''
-    Return all lines that are in the database.
+    Return all records that are in the database.
     '''
-    with DBPATH_LOCK:
-        with open(DBPATH) as db:
-            lines = db.readlines()
-
-    # parse the lines we found
-    parsed_lines = [parse_line(line) for line in lines]
-    # and construct a dictionary
-    return {hsh: data for hsh, data in parsed_lines}
+    return _read_all(_connect())
 
 def read_remote(server: tcutility.connect.Connection) -> Dict[str, dict]:
     '''
-    Return all lines that are in the database.
+    Return all records that are in the database on a remote server.
     '''
-    file = server.download('.cache/TCutility/workflows.csv', 'workflows.csv')
-    with open('workflows.csv') as db:
-        lines = db.readlines()
-    # parse the lines we found
-    parsed_lines = [parse_line(line) for line in lines]
-    # and construct a dictionary
-    return {hsh: data for hsh, data in parsed_lines}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        local_path = os.path.join(tmpdir, 'workflows.sqlite')
+        server.download('.cache/TCutility/workflows.sqlite', local_path)
+        # recent changes can still be stored in the write-ahead log
+        if server.path_exists('.cache/TCutility/workflows.sqlite-wal'):
+            server.download('.cache/TCutility/workflows.sqlite-wal', local_path + '-wal')
+
+        connection = sqlite3.connect(local_path)
+        try:
+            return _read_all(connection)
+        finally:
+            connection.close()
 
 def update(hsh: str, **kwargs) -> None:
     '''
     Update a record in the database associated with the given hash.
+    The record is read and written in a single transaction, so that concurrent updates are not lost.
     '''
-    data = read(hsh)
-    data.update(kwargs)
-    delete(hsh)
-    write(hsh, **data)
+    with _connect() as connection:
+        # lock the database for writing before reading the current record
+        connection.execute('BEGIN IMMEDIATE')
+        row = connection.execute('SELECT data FROM workflows WHERE hash = ?', (hsh, )).fetchone()
+        data = {} if row is None else json.loads(row[0])
+        data.update(kwargs)
+        connection.execute('INSERT OR REPLACE INTO workflows VALUES (?, ?)', (hsh, _encode(data)))
 
 
 def delete(hsh: str) -> None:
     '''
     Delete records related to the given hash.
     '''
-    # make a list of lines that we will rewrite
-    # all_data = read_all()
-    # all_data.pop(hsh, None)
-    # for _hsh, data in all_data.items():
-    #     write(_hsh, data)
-    with DBPATH_LOCK:
-        with open(DBPATH) as db:
-            lines = db.readlines()
-
-    new_lines = [line for line in lines if line.split(',')[0] != hsh]
-    with DBPATH_LOCK:
-        with open(DBPATH, 'w+') as db:
-            for line in new_lines:
-                db.write(line)
+    with _connect() as connection:
+        connection.execute('DELETE FROM workflows WHERE hash = ?', (hsh, ))
 
 # #### CONVENIENCE FUNCTIONS
 
@@ -127,7 +172,8 @@ def can_skip(hsh: str, server: tcutility.connect.Server = tcutility.connect.Loca
     '''
     Checks if a workflow with specific args and kwargs has finished.
     '''
-    status = get_status(hsh)
+    data = read(hsh)
+    status = data.get('status', None)
     # if the status indicates the workflow already ran we can skip
     if status in ['SUCCESS', 'FAILED']:
         return True
@@ -135,7 +181,6 @@ def can_skip(hsh: str, server: tcutility.connect.Server = tcutility.connect.Loca
     # if the workflow is still running we need to check if it
     # is being managed by slurm
     elif status == 'RUNNING':
-        data = read(hsh)
         # if the workflow is managed by slurm it should have a slurm-job-id
         slurm_job_id = data.get('slurm_job_id', None)
         # if it does not we can assume it failed
@@ -143,10 +188,9 @@ def can_skip(hsh: str, server: tcutility.connect.Server = tcutility.connect.Loca
              return False
 
         # if it does, we need to check if it is in the queue
-        sq = tcutility.slurm.squeue(server=server)
         # if it is being managed by slurm we can skip it
         # otherwise something went wrong and the status was not updated
-        return slurm_job_id in sq['id']
+        return tcutility.slurm.snapshot(server=server).get_job(slurm_job_id) is not None
 
     return False
 
@@ -1,12 +1,22 @@
+import concurrent.futures
+import fnmatch
 import glob
 import os
 import re
-from typing import Dict, List, Union
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 
+from tcutility import pathindex
 from tcutility.results.result import Result
 
 j = os.path.join
 
+# the number of threads used to list directories concurrently, see :func:`iter_subdirectories` and :func:`iter_match`
+# listing directories on network filesystems is limited by latency instead of CPU, so using more threads than cores is useful
+walker_threads = 8
+# directories up to this depth are scanned in separate tasks, deeper subtrees are scanned by a single thread
+# submitting a task costs more than scanning a small directory on a local disk, so we only split the tree near the top
+walker_parallel_depth = 2
+
 
 def split_all(path: str) -> List[str]:
     """
@@ -35,7 +45,62 @@ def split_all(path: str) -> List[str]:
         path = a
 
 
-def get_subdirectories(root: str, include_intermediates: bool = False, max_depth: Union[int, None] = None, _current_depth: int = 0) -> List[str]:
+def _list_subdirectories(path: str) -> List[str]:
+    """List the paths of the entries of a directory that are not files."""
+    with os.scandir(path) as scanner:
+        return [entry.path for entry in scanner if not entry.is_file()]
+
+
+def _is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _walk_concurrently(root: str, scan_directory: Callable[[str, int], Tuple[list, List[Tuple[str, int]]]]) -> Iterator:
+    """
+    Walk through a directory tree, scanning independent subtrees concurrently using :data:`walker_threads` threads.
+    Directories deeper than :data:`walker_parallel_depth` are scanned together with their subtree in a single task.
+
+    Args:
+        root: the directory to start in.
+        scan_directory: function that is called in the threads with the path to a directory and its depth below ``root``.
+            It should return a list of values to yield and a list of ``(path, depth)`` tuples of the directories to scan next.
+
+    Yields:
+        The values returned by ``scan_directory``, as soon as their directory has been scanned.
+    """
+    def scan_subtree(path: str, depth: int):
+        values, children = scan_directory(path, depth)
+        if depth < walker_parallel_depth:
+            return values, children
+
+        # deeper subtrees are scanned in this thread, in the same order as a sequential walk
+        stack = children[::-1]
+        while stack:
+            values_, children_ = scan_directory(*stack.pop())
+            values.extend(values_)
+            stack.extend(children_[::-1])
+        return values, []
+
+    with concurrent.futures.ThreadPoolExecutor(walker_threads) as executor:
+        pending = {executor.submit(scan_subtree, root, 0)}
+        try:
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    values, children = future.result()
+                    # we submit the children before yielding, so that they are scanned while the caller processes the values
+                    pending.update(executor.submit(scan_subtree, path, depth) for path, depth in children)
+                    yield from values
+        finally:
+            # if the caller stops iterating we do not have to scan the remaining directories
+            for future in pending:
+                future.cancel()
+
+
+def get_subdirectories(root: str, include_intermediates: bool = False, max_depth: Union[int, None] = None) -> List[str]:
     """
     Get all sub-directories of a root directory.
 
@@ -85,28 +150,82 @@ def get_subdirectories(root: str, include_intermediates: bool = False, max_depth
                      'root/subdir_a/subsubdir_c',
                      'root/subdir_b',
                      'root/subdir_c']
+
+    .. note::
+        If ``root`` is part of an index opened using :func:`tcutility.pathindex.open`, the sub-directories are taken from the index instead of the filesystem.
     """
+    index = pathindex.get(root)
+    if index is not None:
+        return index.get_subdirectories(root, include_intermediates=include_intermediates, max_depth=max_depth)
+
+    def scan_directory(path: str, depth: int):
+        subdirs = _list_subdirectories(path)
+        children = [] if depth == max_depth else [(subdir, depth + 1) for subdir in subdirs]
+        return [(path, subdirs)], children
+
+    subdirectories = dict(_walk_concurrently(root, scan_directory))
+
+    # the directories were scanned concurrently, so we put them back in the order in which they were listed
     contents = []
-    if _current_depth == 0 and include_intermediates:
+    if include_intermediates:
         contents.append(root)
 
-    with os.scandir(root) as scanner:
-        for entry in scanner:
-            if entry.is_file():
+    def collect(path: str, depth: int):
+        for subdir in subdirectories[path]:
+            if depth == max_depth:
+                contents.append(subdir)
                 continue
 
-            if _current_depth == max_depth:
-                contents.append(entry.path)
-                continue
+            position = len(contents)
+            if include_intermediates:
+                contents.append(subdir)
+            collect(subdir, depth + 1)
+            # leaves are always included
+            if len(contents) == position:
+                contents.append(subdir)
 
-            sub_contents = list(get_subdirectories(entry.path, include_intermediates=include_intermediates, _current_depth=_current_depth + 1, max_depth=max_depth))
+    collect(root, 0)
+    return contents
 
-            if include_intermediates or len(sub_contents) == 0:
-                contents.append(entry.path)
 
-            contents.extend(sub_contents)
+def iter_subdirectories(root: str, include_intermediates: bool = False, max_depth: Union[int, None] = None) -> Iterator[str]:
+    """
+    Generator version of :func:`get_subdirectories`. Independent subtrees are scanned concurrently using :data:`walker_threads` threads
+    and sub-directories are yielded as soon as they are found, so that they can be processed before the whole tree has been scanned.
+    Because of this, the order of the sub-directories is not fixed.
 
-    return contents
+    Args:
+        root: the root directory.
+        include_intermediates: whether to include intermediate sub-directories instead of only the lowest levels.
+        max_depth: the maximum depth depth to look for subdirectories,
+            e.g. setting it to `1` will return only the contents of the `root` path.
+
+    Yields:
+        Sub-directories with ``root`` included in the paths.
+
+    Example:
+        .. code-block:: python
+
+            for calc_dir in iter_subdirectories('calculations'):
+                res = tcutility.read(calc_dir)
+    """
+    index = pathindex.get(root)
+    if index is not None:
+        yield from index.get_subdirectories(root, include_intermediates=include_intermediates, max_depth=max_depth)
+        return
+
+    if include_intermediates:
+        yield root
+
+    def scan_directory(path: str, depth: int):
+        subdirs = _list_subdirectories(path)
+        # a directory is only a leaf once we know it does not contain any sub-directories
+        found = [path] if depth > 0 and (include_intermediates or not subdirs) else []
+        if depth == max_depth:
+            return found + subdirs, []
+        return found, [(subdir, depth + 1) for subdir in subdirs]
+
+    yield from _walk_concurrently(root, scan_directory)
 
 
 def path_depth(path: str) -> int:
@@ -116,6 +235,28 @@ def path_depth(path: str) -> int:
     return len(split_all(path))
 
 
+def _compile_pattern(pattern: str) -> Tuple[List[str], re.Pattern, str]:
+    """Get the names of the substitutions in a pattern used by :func:`match`, together with the corresponding regex and glob patterns."""
+    # get the number and names of substitutions in the given pattern
+    substitutions = re.findall(r"{(\w+)}", pattern)
+    # the pattern should resolve to words and may contain - and _
+
+    # given the substitutions we build a regex pattern and a glob pattern
+    glob_pattern = pattern
+    for sub in substitutions:
+        pattern = pattern.replace("{" + sub + "}", "([a-zA-Z0-9_-]+)")
+        glob_pattern = glob_pattern.replace("{" + sub + "}", "*")
+
+    return substitutions, re.compile(pattern), glob_pattern
+
+
+def _get_match_info(root: str, subdir: str, regex: re.Pattern, substitutions: List[str]) -> Tuple[str, Result]:
+    """Extract the values of the substitutions from a path found by :func:`match`."""
+    subdir = subdir[len(f"{root}/") :]
+    re_match = regex.fullmatch(subdir)
+    return j(root, subdir), Result(**{substitutions[i]: re_match.group(i + 1) for i in range(len(substitutions))})
+
+
 def match(root: str, pattern: str, sort_by: Union[str, None] = None) -> Dict[str, dict]:
     """
     Find and return information about subdirectories of a root that match a given pattern.
@@ -181,34 +322,81 @@ def match(root: str, pattern: str, sort_by: Union[str, None] = None) -> Dict[str
             [2024/01/17 14:39:08] root/NH3-BH3/M06-2X_TZ2P   NH3-BH3   M06-2X       TZ2P
             [2024/01/17 14:39:08] root/SN2/BLYP_TZ2P         SN2       BLYP         TZ2P
             [2024/01/17 14:39:08] root/NH3-BH3/BLYP_QZ4P     NH3-BH3   BLYP         QZ4P
-    """
-    # get the number and names of substitutions in the given pattern
-    substitutions = re.findall(r"{(\w+)}", pattern)
-    # the pattern should resolve to words and may contain - and _
 
-    # given the substitutions we build a regex pattern and a glob pattern
-    glob_pattern = pattern
-    for sub in substitutions:
-        pattern = pattern.replace("{" + sub + "}", "([a-zA-Z0-9_-]+)")
-        glob_pattern = glob_pattern.replace("{" + sub + "}", "*")
-
-    # get all applicable subdirectories
-    subdirs = glob.glob(os.path.join(root, glob_pattern))
+    .. note::
+        If ``root`` is part of an index opened using :func:`tcutility.pathindex.open`, the subdirectories are matched using the index instead of the filesystem.
+    """
+    substitutions, regex, glob_pattern = _compile_pattern(pattern)
 
-    # compile a regular expression pattern to match with later
-    regex = re.compile(pattern)
+    # get all applicable subdirectories, if the root is indexed we do not have to list the directories again
+    index = pathindex.get(root)
+    if index is not None:
+        subdirs = index.glob(os.path.join(root, glob_pattern))
+    else:
+        subdirs = glob.glob(os.path.join(root, glob_pattern))
 
     # go through all applicable subdirectories and retrieve the information we want
     ret = Result()
     for subdir in subdirs:
-        # subdir = os.path.relpath(subdir, root)
-        subdir = subdir[len(f"{root}/") :]
-        p = j(root, subdir)
-        re_match = regex.fullmatch(subdir)
-        ret[p] = Result(**{substitutions[i]: re_match.group(i + 1) for i in range(len(substitutions))})
+        p, info = _get_match_info(root, subdir, regex, substitutions)
+        ret[p] = info
 
     if not sort_by:
         return ret
 
     # if requested we sort the results before returning them
     return Result(sorted(ret.items(), key=lambda d: d[1][sort_by]))
+
+
+def iter_match(root: str, pattern: str) -> Iterator[Tuple[str, Result]]:
+    """
+    Generator version of :func:`match`. Directories are scanned concurrently using :data:`walker_threads` threads and only directories that match the pattern so far are scanned further.
+    Matches are yielded as soon as they are found, so that they can be processed before all directories have been scanned.
+    Because of this, the order of the matches is not fixed.
+
+    Args:
+        root: the root of the subdirectories to look in.
+        pattern: a string specifying the pattern the subdirectories should correspond to, see :func:`match`.
+
+    Yields:
+        Tuples containing the matched directories and information (|Result| object) about those matches. Each information dictionary contains the variables given in the pattern.
+
+    Example:
+        .. code-block:: python
+
+            for calc_dir, info in iter_match('root', '{system}/{functional}_{basis_set}'):
+                res = tcutility.read(calc_dir)
+    """
+    substitutions, regex, glob_pattern = _compile_pattern(pattern)
+
+    index = pathindex.get(root)
+    if index is not None:
+        for subdir in index.glob(os.path.join(root, glob_pattern)):
+            yield _get_match_info(root, subdir, regex, substitutions)
+        return
+
+    parts = glob_pattern.split("/")
+
+    def scan_directory(path: str, depth: int):
+        part = parts[depth]
+        last = depth == len(parts) - 1
+        # just like glob, we only match directories before the last part and we only match hidden entries explicitly
+        if glob.has_magic(part):
+            try:
+                with os.scandir(path) as scanner:
+                    entries = [entry for entry in scanner if (part.startswith(".") or not entry.name.startswith(".")) and (last or _is_dir(entry))]
+            except OSError:
+                return [], []
+            names = set(fnmatch.filter([entry.name for entry in entries], part))
+            matches = [entry.path for entry in entries if entry.name in names]
+        else:
+            p = j(path, part)
+            matches = [p] if (os.path.lexists(p) if last else os.path.isdir(p)) else []
+
+        if last:
+            return matches, []
+        return [], [(p, depth + 1) for p in matches]
+
+    for subdir in _walk_concurrently(root, scan_directory):
+        yield _get_match_info(root, subdir, regex, substitutions)
+
@@ -0,0 +1,334 @@
+"""
+Module containing a persistent index of the directories and files below a root directory.
+Looking for calculations using :func:`tcutility.pathfunc.match` or :func:`tcutility.pathfunc.get_subdirectories` lists every directory below the root directory,
+which is slow for large trees of calculations, especially on network filesystems.
+
+A :class:`DirectoryIndex` stores the contents of every directory below its root, together with the modification time of the directory.
+When it is updated only the modification times are checked and only directories that changed are listed again.
+The index is stored in an SQLite database in the platform dependent cache directory that is also used by :func:`tcutility.cache_file`, so that it can be reused in later sessions.
+
+While an index is opened using :func:`open` it is used by :func:`tcutility.pathfunc.match`, :func:`tcutility.pathfunc.get_subdirectories` and :func:`tcutility.results.scan.scan`
+(and therefore by the ``get_calc_files`` functions of all engines) for every path below its root.
+
+Example:
+    .. code-block:: python
+
+        from tcutility import pathfunc, pathindex
+
+        with pathindex.open("calculations"):
+            # only the directories that changed since the last time the index was used are listed
+            for calc_dir in pathfunc.match("calculations", "{system}/{functional}_{basis_set}"):
+                print(calc_dir)
+"""
+
+import fnmatch
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from tcutility.cache import _cache_dir
+from tcutility.results.result import Result
+
+# path to the database file, can be changed to store the indices in a different location
+database_path = os.path.join(_cache_dir, "directory_index.sqlite")
+
+# directories that were modified less than this many seconds before they were listed are listed again during the next update
+# the modification times of some filesystems are not precise enough to notice changes made directly after listing a directory
+racy_interval = 2.0
+
+# the kinds of entries stored for each directory
+_DIRECTORY = "d"
+_SYMLINK = "l"
+_FILE = "f"
+
+# indices that are currently opened, indexed by their absolute root path
+_opened = {}
+_refcounts = {}
+_lock = threading.RLock()
+
+
+def _connect() -> sqlite3.Connection:
+    connection = sqlite3.connect(database_path, timeout=60)
+    connection.execute("CREATE TABLE IF NOT EXISTS directories (root TEXT, path TEXT, mtime INTEGER, entries TEXT, PRIMARY KEY (root, path))")
+    return connection
+
+
+def _list_directory(path: str) -> List[Tuple[str, str]]:
+    """List the entries of a directory in the order given by :func:`os.scandir`, together with their kind.
+    Symbolic links to directories are stored separately, as their contents are not part of the index."""
+    entries = []
+    with os.scandir(path) as scanner:
+        for entry in scanner:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if not is_dir:
+                entries.append((entry.name, _FILE))
+            elif entry.is_symlink():
+                entries.append((entry.name, _SYMLINK))
+            else:
+                entries.append((entry.name, _DIRECTORY))
+    return entries
+
+
+class DirectoryIndex:
+    """Index of the directories and files below a root directory. Use :meth:`update` to bring the index up-to-date with the filesystem.
+    Just like :func:`os.walk` the index does not follow symbolic links to directories.
+
+    Args:
+        root: path pointing to the root directory of the index.
+        persistent: whether to load the index from and store it in the database at :data:`database_path`.
+    """
+
+    def __init__(self, root: str, persistent: bool = True):
+        self.root = os.path.abspath(root)
+        self.persistent = persistent
+        # the entries of each directory, indexed by the path relative to the root ("" for the root itself)
+        self.directories: Dict[str, List[Tuple[str, str]]] = {}
+        # the modification times of the directories when they were listed, in nanoseconds
+        self.mtimes: Dict[str, int] = {}
+
+        if persistent:
+            self._load()
+
+    def __repr__(self):
+        return f"DirectoryIndex({self.root!r}, directories={len(self.directories)})"
+
+    def _load(self):
+        with _connect() as connection:
+            rows = connection.execute("SELECT path, mtime, entries FROM directories WHERE root = ?", (self.root,)).fetchall()
+        connection.close()
+
+        for path, mtime, entries in rows:
+            self.mtimes[path] = mtime
+            self.directories[path] = [tuple(entry) for entry in json.loads(entries)]
+
+    def _save(self, changed: List[str], removed: List[str]):
+        with _connect() as connection:
+            connection.executemany("DELETE FROM directories WHERE root = ? AND path = ?", [(self.root, path) for path in removed])
+            connection.executemany(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?)", [(self.root, path, self.mtimes[path], json.dumps(self.directories[path])) for path in changed]
+            )
+        connection.close()
+
+    def update(self) -> Result:
+        """Bring the index up-to-date with the filesystem. Only directories whose modification time changed since they were last listed are listed again.
+        Directories that were removed are removed from the index, together with their subdirectories.
+
+        Returns:
+            :Result object containing:
+
+                - **listed (int)** – the number of directories that were listed.
+                - **unchanged (int)** – the number of directories that were not changed.
+                - **removed (int)** – the number of directories that were removed from the index.
+        """
+        ret = Result()
+        ret.listed = 0
+        ret.unchanged = 0
+
+        visited = set()
+        changed = []
+        stack = [""]
+        while stack:
+            path = stack.pop()
+            full_path = os.path.join(self.root, path)
+            try:
+                mtime = os.stat(full_path).st_mtime_ns
+                if self.mtimes.get(path) != mtime or path not in self.directories:
+                    self.directories[path] = _list_directory(full_path)
+                    # changes made directly after listing might not change the modification time, so we mark the listing as outdated
+                    self.mtimes[path] = mtime if time.time() - mtime / 1e9 > racy_interval else -1
+                    changed.append(path)
+                    ret.listed += 1
+                else:
+                    ret.unchanged += 1
+            except OSError:
+                continue
+
+            visited.add(path)
+            # add the subdirectories in reverse, so that they are visited in the order they are stored
+            stack.extend(os.path.join(path, name) for name, kind in reversed(self.directories[path]) if kind == _DIRECTORY)
+
+        removed = [path for path in self.directories if path not in visited]
+        for path in removed:
+            del self.directories[path]
+            del self.mtimes[path]
+        ret.removed = len(removed)
+
+        if self.persistent and (changed or removed):
+            self._save(changed, removed)
+        return ret
+
+    def relative_path(self, path: str) -> Union[str, None]:
+        """Get the path of a directory relative to the root of this index. Returns ``None`` if the directory is not part of the index."""
+        path = os.path.relpath(os.path.abspath(path), self.root)
+        if path == ".":
+            path = ""
+        if path not in self.directories:
+            return None
+        return path
+
+    def __contains__(self, path: str) -> bool:
+        return self.relative_path(path) is not None
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Walk through a directory in the index, in the same order as :func:`os.walk`.
+        The directory paths are joined with ``top`` in the same way as for :func:`os.walk`.
+
+        Args:
+            top: path pointing to a directory in the index.
+
+        Yields:
+            Tuples containing a directory path, the names of its subdirectories and the names of its files.
+        """
+        stack = [(top, self.relative_path(top))]
+        while stack:
+            path, rel_path = stack.pop()
+            if rel_path is None:
+                continue
+
+            entries = self.directories[rel_path]
+            yield path, [name for name, kind in entries if kind != _FILE], [name for name, kind in entries if kind == _FILE]
+            stack.extend((os.path.join(path, name), os.path.join(rel_path, name)) for name, kind in reversed(entries) if kind == _DIRECTORY)
+
+    def get_subdirectories(self, root: str, include_intermediates: bool = False, max_depth: Optional[int] = None) -> List[str]:
+        """Get all sub-directories of a directory in the index. See :func:`tcutility.pathfunc.get_subdirectories` for a description of the arguments.
+        The contents of symbolic links to directories are not part of the index, so they are listed from the filesystem."""
+        contents = []
+        if include_intermediates:
+            contents.append(root)
+
+        def collect(path: str, rel_path: Optional[str], depth: int):
+            entries = self.directories[rel_path] if rel_path is not None else _list_directory(path)
+            for name, kind in entries:
+                if kind == _FILE:
+                    continue
+
+                sub_path = os.path.join(path, name)
+                if depth == max_depth:
+                    contents.append(sub_path)
+                    continue
+
+                position = len(contents)
+                if include_intermediates:
+                    contents.append(sub_path)
+                collect(sub_path, os.path.join(rel_path, name) if rel_path is not None and kind == _DIRECTORY else None, depth + 1)
+                if not include_intermediates and len(contents) == position:
+                    contents.append(sub_path)
+
+        collect(root, self.relative_path(root), 0)
+        return contents
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return the paths matching a pattern, in the same order as :func:`glob.glob`.
+        Parts of the pattern that fall outside of the index, for example below symbolic links to directories, are matched using :func:`glob.glob`.
+
+        Args:
+            pattern: the pattern to match, containing shell-style wildcards. Recursive wildcards (``**``) are not supported by the index.
+        """
+        parts = pattern.split("/")
+        first_magic = next((i for i, part in enumerate(parts) if glob.has_magic(part)), len(parts))
+        base = "/".join(parts[:first_magic])
+        if "**" in pattern or first_magic == len(parts) or self.relative_path(base or ".") is None:
+            return glob.glob(pattern)
+
+        # candidates are stored as (path, path relative to the root, whether the rest of the pattern is already matched)
+        # the relative path is None for paths that are not part of the index
+        candidates = [(base, self.relative_path(base or "."), False)]
+        for i, part in enumerate(parts[first_magic:], start=first_magic):
+            last = i == len(parts) - 1
+            new_candidates = []
+            for path, rel_path, done in candidates:
+                if done:
+                    new_candidates.append((path, rel_path, done))
+                    continue
+
+                if rel_path is None:
+                    # this part of the tree is not indexed, so we fall back to the filesystem
+                    new_candidates.extend((match, None, True) for match in glob.glob(os.path.join(glob.escape(path), *parts[i:])))
+                    continue
+
+                # just like glob, intermediate parts only match directories and hidden entries are only matched explicitly
+                entries = [(name, kind) for name, kind in self.directories[rel_path] if last or kind != _FILE]
+                if glob.has_magic(part):
+                    if not part.startswith("."):
+                        entries = [(name, kind) for name, kind in entries if not name.startswith(".")]
+                    names = set(fnmatch.filter([name for name, _ in entries], part))
+                    entries = [(name, kind) for name, kind in entries if name in names]
+                else:
+                    entries = [(name, kind) for name, kind in entries if name == part]
+
+                for name, kind in entries:
+                    new_candidates.append((os.path.join(path, name) if path else name, os.path.join(rel_path, name) if kind == _DIRECTORY else None, last))
+            candidates = new_candidates
+
+        return [path for path, _, _ in candidates]
+
+    def files(self, calc_dir: str) -> List[Tuple[str, List[str]]]:
+        """Get the files that are present in a directory in the index and its subdirectories, see :func:`tcutility.results.scan.scan`."""
+        return [(path, files) for path, _, files in self.walk(os.path.abspath(calc_dir))]
+
+    def close(self):
+        """Stop using this index, see :func:`open`."""
+        with _lock:
+            if _opened.get(self.root) is not self:
+                return
+            _refcounts[self.root] -= 1
+            if _refcounts[self.root] <= 0:
+                del _opened[self.root]
+                del _refcounts[self.root]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open(root: str, persistent: bool = True) -> DirectoryIndex:
+    """Open and update the index of a directory. Until the index is closed, it is used for every path below its root by
+    :func:`tcutility.pathfunc.match`, :func:`tcutility.pathfunc.get_subdirectories` and :func:`tcutility.results.scan.scan`.
+    If the directory is already opened, the same index is returned and it is not updated again.
+
+    Args:
+        root: path pointing to the root directory of the index.
+        persistent: whether to load the index from and store it in the database at :data:`database_path`.
+
+    Returns:
+        The updated index. It can be used as a context manager, that closes the index when the context is exited.
+    """
+    root = os.path.abspath(root)
+    with _lock:
+        if root not in _opened:
+            index = DirectoryIndex(root, persistent=persistent)
+            index.update()
+            _opened[root] = index
+            _refcounts[root] = 0
+        _refcounts[root] += 1
+        return _opened[root]
+
+
+def get(path: str) -> Union[DirectoryIndex, None]:
+    """Get the opened index that contains a directory. If multiple indices contain the directory, the one with the deepest root is returned.
+
+    Args:
+        path: path pointing to a directory.
+
+    Returns:
+        The index containing the directory, or ``None`` if no opened index contains it.
+    """
+    with _lock:
+        if not _opened:
+            return None
+        indices = sorted(_opened.values(), key=lambda index: len(index.root), reverse=True)
+
+    for index in indices:
+        if path in index:
+            return index
+
@@ -69,35 +69,45 @@ def get_calc_settings(info: Result) -> Result:
     # if it did, variable 'escale' will be present in 'SFOs'
     # if it didnt, only variable 'energy' will be present
     ret.relativistic = ("SFOs", "escale") in reader_adf
-    ret.relativistic_type = relativistic_type_map[reader_adf.read("General", "ioprel")]
+
+    # all settings are read at once
+    ioprel, nspin, nspinf, grouplabel, symlab, frag_order, charge = reader_adf.read_many(
+        [
+            ("General", "ioprel"),
+            ("General", "nspin"),
+            ("General", "nspinf"),
+            ("Geometry", "grouplabel"),
+            ("Symmetry", "symlab"),
+            ("Geometry", "fragment and atomtype index"),
+            ("Molecule", "Charge"),
+        ]
+    )
+    ret.relativistic_type = relativistic_type_map[ioprel]
 
     # determine if MOs are unrestricted or not
     # general, nspin is 1 for restricted and 2 for unrestricted calculations
-    ret.unrestricted_mos = reader_adf.read("General", "nspin") == 2
+    ret.unrestricted_mos = nspin == 2
 
     # determine if SFOs are unrestricted or not
-    ret.unrestricted_sfos = reader_adf.read("General", "nspinf") == 2
+    ret.unrestricted_sfos = nspinf == 2
 
     # get the symmetry group
-    ret.symmetry.group = reader_adf.read("Geometry", "grouplabel").strip()
+    ret.symmetry.group = grouplabel.strip()
 
     # get the symmetry labels
-    ret.symmetry.labels = reader_adf.read("Symmetry", "symlab").strip().split()
+    ret.symmetry.labels = symlab.strip().split()
 
     # determine if the calculation used regions or not
-    frag_order = reader_adf.read("Geometry", "fragment and atomtype index")
     frag_order = frag_order[: len(frag_order) // 2]
     ret.used_regions = max(frag_order) != len(frag_order)
 
-    ret.charge = reader_adf.read("Molecule", "Charge")
+    ret.charge = charge
 
     ret.spin_polarization = 0
     if ret.unrestricted_mos:
-        nalpha = 0
-        nbeta = 0
-        for label in ret.symmetry.labels:
-            nalpha += sum(ensure_list(reader_adf.read(label, "froc_A")))
-            nbeta += sum(ensure_list(reader_adf.read(label, "froc_B")))
+        occupations = reader_adf.read_many([(label, occ) for label in ret.symmetry.labels for occ in ["froc_A", "froc_B"]])
+        nalpha = sum(sum(ensure_list(occ)) for occ in occupations[::2])
+        nbeta = sum(sum(ensure_list(occ)) for occ in occupations[1::2])
         ret.spin_polarization = nalpha - nbeta
     ret.multiplicity = 2 * ret.spin_polarization + 1
 
@@ -161,9 +171,7 @@ def _read_vibrations(reader: TrackKFReader) -> Result:
         ret.intensities = ensure_list(reader.read("Vibrations", "Intensities[km/mol]"))
     ret.number_of_imag_modes = len([freq for freq in ret.frequencies if freq < 0])
     ret.character = "minimum" if ret.number_of_imag_modes == 0 else "transitionstate"
-    ret.modes = []
-    for i in range(ret.number_of_modes):
-        ret.modes.append(reader.read("Vibrations", f"NoWeightNormalMode({i + 1})"))
+    ret.modes = reader.read_many([("Vibrations", f"NoWeightNormalMode({i + 1})") for i in range(ret.number_of_modes)])
     return ret
 
 
@@ -218,10 +226,15 @@ def get_properties(info: Result) -> Result:
     reader_adf = cache.get(info.files["adf.rkf"])
 
     # read energies (given in Ha in rkf files)
-    ret.energy.bond = reader_adf.read("Energy", "Bond Energy") * constants.HA2KCALMOL
+    # they are all stored in the same section, so we read them at once
+    symlabels = [symlabel.split(":")[0] for symlabel in info.adf.symmetry.labels]
+    energy_variables = ["Bond Energy", "elstat", "Orb.Int. Total", "Pauli Total", "Dispersion Energy"] + [f"Orb.Int. {symlabel}" for symlabel in symlabels]
+    energies = dict(zip(energy_variables, reader_adf.read_many([("Energy", variable) for variable in energy_variables])))
+
+    ret.energy.bond = energies["Bond Energy"] * constants.HA2KCALMOL
 
     # total electrostatic potential
-    ret.energy.elstat.total = reader_adf.read("Energy", "elstat") * constants.HA2KCALMOL
+    ret.energy.elstat.total = energies["elstat"] * constants.HA2KCALMOL
 
     # we can further decompose elstat if it was enabled
     if info.files.out:
@@ -243,7 +256,7 @@ def get_properties(info: Result) -> Result:
     # print(info.files)
 
     # read the total orbital interaction energy
-    ret.energy.orbint.total = reader_adf.read("Energy", "Orb.Int. Total") * constants.HA2KCALMOL
+    ret.energy.orbint.total = energies["Orb.Int. Total"] * constants.HA2KCALMOL
 
     # to calculate the orbital interaction term:
     # the difference between the total and the sum of the symmetrized interaction energies should be calculated
@@ -251,21 +264,21 @@ def get_properties(info: Result) -> Result:
     ret.energy.orbint.correction = ret.energy.orbint.total
 
     # looping over every symlabel, to get the energy per symmetry label
-    for symlabel in info.adf.symmetry.labels:
-        symlabel = symlabel.split(":")[0]
-        ret.energy.orbint[symlabel] = reader_adf.read("Energy", f"Orb.Int. {symlabel}") * constants.HA2KCALMOL
+    for symlabel in symlabels:
+        ret.energy.orbint[symlabel] = energies[f"Orb.Int. {symlabel}"] * constants.HA2KCALMOL
 
         # the energy per symmetry label is abstracted from the "total orbital interaction"
         # obtaining the correction to the orbital interaction term
         ret.energy.orbint.correction -= ret.energy.orbint[symlabel]
 
-    ret.energy.pauli.total = reader_adf.read("Energy", "Pauli Total") * constants.HA2KCALMOL
-    ret.energy.dispersion = reader_adf.read("Energy", "Dispersion Energy") * constants.HA2KCALMOL
+    ret.energy.pauli.total = energies["Pauli Total"] * constants.HA2KCALMOL
+    ret.energy.dispersion = energies["Dispersion Energy"] * constants.HA2KCALMOL
 
     if ("Thermodynamics", "Gibbs free Energy") in reader_adf:
-        ret.energy.gibbs = reader_adf.read("Thermodynamics", "Gibbs free Energy") * constants.HA2KCALMOL
-        ret.energy.enthalpy = reader_adf.read("Thermodynamics", "Enthalpy") * constants.HA2KCALMOL
-        ret.energy.nuclear_internal = reader_adf.read("Thermodynamics", "Internal Energy total") * constants.HA2KCALMOL
+        gibbs, enthalpy, internal = reader_adf.read_many([("Thermodynamics", "Gibbs free Energy"), ("Thermodynamics", "Enthalpy"), ("Thermodynamics", "Internal Energy total")])
+        ret.energy.gibbs = gibbs * constants.HA2KCALMOL
+        ret.energy.enthalpy = enthalpy * constants.HA2KCALMOL
+        ret.energy.nuclear_internal = internal * constants.HA2KCALMOL
 
     # vibrational information
     if ("Vibrations", "nNormalModes") in reader_adf:
@@ -297,10 +310,12 @@ def get_properties(info: Result) -> Result:
     else:
         ret.spin_contamination = 0
 
-    ret.dipole_vector = reader_adf.read("Properties", "Dipole")
+    # the multipole moments and densities are stored in the same section, so we read them together
+    dipole, quadrupole, dens_at_atom = reader_adf.read_many([("Properties", "Dipole"), ("Properties", "Quadrupole"), ("Properties", "Electron Density at Nuclei")])
+    ret.dipole_vector = dipole
     ret.dipole_moment = np.linalg.norm(ret.dipole_vector)
-    ret.quadrupole_moment = reader_adf.read("Properties", "Quadrupole")
-    ret.dens_at_atom = ensure_list(reader_adf.read("Properties", "Electron Density at Nuclei"))
+    ret.quadrupole_moment = quadrupole
+    ret.dens_at_atom = ensure_list(dens_at_atom)
 
     return ret
 
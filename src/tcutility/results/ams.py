@@ -1,13 +1,14 @@
+import functools
 import os
 import re
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 from scm import plams
 
 from tcutility import constants, environment
-from tcutility.results import cache
+from tcutility.results import cache, scan
 from tcutility.results.result import Result
 from tcutility.typing_utilities import Array1D, ensure_list
 
@@ -27,7 +28,7 @@ def get_calc_files(calc_dir: str) -> dict:
     """
     # collect all files in the current directory and subdirectories
     files = []
-    for root, _, files_ in os.walk(os.path.abspath(calc_dir)):
+    for root, files_ in scan.scan(calc_dir):
         if os.path.split(root)[1].startswith("."):
             continue
 
@@ -110,11 +111,25 @@ def get_ams_version(calc_dir: str) -> Result:
     return ret
 
 
-def get_ams_info(calc_dir: str) -> Result:
+def _lazy_getter(func, calc_dir: str):
+    """Wrap a getter function, such that it can be used as a lazy value. The rkf files that were opened by the getter are unloaded afterwards."""
+
+    def getter():
+        try:
+            return func(calc_dir)
+        finally:
+            cache.unload_directory(calc_dir)
+
+    return getter
+
+
+def get_ams_info(calc_dir: str, lazy: bool = False, guess_bonds: bool = False) -> Result:
     """Function to read useful info about the calculation in ``calc_dir``. Returned information will depend on the type of file that is provided.
 
     Args:
         calc_dir: path pointing to the desired calculation.
+        lazy: whether to only read the molecules, history and PES scan variables when they are first accessed.
+        guess_bonds: whether to guess the bonds of the history molecules, see :func:`get_history`.
 
     Returns:
         :Dictionary containing results about the calculation and AMS:
@@ -129,43 +144,54 @@ def get_ams_info(calc_dir: str) -> Result:
     """
     ret = Result()
     ret.files = get_calc_files(calc_dir)
-    reader_ams = cache.get(ret.files["ams.rkf"])
-
-    # check what the program is first. The program can be either AMS or one of the engines (ADF, DFTB, ...)
-    if ("General", "engine") in reader_ams:
-        ret.engine = str(reader_ams.read("General", "engine")).strip().lower()
-    # if program cannot be read from reader it is probably an old version of ADF, so we should default to ADF
-    else:
-        ret.engine = "adf"
+    # the ams.rkf reader is used by all functions called here, so we keep it open until we are done
+    with cache.opened(ret.files["ams.rkf"]) as reader_ams:
+        # the engine and job id are read at once, missing variables are set to None
+        engine, job_id = reader_ams.read_many([("General", "engine"), ("General", "jobid")], default=None)
+
+        # check what the program is first. The program can be either AMS or one of the engines (ADF, DFTB, ...)
+        if engine is not None:
+            ret.engine = str(engine).strip().lower()
+        # if program cannot be read from reader it is probably an old version of ADF, so we should default to ADF
+        else:
+            ret.engine = "adf"
 
-    # store the input of the calculation
-    ret.input = get_ams_input(reader_ams.read("General", "user input"))
+        # store the input of the calculation
+        ret.input = get_ams_input(reader_ams.read("General", "user input"))
 
-    # store the job id, which should be unique for the job
-    ret.job_id = reader_ams.read("General", "jobid") if ("General", "jobid") in reader_ams else None
+        # store the job id, which should be unique for the job
+        ret.job_id = job_id
 
-    # store information about the version of AMS
-    ret.ams_version = get_ams_version(calc_dir)
+        # store information about the version of AMS
+        ret.ams_version = get_ams_version(calc_dir)
 
-    # store the computation timings, only available in ams.rkf
-    ret.timing = get_timing(calc_dir)
+        # store the computation timings, only available in ams.rkf
+        ret.timing = get_timing(calc_dir)
 
-    # store the calculation status
-    ret.status = get_calculation_status(calc_dir)
+        # store the calculation status
+        ret.status = get_calculation_status(calc_dir)
 
-    # check if this was a multijob
-    ret.is_multijob = False
-    if len([file for file in ret.files if file.endswith(".rkf")]) > 2:
-        ret.is_multijob = True
+        # check if this was a multijob
+        ret.is_multijob = False
+        if len([file for file in ret.files if file.endswith(".rkf")]) > 2:
+            ret.is_multijob = True
 
-    # read molecules
-    ret.molecule = get_molecules(calc_dir)
+        if lazy:
+            ret.set_lazy("molecule", _lazy_getter(get_molecules, calc_dir))
+            ret.set_lazy("history", _lazy_getter(functools.partial(get_history, guess_bonds=guess_bonds), calc_dir))
+            if "pesscan" in ret.input.task:
+                ret.set_lazy("pes", _lazy_getter(get_pes, calc_dir))
+            else:
+                ret.pes = None
+        else:
+            # read molecules
+            ret.molecule = get_molecules(calc_dir)
 
-    # and history variables
-    ret.history = get_history(calc_dir)
+            # and history variables
+            ret.history = get_history(calc_dir, guess_bonds=guess_bonds)
 
-    # Only get pes if the task is "pesscan"
-    ret.pes = get_pes(calc_dir) if "pesscan" in ret.input.task else None
+            # Only get pes if the task is "pesscan"
+            ret.pes = get_pes(calc_dir) if "pesscan" in ret.input.task else None
 
     cache.unload(ret.files["ams.rkf"])
     return ret
@@ -188,9 +214,7 @@ def get_timing(calc_dir: str) -> Result:
     files = get_calc_files(calc_dir)
     reader_ams = cache.get(files["ams.rkf"])
 
-    ret.cpu = reader_ams.read("General", "CPUTime") if ("General", "CPUTime") in reader_ams else None
-    ret.sys = reader_ams.read("General", "SysTime") if ("General", "SysTime") in reader_ams else None
-    ret.total = reader_ams.read("General", "ElapsedTime") if ("General", "ElapsedTime") in reader_ams else None
+    ret.cpu, ret.sys, ret.total = reader_ams.read_many([("General", "CPUTime"), ("General", "SysTime"), ("General", "ElapsedTime")], default=None)
 
     return ret
 
@@ -238,7 +262,51 @@ def get_calculation_status(calc_dir: str) -> Result:
 
     reader_ams = cache.get(files["ams.rkf"])
     termination_status = str(reader_ams.read("General", "termination status")).strip()
+    return _parse_termination_status(termination_status, ret)
+
+
+def get_quick_status(calc_dir: str) -> Result:
+    """Function that quickly returns the status of the calculation. Unlike :func:`get_calculation_status` only the last part of the logfile is read.
+    If that is not enough to determine the status, only the termination status is read from the ams.rkf file, without storing the reader in the cache.
+
+    Args:
+        calc_dir: path pointing to the desired calculation.
+
+    Returns:
+        :Dictionary containing information about the calculation status, see :func:`get_calculation_status`.
+    """
+    files = get_calc_files(calc_dir)
+
+    ret = Result()
+    ret.fatal = True
+    ret.name = None
+    ret.code = None
+    ret.reasons = []
 
+    if "log" in files:
+        for line in scan.read_tail(files["log"]).splitlines()[::-1]:
+            line_ = line.strip()[25:].lower()
+            if line_.startswith("error:") or line_.startswith("warning: "):
+                ret.reasons.append(line_)
+
+            if "normal termination" in line_:
+                ret.fatal = False
+                ret.name = "SUCCESS"
+                ret.code = "S"
+                return ret
+
+    if "ams.rkf" not in files:
+        ret.reasons.append("Calculation status unknown")
+        ret.name = "UNKNOWN"
+        ret.code = "U"
+        return ret
+
+    termination_status = str(plams.KFReader(files["ams.rkf"]).read("General", "termination status")).strip()
+    return _parse_termination_status(termination_status, ret)
+
+
+def _parse_termination_status(termination_status: str, ret: Result) -> Result:
+    """Set the status in ``ret`` based on the termination status written in the ams.rkf file."""
     if termination_status == "NORMAL TERMINATION":
         ret.fatal = False
         ret.name = "SUCCESS"
@@ -339,12 +407,13 @@ def get_molecules(calc_dir: str) -> Result:
     ret = Result()
 
     # read general
-    atnums = ensure_list(reader_ams.read("InputMolecule", "AtomicNumbers"))  # type: ignore plams does not include type hints. Returns list[int]
+    atnums, atom_symbols, atom_masses = reader_ams.read_many([("InputMolecule", "AtomicNumbers"), ("InputMolecule", "AtomSymbols"), ("InputMolecule", "AtomMasses")])
+    atnums = ensure_list(atnums)
     natoms = len(atnums)
     ret.number_of_atoms = natoms
     ret.atom_numbers = atnums
-    ret.atom_symbols = str(reader_ams.read("InputMolecule", "AtomSymbols")).split()
-    ret.atom_masses = reader_ams.read("InputMolecule", "AtomMasses")
+    ret.atom_symbols = str(atom_symbols).split()
+    ret.atom_masses = atom_masses
 
     # read input molecule
     ret.input = _make_molecule("InputMolecule", reader_ams, natoms, atnums)
@@ -464,12 +533,51 @@ def get_pes(calc_dir: str) -> Result:
     return ret
 
 
-def get_history(calc_dir: str) -> Result:
+def _make_history_molecules(coords: np.ndarray, atnums: List[int], guess_bonds: bool = False) -> List[plams.Molecule]:
+    """Makes a list of plams.Molecule objects from an array of coordinates with shape (nsteps, natoms, 3)."""
+    mols = []
+    for step_coords in coords:
+        mol = plams.Molecule()
+        for atnum, coord in zip(atnums, step_coords):
+            mol.add_atom(plams.Atom(atnum=atnum, coords=coord))
+        if guess_bonds:
+            mol.guess_bonds()
+        mols.append(mol)
+    return mols
+
+
+def _make_history_arrays(values: Dict[str, list], nsteps: int, natoms: int) -> Result:
+    """Stack history variables into numpy arrays. Variables that are not numeric or do not have the same shape for each step are skipped."""
+    ret = Result()
+    for item, vals in values.items():
+        try:
+            arr = np.asarray(vals)
+        except ValueError:
+            continue
+
+        if arr.dtype.kind not in "biuf" or len(arr) != nsteps:
+            continue
+
+        # per-atom vectors are reshaped to (nsteps, natoms, 3)
+        if arr.ndim == 2 and arr.shape[1] == natoms * 3:
+            arr = arr.reshape(nsteps, natoms, 3)
+
+        ret[item.lower()] = arr
+
+    # coordinates are stored in bohr in the rkf file
+    if "coords" in ret.keys():
+        ret.coords = ret.coords * constants.BOHR2ANG
+
+    return ret
+
+
+def get_history(calc_dir: str, guess_bonds: bool = False) -> Result:
     """
     Function to get history variables. The type of variables read depends on the type of calculation.
 
     Args:
         calc_dir: path pointing to the desired calculation.
+        guess_bonds: whether to guess the bonds of the history molecules. Guessing bonds is slow for long trajectories, so it is disabled by default.
 
     Returns:
         :Dictionary containing information about the calculation status:
@@ -479,8 +587,11 @@ def get_history(calc_dir: str) -> Result:
 
               Common variables:
                 | ``Molecule`` **(list[plams.Molecule])** – list of molecules from the history, for example from a geometry optimization or PES scan.
+                  The molecules are only built when they are first accessed.
                 | ``energy`` **(list[float])** – list of energies associated with each geometry step.
                 | ``gradient`` **(list[list[float]])** – array of gradients for each geometry step and each atom.
+            - ``arrays.{variable}`` **(np.ndarray)** – numeric history variables stacked into a single array with the number of steps as the first dimension.
+              Per-atom variables, such as ``arrays.coords`` (|angstrom|) and ``arrays.gradients``, have shape ``(nsteps, natoms, 3)``.
     """
     # read history mols
     files = get_calc_files(calc_dir)
@@ -509,33 +620,27 @@ def get_history(calc_dir: str) -> Result:
             except KeyError:
                 index = False
 
-        if "Coords" in items:
-            items.append("Molecule")
+        # collect the elements for each history variable
+        # we first collect them in plain lists, which is much faster than appending to Result objects
+        # all entries are read at once, which is much faster than reading them one-by-one
+        values = {item: reader_ams.read_many([("History", f"{item}({i + 1})") for i in range(ret.number_of_entries)]) for item in items}
+
+        if "converged" not in [item.lower() for item in items] and ("PESScan", "HistoryIndices") in reader_ams:
+            values["converged"] = [False] * ret.number_of_entries
+            for idx in ensure_list(reader_ams.read("PESScan", "HistoryIndices")):
+                values["converged"][idx - 1] = True
 
         # create variable in result for each variable found
-        for item in items:
-            ret[item.lower()] = []
+        for item, vals in values.items():
+            ret[item.lower()] = vals
 
-        # collect the elements for each history variable
-        for i in range(ret.number_of_entries):
-            for item in items:
-                # Molecule are special, because we will convert them to plams.Molecule objects first
-                if item == "Molecule":
-                    mol = plams.Molecule()
-                    coords = np.array(reader_ams.read("History", f"Coords({i + 1})")).reshape(natoms, 3) * constants.BOHR2ANG
-                    for atnum, coord in zip(atnums, coords):
-                        mol.add_atom(plams.Atom(atnum=atnum, coords=coord))
-                    mol.guess_bonds()
-                    ret.molecule.append(mol)
-                # other variables are just added as-is
-                else:
-                    val = reader_ams.read("History", f"{item}({i + 1})")
-                    ret[item.lower()].append(val)
+        ret.arrays = _make_history_arrays(values, ret.number_of_entries, natoms)
 
-        if "converged" not in ret.keys() and ("PESScan", "HistoryIndices") in reader_ams:
-            ret["converged"] = [False] * ret.number_of_entries
-            for idx in ensure_list(reader_ams.read("PESScan", "HistoryIndices")):
-                ret["converged"][idx - 1] = True
+        # Molecules are special, because we convert them to plams.Molecule objects
+        # building them is slow, so we only do it when they are requested
+        if "coords" in ret.arrays.keys():
+            coords = ret.arrays.coords
+            ret.set_lazy("molecule", lambda: _make_history_molecules(coords, atnums, guess_bonds=guess_bonds))
 
     return ret
 
@@ -1,19 +1,65 @@
 """
 Tiny module that handles caching rkf files.
-rkf files take a long time to open (especially {engine}.rkf), so it is better to open them once and cache them for later use
+rkf files take a long time to open (especially {engine}.rkf), so it is better to open them once and cache them for later use.
+
+The cache is a least-recently-used (LRU) cache. When more than :data:`max_readers` readers are opened, or when the opened rkf files
+are larger than :data:`max_bytes` in total, the readers that were used longest ago are removed from the cache.
+Readers that are in use (see :func:`opened`) are never removed. You can change the limits by setting the module variables, e.g.:
+
+.. code-block:: python
+
+    from tcutility.results import cache
+
+    cache.max_readers = 16
+    cache.max_bytes = 2 * 1024**3  # 2 GB
+
+Two reader backends are available. The default "plams" backend uses :class:`plams.KFReader`, which reads and decodes the file block-by-block every time a variable is read.
+The "mmap" backend (:class:`MmapKFReader`) memory-maps the file once and decodes numeric data directly using NumPy.
+It is faster for bulk access to large rkf files of finished calculations, but should not be used for files that are still being written to.
+The backend can be chosen for each reader with :func:`get` or for all readers by setting :data:`default_backend`.
 """
 
-from typing import Any, Union
+import collections
+import contextlib
+import mmap
+import os
+import threading
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
+import numpy as np
 from scm import plams
 
-# the actual cache is stored in this dict
-_cache = {}
+from tcutility.results.result import Result
+
+# the maximum number of readers to keep in the cache
+max_readers: Optional[int] = 64
+# the maximum total size of the rkf files that are opened in the cache in bytes
+max_bytes: Optional[int] = None
+# the default backend used to open rkf files, either "plams" or "mmap"
+default_backend: str = "plams"
+
+# the actual cache is stored in this dict, the most recently used readers are stored at the end
+_cache = collections.OrderedDict()
+# the file sizes of the readers in the cache
+_sizes = {}
+# readers that are in use have a reference count larger than 0 and are not evicted
+_refcounts = collections.Counter()
+# readers that should be unloaded as soon as they are not in use anymore
+_pending_unload = set()
+_statistics = collections.Counter()
+_lock = threading.RLock()
+# sets collecting the variables that were accessed while tracking is enabled, see track_access
+_access_logs = []
+
+
+# sentinel used to check whether a default value was given
+_no_default = object()
 
 
 class TrackKFReader(plams.KFReader):
     """Subclass of plams.KFReader that also tracks the variables that were read. This class can be useful to figure out which variables are important.
-    For example, we can then trim rkf files to reduce their filesizes."""
+    For example, we can then trim rkf files to reduce their filesizes (see :mod:`tcutility.results.trim`).
+    Variables that were checked for using ``(section, variable) in reader`` and are present in the file are also tracked."""
 
     def __init__(self, *args, **kwargs):
         self.tracker = []
@@ -32,6 +78,264 @@ class TrackKFReader(plams.KFReader):
         self.tracker.append((section, variable))
         return super().read(section, variable)
 
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        """Check whether a (section, variable) pair is present in the rkf file using the index, instead of iterating over all variables."""
+        if self._sections is None:
+            self._create_index()
+        section, variable = key
+        present = section in self._sections and variable in self._sections[section]
+        if present:
+            self.tracker.append((section, variable))
+        return present
+
+    def read_many(self, variables: Iterable[Tuple[str, str]], default: Any = _no_default) -> List[Any]:
+        """Read multiple variables from the rkf file at once.
+        The file is only opened once and every block of data is read and decoded at most once, even if it contains multiple of the requested variables.
+        This is much faster than calling :meth:`read` for each variable separately, especially for variables stored in the same section.
+
+        Args:
+            variables: a sequence of (section, variable) pairs to read.
+            default: the value to return for variables that are not present in the file. If it is not given a KeyError is raised instead.
+
+        Returns:
+            A list of values, in the same order as ``variables``. The values are converted in the same way as in :meth:`read`.
+
+        Example:
+            .. code-block:: python
+
+                >>> bond, pauli = reader.read_many([("Energy", "Bond Energy"), ("Energy", "Pauli Total")])
+        """
+        if self._sections is None:
+            self._create_index()
+
+        # decoded blocks indexed by their position in the file
+        blocks = {}
+        ret = []
+        with open(self.path, "rb") as file:
+
+            def get_block(position):
+                if position not in blocks:
+                    blocks[position] = self._decode_block(self._read_block(file, position))
+                return blocks[position]
+
+            for section, variable in variables:
+                self.tracker.append((section, variable))
+                if (section, variable) not in self:
+                    if default is _no_default:
+                        raise KeyError(f"Variable {variable} not present in section {section} of {self.path}")
+                    ret.append(default)
+                    continue
+
+                ret.append(self._read_variable(section, variable, get_block))
+        return ret
+
+    def _decode_block(self, block: bytes) -> Tuple[int, int, Optional[tuple]]:
+        """Decode a block of data into the number of integers, the number of doubles and the values stored in the block, see :meth:`plams.KFReader._get_data`."""
+        hlen = 4 * self._sizes[self.word]
+        i, d, s, b = self._parse(block[:hlen], [(4, self.word)])[0]
+        contents = self._parse(block[hlen:], zip((i, d, s, b), (self.word, "d", "s", self.word)))
+        return i, d, contents[0] if contents else None
+
+    def _read_variable(self, section: str, variable: str, get_block) -> Any:
+        """Read a variable using a function that returns decoded blocks, see :meth:`read_many`. Values are converted in the same way as in :meth:`plams.KFReader.read`."""
+        vtype, vlb, vstart, vlen = self._sections[section][variable]
+
+        ret = []
+        first = True
+        for position in plams.KFReader._datablocks(self._data[section], vlb):
+            i, d, contents = get_block(position)
+            if contents is None:
+                data = []
+            elif vtype == 1:
+                data = list(contents[:i])
+            elif vtype == 2:
+                data = list(contents[i : i + d])
+            elif vtype == 3:
+                data = contents[i + d]
+            elif vtype == 4:
+                data = list(map(bool, contents[i + d + 1 :]))
+            else:
+                raise KeyError("Unknown vtype")
+
+            if first:
+                ret = data[vstart - 1 :]
+                first = False
+            else:
+                ret += data
+
+            if len(ret) >= vlen:
+                ret = ret[:vlen]
+                if isinstance(ret, bytes):
+                    try:
+                        return ret.decode()
+                    except UnicodeDecodeError:
+                        return ret.decode("Latin-1")
+                elif len(ret) == 1:
+                    return ret[0]
+                return ret
+        return ret
+
+
+class MmapKFReader(TrackKFReader):
+    """Read-only rkf reader that memory-maps the file. The section and variable index is built when the reader is opened.
+    Numeric variables are decoded directly from the memory-mapped file using NumPy, instead of being unpacked value-by-value.
+    Values returned by :meth:`read` have the same types as those returned by :class:`plams.KFReader`.
+    Use :meth:`read_array` to get numeric variables as NumPy arrays. If the variable is stored in a single block of the file, the array is a view on the file and no data is copied.
+
+    .. note::
+
+        The file is mapped when the reader is opened, so changes made to the file afterwards are not picked up. Only use this reader for calculations that have finished.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._create_index()
+        # the locations of variables that were read before
+        self._locations = {}
+
+    def _read_block(self, f, pos: int) -> bytes:
+        # blocks are read from the memory-mapped file instead of the opened file
+        return self._mmap[(pos - 1) * self._blocksize : pos * self._blocksize]
+
+    def _locate(self, section: str, variable: str) -> Tuple[int, List[Tuple[int, int]]]:
+        """Get the type of a variable and the (offset, count) pairs of the chunks of the file where its data is stored."""
+        if (section, variable) in self._locations:
+            return self._locations[section, variable]
+
+        try:
+            vtype, vlb, vstart, vlen = self._sections[section][variable]
+        except KeyError:
+            raise KeyError(f"Variable {variable} not present in section {section} of {self.path}")
+
+        wordsize = self._sizes[self.word]
+        # data blocks start with a header containing the number of integers, doubles, characters and booleans stored in the block
+        header = np.dtype(self.endian + self.word)
+        chunks = []
+        remaining = vlen
+        skip = vstart - 1
+        for block in plams.KFReader._datablocks(self._data[section], vlb):
+            offset = (block - 1) * self._blocksize
+            nint, ndouble, nchar, nbool = np.frombuffer(self._mmap, dtype=header, count=4, offset=offset)
+            offset += 4 * wordsize
+            counts = [(nint, wordsize), (ndouble, 8), (nchar, 1), (nbool, wordsize)]
+            # skip the data of the other types stored before this type
+            offset += sum(count * size for count, size in counts[: vtype - 1])
+            count, size = counts[vtype - 1]
+
+            offset += skip * size
+            count = min(int(count) - skip, remaining)
+            skip = 0
+            if count > 0:
+                chunks.append((offset, count))
+                remaining -= count
+            if remaining <= 0:
+                break
+
+        self._locations[section, variable] = vtype, chunks
+        return vtype, chunks
+
+    def read_array(self, section: str, variable: str) -> np.ndarray:
+        """Read a numeric variable from a section of the rkf file as a NumPy array.
+
+        Args:
+            section: Name of the section to read from.
+            variable: Name of the variable inside the section.
+
+        Returns:
+            A one-dimensional, read-only array containing the values of the variable. Integers and floats are returned as views on the memory-mapped file if they are stored in a single block.
+
+        Raises:
+            TypeError: if the variable contains text instead of numbers.
+        """
+        self.tracker.append((section, variable))
+        if section not in self._sections:
+            raise KeyError(f"Section {section} not present in {self.path}")
+        vtype, chunks = self._locate(section, variable)
+        if vtype == 3:
+            raise TypeError(f"Variable {variable} of section {section} contains text and cannot be read as an array")
+
+        dtype = np.dtype(self.endian + ("f8" if vtype == 2 else self.word))
+        parts = [np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset) for offset, count in chunks]
+        if len(parts) == 1:
+            array = parts[0]
+        else:
+            array = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+            array.flags.writeable = False
+
+        if vtype == 4:
+            return array != 0
+        return array
+
+    def read(self, section: str, variable: str) -> Any:
+        """Read a variable from a section of the rkf file and store the accessed section and variable in the tracker.
+
+        Args:
+            section: Name of the section to read from.
+            variable: Name of the variable inside the section.
+
+        Returns:
+            The value of the variable, converted in the same way as :meth:`plams.KFReader.read`. Text is returned as a string, single values as numbers or booleans and multiple values as a list."""
+        if section not in self._sections:
+            raise KeyError(f"Section {section} not present in {self.path}")
+
+        vtype, chunks = self._locate(section, variable)
+        if vtype == 3:
+            self.tracker.append((section, variable))
+            data = b"".join(self._mmap[offset : offset + count] for offset, count in chunks)
+            try:
+                return data.decode()
+            except UnicodeDecodeError:
+                return data.decode("Latin-1")
+
+        values = self.read_array(section, variable).tolist()
+        if len(values) == 1:
+            return values[0]
+        return values
+
+    def read_many(self, variables: Iterable[Tuple[str, str]], default: Any = _no_default) -> List[Any]:
+        """Read multiple variables from the rkf file at once, see :meth:`TrackKFReader.read_many`.
+        The locations of the variables are looked up in the index, after which they are decoded directly from the memory-mapped file."""
+        ret = []
+        for section, variable in variables:
+            if default is not _no_default and (section, variable) not in self:
+                self.tracker.append((section, variable))
+                ret.append(default)
+                continue
+            ret.append(self.read(section, variable))
+        return ret
+
+
+def _evict() -> None:
+    """Remove least recently used readers from the cache until it is within the limits again. Readers that are in use are skipped."""
+    with _lock:
+        for path in list(_cache):
+            too_many = max_readers is not None and len(_cache) > max_readers
+            too_large = max_bytes is not None and sum(_sizes.values()) > max_bytes
+            if not (too_many or too_large):
+                return
+
+            if _refcounts[path] > 0:
+                continue
+
+            _remove(path)
+            _statistics["evictions"] += 1
+
+
+def _log_access(reader: plams.KFReader) -> None:
+    """Add the variables tracked by a reader to the access logs, see :func:`track_access`."""
+    for log in _access_logs:
+        log.update((reader.path, section, variable) for section, variable in getattr(reader, "tracker", []))
+
+
+def _remove(path: str) -> None:
+    _log_access(_cache[path])
+    del _cache[path]
+    _sizes.pop(path, None)
+    _refcounts.pop(path, None)
+    _pending_unload.discard(path)
+
 
 def store(reader: plams.KFReader) -> None:
     """Store an rkf reader in the cache. It can later be indexed by its path.
@@ -39,14 +343,24 @@ def store(reader: plams.KFReader) -> None:
     Args:
         reader: An rkf file reader object."""
     path = reader.path
-    _cache[path] = reader
+    with _lock:
+        _cache[path] = reader
+        _cache.move_to_end(path)
+        _sizes[path] = os.path.getsize(path)
+        _evict()
+
+
+# the reader classes used for each backend
+_backends = {"plams": TrackKFReader, "mmap": MmapKFReader}
 
 
-def get(path: str) -> plams.KFReader:
+def get(path: str, backend: Optional[str] = None) -> plams.KFReader:
     """Retrieve an rkf reader from storage using its path. If the file was not opened yet, open it first and then store and return the new object.
 
     Args:
         path: path to the rkf file location.
+        backend: the backend used to open the file, either "plams" or "mmap". Defaults to :data:`default_backend`.
+            If the file was opened before using a different backend it is opened again using the requested backend, unless the reader is in use (see :func:`opened`).
 
     Returns:
         An rkf file reader that can be used for reading data from a calculation.
@@ -54,26 +368,160 @@ def get(path: str) -> plams.KFReader:
     if not path:
         return None
 
-    # if the path is already in the cache, simply return it
-    if path in _cache:
-        return _cache[path]
+    backend = backend or default_backend
+    if backend not in _backends:
+        raise ValueError(f"Unknown rkf reader backend {backend}, must be one of {list(_backends)}")
+
+    with _lock:
+        # if the path is already in the cache, simply return it
+        if path in _cache and (type(_cache[path]) is _backends[backend] or _refcounts[path] > 0):
+            _statistics["hits"] += 1
+            _cache.move_to_end(path)
+            return _cache[path]
+
+        _statistics["misses"] += 1
+
     # else we will load the rkf file and store it in the cache
-    reader = TrackKFReader(path)
-    store(reader)
-    return reader
+    # the file is opened without holding the lock, so that other threads can open other files at the same time
+    reader = _backends[backend](path)
+    with _lock:
+        # another thread could have opened the same file in the meantime
+        if path in _cache and (type(_cache[path]) is _backends[backend] or _refcounts[path] > 0):
+            _cache.move_to_end(path)
+            return _cache[path]
+
+        store(reader)
+        return reader
+
+
+@contextlib.contextmanager
+def opened(path: str) -> Iterator[plams.KFReader]:
+    """Context manager that retrieves an rkf reader using :func:`get` and marks it as in use until the context is closed.
+    Readers that are in use are not evicted from the cache and are not unloaded by nested functions calling :func:`unload`.
+    Unloading is instead postponed until the reader is not used anymore.
+
+    Args:
+        path: path to the rkf file location.
+
+    Example:
+        .. code-block:: python
+
+            with cache.opened(files["ams.rkf"]) as reader_ams:
+                # functions called here can get and unload the same reader without it being removed from the cache
+                get_ams_version(calc_dir)
+                reader_ams.read("General", "termination status")
+    """
+    reader = get(path)
+    with _lock:
+        _refcounts[path] += 1
+    try:
+        yield reader
+    finally:
+        with _lock:
+            _refcounts[path] -= 1
+            if _refcounts[path] <= 0 and path in _cache:
+                if path in _pending_unload:
+                    _remove(path)
+                else:
+                    _evict()
 
 
 def unload(arg: Union[str, plams.KFReader]):
     """Delete an rkf reader from storage. Since rkf files can be quite large, we should not forget to unload them after we have finished reading from them, lest we run into memory issues.
+    If the reader is still in use (see :func:`opened`) it will be deleted once it is not in use anymore.
 
     Args:
         arg: Either a path pointing to the rkf file location or the reader itself."""
-    # if the arg is a key in the cache we will delete the key
-    if arg in _cache:
-        del _cache[arg]
-        return
-    # if it is not a key, find the key corresponding to the value and delete it
-    if arg in _cache.values():
-        key = [key for key, val in _cache.items() if val == arg][0]
-        del _cache[key]
-        return
+    with _lock:
+        # if the arg is not a key we get the path from the reader itself
+        if not isinstance(arg, str):
+            if _cache.get(getattr(arg, "path", None)) is not arg:
+                return
+            arg = arg.path
+
+        if arg not in _cache:
+            return
+
+        if _refcounts[arg] > 0:
+            _pending_unload.add(arg)
+            return
+
+        _remove(arg)
+
+
+def unload_directory(directory: str):
+    """Delete all rkf readers for files stored in a directory or its subdirectories.
+
+    Args:
+        directory: path to the directory, e.g. the working directory of a calculation."""
+    # the separator is added so that e.g. calc_1 does not unload readers belonging to calc_10
+    prefix = os.path.join(os.path.abspath(directory), "")
+    with _lock:
+        for key in [key for key in _cache if key.startswith(prefix)]:
+            unload(key)
+
+
+def clear() -> None:
+    """Delete all rkf readers from storage, including readers that are in use."""
+    with _lock:
+        for reader in _cache.values():
+            _log_access(reader)
+        _cache.clear()
+        _sizes.clear()
+        _refcounts.clear()
+        _pending_unload.clear()
+
+
+@contextlib.contextmanager
+def track_access() -> Iterator[Set[Tuple[str, str, str]]]:
+    """Context manager that collects the variables that are accessed from rkf files opened using the cache.
+    The variables tracked by readers (see :class:`TrackKFReader`) are collected when they are removed from the cache and when the context is closed.
+
+    Yields:
+        A set that will contain (path, section, variable) tuples for each accessed variable.
+
+    Example:
+        .. code-block:: python
+
+            with cache.track_access() as accessed:
+                results.read(calc_dir)
+            # accessed now contains e.g. ("/path/to/calc_dir/adf.rkf", "Energy", "Bond Energy")
+    """
+    accessed = set()
+    with _lock:
+        _access_logs.append(accessed)
+    try:
+        yield accessed
+    finally:
+        with _lock:
+            for reader in _cache.values():
+                _log_access(reader)
+            _access_logs.remove(accessed)
+
+
+def statistics() -> Result:
+    """Get statistics about the use of the cache.
+
+    Returns:
+        :Result object containing:
+
+            - **hits (int)** – number of times a reader was retrieved from the cache.
+            - **misses (int)** – number of times a reader had to be opened.
+            - **evictions (int)** – number of readers that were removed because the cache was full.
+            - **readers (int)** – number of readers currently in the cache.
+            - **bytes (int)** – total size of the rkf files currently opened in the cache.
+    """
+    with _lock:
+        ret = Result()
+        ret.hits = _statistics["hits"]
+        ret.misses = _statistics["misses"]
+        ret.evictions = _statistics["evictions"]
+        ret.readers = len(_cache)
+        ret.bytes = sum(_sizes.values())
+        return ret
+
+
+def reset_statistics() -> None:
+    """Set the hit, miss and eviction counters back to zero."""
+    with _lock:
+        _statistics.clear()
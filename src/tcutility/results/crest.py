@@ -1,6 +1,8 @@
 import os
+from typing import List, Optional
 
 from tcutility import molecule, pathfunc
+from tcutility.results import scan
 from tcutility.results.result import Result
 
 j = os.path.join
@@ -17,7 +19,7 @@ def get_calc_files(calc_dir: str) -> Result:
     """
     # collect all files in the current directory and subdirectories
     files = []
-    for root, _, files_ in os.walk(calc_dir):
+    for root, files_ in scan.scan(calc_dir):
         files.extend([j(root, file) for file in files_])
     files = sorted(files, key=pathfunc.path_depth, reverse=True)
 
@@ -189,6 +191,43 @@ def get_input(info: Result) -> Result:
     return ret
 
 
+def _get_calculation_status(lines: Optional[List[str]]) -> Result:
+    """Determine the status of the calculation from the lines of its output file, see :func:`get_calculation_status`.
+    The lines can also be just the end of the output file, see :func:`get_quick_status`. If there is no output file ``lines`` should be ``None``."""
+    ret = Result()
+    ret.fatal = True
+    ret.name = None
+    ret.code = None
+    ret.reasons = []
+
+    if lines is None:
+        ret.reasons.append("Calculation status unknown")
+        ret.name = "UNKNOWN"
+        ret.code = "U"
+        return ret
+
+    if any(["[WARNING] Runtime exception occurred" in line for line in lines]):
+        ret.name = "FAILED"
+        ret.code = "F"
+
+        line_index = [i for i, line in enumerate(lines) if "[WARNING] Runtime exception occurred" in line][0]
+        for line in lines[line_index + 1 :]:
+            if "##########" in line:
+                break
+            ret.reasons.append(line.strip())
+        return ret
+
+    if any(["CREST terminated normally." in line for line in lines]):
+        ret.fatal = False
+        ret.name = "SUCCESS"
+        ret.code = "S"
+        return ret
+
+    ret.name = "FAILED"
+    ret.code = "F"
+    return ret
+
+
 def get_calculation_status(calc_dir: str) -> Result:
     """Function that returns the status of the ORCA calculation described in reader. In case of non-succes it will also give possible reasons for the errors/warnings.
 
@@ -203,40 +242,28 @@ def get_calculation_status(calc_dir: str) -> Result:
             - **name (str)** – calculation status written as a string, one of ("SUCCESS", "RUNNING", "UNKNOWN", "SUCCESS(W)", "FAILED")
             - **code (str)** – calculation status written as a single character, one of ("S", "R", "U", "W" "F")
     """
-    ret = Result()
-    ret.fatal = True
-    ret.name = None
-    ret.code = None
-    ret.reasons = []
     files = get_calc_files(calc_dir)
     if "out" not in files:
-        ret.reasons.append("Calculation status unknown")
-        ret.name = "UNKNOWN"
-        ret.code = "U"
-        return ret
+        return _get_calculation_status(None)
 
     with open(files.out) as out:
-        lines = out.readlines()
-        if any(["[WARNING] Runtime exception occurred" in line for line in lines]):
-            ret.fatal = True
-            ret.name = "FAILED"
-            ret.code = "F"
-
-            line_index = [i for i, line in enumerate(lines) if "[WARNING] Runtime exception occurred" in line][0]
-            for line in lines[line_index + 1 :]:
-                if "##########" in line:
-                    break
-                ret.reasons.append(line.strip())
-            return ret
-        if any(["CREST terminated normally." in line for line in lines]):
-            ret.fatal = False
-            ret.name = "SUCCESS"
-            ret.code = "S"
-            return ret
+        return _get_calculation_status(out.readlines())
 
-    ret.name = "FAILED"
-    ret.code = "F"
-    return ret
+
+def get_quick_status(calc_dir: str) -> Result:
+    """Function that quickly returns the status of the CREST calculation. Unlike :func:`get_calculation_status` only the end of the output file is read.
+
+    Args:
+        calc_dir: path pointing to the desired calculation.
+
+    Returns:
+        :Result object containing information about the calculation status, see :func:`get_calculation_status`.
+    """
+    files = get_calc_files(calc_dir)
+    if "out" not in files:
+        return _get_calculation_status(None)
+
+    return _get_calculation_status(scan.read_tail(files.out).splitlines())
 
 
 def get_molecules(info: Result) -> Result:
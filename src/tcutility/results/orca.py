@@ -1,14 +1,54 @@
+import functools
 import os
+from typing import Callable, Iterable, Union
 
 import numpy as np
 from scm import plams
 
 from tcutility import constants, slurm
+from tcutility.results import scan
 from tcutility.results.result import Result
 
 j = os.path.join
 
 
+# extensions of binary files written by ORCA, these are never input or output files so we do not have to read them
+_binary_extensions = (".gbw", ".densities", ".cis", ".qro", ".uno", ".unso", ".uco", ".loc", ".tmp")
+
+
+def _get_file_type(path: str, head_only: bool = False) -> Union[str, None]:
+    """Determine whether a file is an ORCA output file ("out") or input file ("inp").
+    The file is read line-by-line and we stop reading as soon as the type of the file is known.
+    If ``head_only`` is enabled, only the start of the file is read (see :func:`tcutility.results.scan.read_head`)."""
+    if path.endswith(_binary_extensions):
+        return
+
+    if head_only:
+        return _get_lines_type(scan.read_head(path).splitlines())
+
+    with open(path, errors="ignore") as f:
+        return _get_lines_type(f)
+
+
+def _get_lines_type(lines: Iterable[str]) -> Union[str, None]:
+    has_main = False
+    has_system = False
+    for line in lines:
+        # the output file contains the ORCA banner
+        if "* O   R   C   A *" in line:
+            return "out"
+
+        # there should be lines starting with ! and also the system line, starting with * xyz, * xyzfile, * gzmtfile or * int
+        if line.startswith("!"):
+            has_main = True
+        if not has_system:
+            split = line.split()
+            has_system = len(split) > 2 and split[0] == "*" and split[1] in ["xyz", "xyzfile", "gzmtfile", "int"]
+
+        if has_main and has_system:
+            return "inp"
+
+
 def get_calc_files(calc_dir: str) -> Result:
     """Function that returns files relevant to ORCA calculations stored in ``calc_dir``.
 
@@ -20,29 +60,268 @@ def get_calc_files(calc_dir: str) -> Result:
     """
     # collect all files in the current directory and subdirectories
     files = []
-    for root, _, files_ in os.walk(calc_dir):
+    for root, files_ in scan.scan(calc_dir):
         files.extend([j(root, file) for file in files_])
 
     # we now go through all the files and check their nature
     ret = Result()
     ret.root = os.path.abspath(calc_dir)
     for file in files:
-        with open(file, errors="ignore") as f:
-            lines = f.readlines()
-            # detect the output file
-            if any(["* O   R   C   A *" in line for line in lines]):
-                ret.out = os.path.abspath(file)
-                continue
-
-            # detect the input file
-            # there should be lines starting with ! and also the system line, starting with * xyz, * xyzfile, * gzmtfile or * int
-            if any([line.startswith("!") for line in lines]) and any([(len(line.split()) > 2 and line.split()[0] == "*" and line.split()[1] in ["xyz", "xyzfile", "gzmtfile", "int"]) for line in lines]):
-                ret.inp = os.path.abspath(file)
-                continue
+        file_type = _get_file_type(file)
+        if file_type is not None:
+            ret[file_type] = os.path.abspath(file)
 
     return ret
 
 
+class _OutputLines:
+    """Iterator over the stripped lines of an ORCA output file.
+    Lines can be pushed back, so that a section handler can stop reading at the header of the next section and let that section be handled as well."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = iter(lines)
+        self.pushed_back = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.pushed_back:
+            return self.pushed_back.pop()
+        return next(self.lines).strip()
+
+    def push_back(self, line: str):
+        self.pushed_back.append(line)
+
+
+# handlers for lines and sections of the output file, stored as (marker, handler) pairs in the order they are checked
+_handlers = []
+
+
+def _handler(marker: str):
+    """Register a function that handles the ORCA output starting from a line containing ``marker``.
+    Only the first matching handler is called for each line. Handlers are called as ``handler(line, lines, data)``,
+    where ``lines`` are the remaining lines in the output file and ``data`` is the Result object to store the parsed data in.
+    Handlers that read a section of the output should only consume the lines belonging to that section.
+    Errors raised by a handler are ignored, the data it could not parse is simply missing from the result."""
+
+    def decorator(func: Callable[[str, _OutputLines, Result], None]):
+        _handlers.append((marker, func))
+        return func
+
+    return decorator
+
+
+@_handler("Program Version")
+def _handle_version(line, lines, data):
+    if "version" not in data.keys():
+        data.version = line.split()[2]
+
+
+@_handler("INPUT FILE")
+def _handle_input(line, lines, data):
+    if "input_lines" in data.keys():
+        return
+
+    input_lines = []
+    for line in lines:
+        input_lines.append(line)
+        if "****END OF INPUT****" in line:
+            break
+
+    # skip the header and the end of the input block and remove the line numbers
+    data.input_lines = [line.split(">")[1] for line in input_lines[2:-1] if line.split(">")[1].strip()]
+
+
+@_handler("ORCA TERMINATED NORMALLY")
+def _handle_termination(line, lines, data):
+    data.terminated_normally = True
+
+
+@_handler("THE OPTIMIZATION HAS CONVERGED")
+def _handle_optimization_converged(line, lines, data):
+    data.optimization_converged = True
+
+
+@_handler("CARTESIAN COORDINATES (ANGSTROEM)")
+def _handle_coordinates(line, lines, data):
+    # we only need the first coordinates after the optimization converged
+    if "optimization_converged" not in data.keys() or "optimized_coordinates" in data.keys():
+        return
+
+    coords = []
+    for line in lines:
+        if len(line) == 0:
+            break
+        coords.append(line)
+
+    # the first line is a separator
+    data.optimized_coordinates = coords[1:]
+
+
+@_handler("VIBRATIONAL FREQUENCIES")
+def _handle_frequencies(line, lines, data):
+    if "frequency_lines" in data.vibrations.keys():
+        return
+
+    freq_lines = []
+    for i, line in enumerate(lines, start=1):
+        if len(line) == 0 and i > 4:
+            break
+        if ":" in line:
+            freq_lines.append(line)
+    data.vibrations.frequency_lines = freq_lines
+
+
+@_handler("NORMAL MODES")
+def _handle_normal_modes(line, lines, data):
+    if "mode_lines" in data.vibrations.keys():
+        return
+
+    mode_lines = []
+    for line in lines:
+        # the IR spectrum directly follows the normal modes
+        if "IR SPECTRUM" in line:
+            lines.push_back(line)
+            break
+        if "NORMAL MODES" in line:
+            continue
+        mode_lines.append(line)
+    data.vibrations.mode_lines = mode_lines
+
+
+@_handler("IR SPECTRUM")
+def _handle_ir_spectrum(line, lines, data):
+    if "intensity_lines" in data.vibrations.keys():
+        return
+
+    int_lines = []
+    for line in lines:
+        if "The epsilon (eps) is given for a Dirac delta lineshape." in line:
+            break
+        int_lines.append(line)
+    data.vibrations.intensity_lines = int_lines
+
+
+@_handler("FINAL SINGLE POINT ENERGY")
+def _handle_single_point_energy(line, lines, data):
+    data.energy.bond = float(line.split()[4]) * constants.HA2KCALMOL
+
+
+@_handler("E(0)")
+def _handle_hf_energy(line, lines, data):
+    data.energy.HF = float(line.split()[-1]) * constants.HA2KCALMOL
+
+
+@_handler("Final correlation energy")
+def _handle_correlation_energy(line, lines, data):
+    data.energy.corr = float(line.split()[-1]) * constants.HA2KCALMOL
+
+
+@_handler("E(MP2)")
+def _handle_mp2_energy(line, lines, data):
+    data.energy.MP2 = float(line.split()[-1]) * constants.HA2KCALMOL + data.energy.HF
+    data.energy.MP2_corr = float(line.split()[-1]) * constants.HA2KCALMOL
+
+
+@_handler("E(CCSD) ")
+def _handle_ccsd_energy(line, lines, data):
+    data.energy.CCSD = float(line.split()[-1]) * constants.HA2KCALMOL
+    data.energy.CCSD_corr = float(line.split()[-1]) * constants.HA2KCALMOL - data.energy.HF
+
+
+@_handler("E(CCSD(T))")
+def _handle_ccsd_t_energy(line, lines, data):
+    data.energy.CCSD_T = float(line.split()[-1]) * constants.HA2KCALMOL
+    data.energy.CCSD_T_corr = float(line.split()[-1]) * constants.HA2KCALMOL - data.energy.HF
+
+
+@_handler("Final Gibbs free energy")
+def _handle_gibbs_energy(line, lines, data):
+    data.energy.gibbs = float(line.split()[-2]) * constants.HA2KCALMOL
+
+
+@_handler("Total enthalpy")
+def _handle_enthalpy(line, lines, data):
+    data.energy.enthalpy = float(line.split()[-2]) * constants.HA2KCALMOL
+
+
+@_handler("Final entropy term")
+def _handle_entropy(line, lines, data):
+    data.energy.entropy = float(line.split()[-2])
+
+
+@_handler("T1 diagnostic")
+def _handle_t1(line, lines, data):
+    data.t1 = float(line.split()[3])
+
+
+@_handler("Expectation value of <S**2>")
+def _handle_s2(line, lines, data):
+    data.s2 = float(line.split()[-1])
+
+
+@_handler("Ideal value")
+def _handle_s2_expected(line, lines, data):
+    data.s2_expected = float(line.split()[-1])
+
+
+def parse_lines(lines: Iterable[str]) -> Result:
+    """Parse the lines of an ORCA output file in a single pass. Every line is checked for the markers of the registered handlers,
+    which then parse the line or the section that starts at that line.
+
+    Args:
+        lines: the lines of the ORCA output file. They can be given as an iterator, e.g. an opened file, so that the file does not have to be loaded into memory.
+
+    Returns:
+        :Result object containing the parsed output:
+
+            - **version (str)** – the full ORCA version string.
+            - **input_lines (list[str])** – the lines of the input file as they are printed in the output file.
+            - **terminated_normally (bool)** – whether ORCA terminated normally.
+            - **optimized_coordinates (list[str])** – lines with the coordinates of the molecule after the geometry optimization converged.
+            - **vibrations (Result)** – the lines containing the vibrational frequencies, normal modes and IR intensities.
+            - **energy (Result)** – the energies printed in the output file (|kcal/mol|), see :func:`get_properties`.
+            - **t1 (float)**, **s2 (float)**, **s2_expected (float)** – the T1 diagnostic and (expected) :math:`S^2` expectation values.
+    """
+    data = Result()
+    data.energy = {}
+    data.vibrations = {}
+    lines = _OutputLines(lines)
+    for line in lines:
+        for marker, handler in _handlers:
+            if marker in line:
+                # a section that cannot be parsed should not prevent reading the rest of the output
+                try:
+                    handler(line, lines, data)
+                except Exception:
+                    pass
+                break
+    return data
+
+
+@functools.lru_cache(maxsize=4)
+def _parse_output_file(path: str, mtime: int, size: int) -> Result:
+    with open(path, errors="ignore") as out:
+        return parse_lines(out)
+
+
+def parse_output(path: str) -> Result:
+    """Parse an ORCA output file in a single pass, see :func:`parse_lines`.
+    The last few parsed files are cached, so that the functions reading different parts of the output only read the file once.
+    Changes to the file are detected using its modification time and size.
+
+    Args:
+        path: path pointing to the ORCA output file.
+
+    Returns:
+        :Result object containing the parsed output, see :func:`parse_lines`. This object is shared and should not be modified.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _parse_output_file(path, stat.st_mtime_ns, stat.st_size)
+
+
 def get_version(info: Result) -> Result:
     """Function to get the ORCA version used in the calculation.
 
@@ -57,13 +336,13 @@ def get_version(info: Result) -> Result:
             - **minor (str)** – minor ORCA version.
             - **micro (str)** – micro ORCA version.
     """
-    ret = Result()
-    with open(info.files.out) as out:
-        for line in out.readlines():
-            line = line.strip()
+    # the version is printed at the start of the output, so we do not have to parse the whole file
+    with open(info.files.out, errors="ignore") as out:
+        for line in out:
             if "Program Version" not in line:
                 continue
             version = line.split()[2]
+            ret = Result()
             ret.full = version
             ret.major = version.split(".")[0]
             ret.minor = version.split(".")[1]
@@ -93,22 +372,7 @@ def get_input(info: Result) -> Result:
             lines = inp.readlines()
     # if we don't have it we read the output file, which contains the input as a block
     else:
-        with open(info.files.out) as out:
-            start_reading = False
-            lines = []
-            for line in out.readlines():
-                line = line.strip()
-                if start_reading:
-                    lines.append(line)
-
-                if "INPUT FILE" in line:
-                    start_reading = True
-                    continue
-
-                if "****END OF INPUT****" in line:
-                    break
-
-        lines = [line.split(">")[1] for line in lines[2:-1] if line.split(">")[1].strip()]
+        lines = parse_output(info.files.out).get("input_lines", [])
 
     ret.main = []
     curr_section = None
@@ -254,40 +518,41 @@ def get_calculation_status(calc_dir: str) -> Result:
             - **name (str)** – calculation status written as a string, one of ("SUCCESS", "RUNNING", "UNKNOWN", "SUCCESS(W)", "FAILED")
             - **code (str)** – calculation status written as a single character, one of ("S", "R", "U", "W" "F")
     """
+    return _get_calculation_status(get_calc_files(calc_dir))
+
+
+def _get_calculation_status(files: Result) -> Result:
     ret = Result()
     ret.fatal = True
     ret.name = None
     ret.code = None
     ret.reasons = []
 
-    files = get_calc_files(calc_dir)
-
     # if we do not have an output file the calculation failed
-    if "out" not in files.out:
+    if "out" not in files:
         ret.reasons.append("Calculation status unknown")
         ret.name = "UNKNOWN"
         ret.code = "U"
         return ret
 
     # try to read if the calculation succeeded
-    with open(files.out) as out:
-        lines = out.readlines()
-        if any(["ORCA TERMINATED NORMALLY" in line for line in lines]):
-            ret.fatal = False
-            ret.name = "SUCCESS"
-            ret.code = "S"
-            return ret
+    if parse_output(files.out).get("terminated_normally", False):
+        ret.fatal = False
+        ret.name = "SUCCESS"
+        ret.code = "S"
+        return ret
 
     # if it didnt we default to failed
     ret.name = "FAILED"
     ret.code = "F"
 
     # otherwise we check if the job is being managed by slurm
-    if not slurm.workdir_info(os.path.abspath(files.root)):
+    job = slurm.workdir_info(os.path.abspath(files.root))
+    if not job:
         return ret
 
     # get the statuscode from the workdir
-    state = slurm.workdir_info(os.path.abspath(files.root)).statuscode
+    state = job.statuscode
     state_name = {"CG": "COMPLETING", "CF": "CONFIGURING", "PD": "PENDING", "R": "RUNNING"}.get(state, "UNKNOWN")
 
     ret.fatal = False
@@ -298,6 +563,46 @@ def get_calculation_status(calc_dir: str) -> Result:
     return ret
 
 
+def get_quick_status(calc_dir: str) -> Result:
+    """Function that quickly returns the status of the ORCA calculation. Unlike :func:`get_calculation_status` only the start of the text files is read until the output file is found,
+    and only the end of the output file is read to find the termination message.
+
+    Args:
+        calc_dir: path pointing to the desired calculation.
+
+    Returns:
+        :Result object containing information about the calculation status, see :func:`get_calculation_status`.
+    """
+    ret = Result()
+    ret.fatal = True
+    ret.name = None
+    ret.code = None
+    ret.reasons = []
+
+    # the ORCA banner is printed at the start of the output file, so we stop at the first file that starts with it
+    out = None
+    for root, files_ in scan.scan(calc_dir):
+        out = next((j(root, file) for file in files_ if _get_file_type(j(root, file), head_only=True) == "out"), None)
+        if out is not None:
+            break
+
+    if out is None:
+        ret.reasons.append("Calculation status unknown")
+        ret.name = "UNKNOWN"
+        ret.code = "U"
+        return ret
+
+    if "ORCA TERMINATED NORMALLY" in scan.read_tail(out):
+        ret.fatal = False
+        ret.name = "SUCCESS"
+        ret.code = "S"
+        return ret
+
+    ret.name = "FAILED"
+    ret.code = "F"
+    return ret
+
+
 def get_molecules(info: Result) -> Result:
     """Function that returns information about the molecules for this calculation.
 
@@ -315,30 +620,8 @@ def get_molecules(info: Result) -> Result:
     ret.input = info.input.system.molecule
     ret.number_of_atoms = len(ret.input.atoms)
 
-    with open(info.files.out) as out:
-        lines = out.readlines()
-        lines = [line.strip() for line in lines]
-
-    start_reading = False
-    look_for_coords = False
-    coords = []
-    for line in lines:
-        if start_reading:
-            if len(line) == 0:
-                start_reading = False
-                break
-
-            coords.append(line)
-
-        if "THE OPTIMIZATION HAS CONVERGED" in line:
-            look_for_coords = True
-
-        if look_for_coords and "CARTESIAN COORDINATES (ANGSTROEM)" in line:
-            look_for_coords = False
-            start_reading = True
-
     ret.output = plams.Molecule()
-    for coord in coords[1:]:
+    for coord in parse_output(info.files.out).get("optimized_coordinates", []):
         sym, x, y, z = coord.split()
         ret.output.add_atom(plams.Atom(symbol=sym, coords=[float(x), float(y), float(z)]))
 
@@ -378,7 +661,7 @@ def get_info(calc_dir: str) -> Result:
     ret.version = get_version(ret)
 
     # store the calculation status
-    ret.status = get_calculation_status(calc_dir)
+    ret.status = _get_calculation_status(ret.files)
 
     # read molecules
     ret.molecule = get_molecules(ret)
@@ -402,21 +685,13 @@ def get_vibrations(lines):
             - **modes (list[float])** – list of vibrational modes sorted from low frequency to high frequency.
             - **character (str)** – the PES character of the molecular system. Either "minimum", "transitionstate" or "saddlepoint(n_imag)", for 0, 1, n_imag number of imaginary frequencies.
     """
-    ret = Result()
-    start_reading = False
-    start_reading_idx = 0
-    freq_lines = []
-    for i, line in enumerate(lines):
-        if start_reading:
-            if len(line) == 0 and (i - start_reading_idx) > 4:
-                break
-            if ":" in line:
-                freq_lines.append(line)
+    return _get_vibrations(parse_lines(lines).vibrations)
 
-        if "VIBRATIONAL FREQUENCIES" in line:
-            start_reading = True
-            start_reading_idx = i
 
+def _get_vibrations(vibrations: Result) -> Result:
+    """Build the vibrational data from the parsed output, see :func:`get_vibrations`."""
+    ret = Result()
+    freq_lines = vibrations.get("frequency_lines", [])
     ret.number_of_modes = len(freq_lines)
     frequencies = [float(line.split()[1]) for line in freq_lines]
     nrotranslational = sum([freq == 0 for freq in frequencies])
@@ -424,21 +699,7 @@ def get_vibrations(lines):
     ret.number_of_imaginary_modes = len([freq for freq in ret.frequencies if freq < 0])
     ret.character = "minimum" if ret.number_of_imaginary_modes == 0 else "transitionstate" if ret.number_of_imaginary_modes == 1 else f"saddlepoint({ret.number_of_imaginary_modes})"
 
-    start_reading = False
-    mode_lines = []
-    for i, line in enumerate(lines):
-        if "NORMAL MODES" in line:
-            start_reading = True
-            continue
-
-        if "IR SPECTRUM" in line:
-            start_reading = False
-            break
-
-        if start_reading:
-            mode_lines.append(line)
-
-    mode_lines = mode_lines[6:-3]
+    mode_lines = vibrations.get("mode_lines", [])[6:-3]
     mode_lines = [[float(x) for x in line.split()[1:]] for i, line in enumerate(mode_lines) if i % (ret.number_of_modes + 1) != 0]
 
     nblocks = len(mode_lines) // ret.number_of_modes
@@ -447,21 +708,7 @@ def get_vibrations(lines):
         blocks.append(np.array(mode_lines[block * ret.number_of_modes : (block + 1) * ret.number_of_modes]))
     ret.modes = np.hstack(blocks).T.tolist()[nrotranslational:]
 
-    start_reading = False
-    int_lines = []
-    for i, line in enumerate(lines):
-        if "IR SPECTRUM" in line:
-            start_reading = True
-            continue
-
-        if "The epsilon (eps) is given for a Dirac delta lineshape." in line:
-            start_reading = False
-            break
-
-        if start_reading:
-            int_lines.append(line)
-
-    ints = [float(line.split()[3]) for line in int_lines[5:-1]]
+    ints = [float(line.split()[3]) for line in vibrations.get("intensity_lines", [])[5:-1]]
     ret.intensities = [0] * ret.number_of_imaginary_modes + ints
     return ret
 
@@ -494,64 +741,18 @@ def get_properties(info: Result) -> Result:
     """
     ret = Result()
 
-    with open(info.files.out) as out:
-        lines = [line.strip() for line in out.readlines()]
+    # the output file is only read once, the energies and vibrations are parsed at the same time
+    output = parse_output(info.files.out)
 
     if info.orca.frequencies:
-        ret.vibrations = get_vibrations(lines)
-
-    # read some important info about the calculation
-    for line in lines:
-        if "FINAL SINGLE POINT ENERGY" in line:
-            ret.energy.bond = float(line.split()[4]) * constants.HA2KCALMOL
-            continue
-
-        if "E(0)" in line:
-            ret.energy.HF = float(line.split()[-1]) * constants.HA2KCALMOL
-            continue
-
-        if "Final correlation energy" in line:
-            ret.energy.corr = float(line.split()[-1]) * constants.HA2KCALMOL
-            continue
-
-        if "E(MP2)" in line:
-            ret.energy.MP2 = float(line.split()[-1]) * constants.HA2KCALMOL + ret.energy.HF
-            ret.energy.MP2_corr = float(line.split()[-1]) * constants.HA2KCALMOL
-            continue
-
-        if "E(CCSD) " in line:
-            ret.energy.CCSD = float(line.split()[-1]) * constants.HA2KCALMOL
-            ret.energy.CCSD_corr = float(line.split()[-1]) * constants.HA2KCALMOL - ret.energy.HF
-            continue
+        ret.vibrations = _get_vibrations(output.vibrations)
 
-        if "E(CCSD(T))" in line:
-            ret.energy.CCSD_T = float(line.split()[-1]) * constants.HA2KCALMOL
-            ret.energy.CCSD_T_corr = float(line.split()[-1]) * constants.HA2KCALMOL - ret.energy.HF
-            continue
-
-        if "Final Gibbs free energy" in line:
-            ret.energy.gibbs = float(line.split()[-2]) * constants.HA2KCALMOL
-            continue
-
-        if "Total enthalpy" in line:
-            ret.energy.enthalpy = float(line.split()[-2]) * constants.HA2KCALMOL
-            continue
-
-        if "Final entropy term" in line:
-            ret.energy.entropy = float(line.split()[-2])
-            continue
-
-        if "T1 diagnostic" in line:
-            ret.t1 = float(line.split()[3])
-            continue
+    for key, value in output.energy.items():
+        ret.energy[key] = value
 
-        if "Expectation value of <S**2>" in line:
-            ret.s2 = float(line.split()[-1])
-            continue
-
-        if "Ideal value" in line:
-            ret.s2_expected = float(line.split()[-1])
-            continue
+    for key in ["t1", "s2", "s2_expected"]:
+        if key in output.keys():
+            ret[key] = output[key]
 
     if ret.s2 and ret.s2_expected:
         ret.spin_contamination = (ret.s2 - ret.s2_expected) / ret.s2_expected
@@ -5,46 +5,60 @@ This information is used in further analysis programs.
 
 """
 
+import concurrent.futures
+import functools
 import os
 import pathlib as pl
-from typing import Union
+from typing import Dict, Iterable, Iterator, Tuple, Union
 
-from tcutility import slurm
-from tcutility.results import adf, ams, cache, crest, dftb, orca, xtb
+from tcutility import connect, slurm
+from tcutility.results import adf, ams, cache, crest, dftb, orca, remote, result_cache, scan, xtb
 from tcutility.results.result import Result
 
-__all__ = ["get_info", "read", "quick_status"]
+__all__ = ["get_info", "read", "read_many", "quick_status", "quick_status_many"]
 
 
-def get_info(calc_dir: str):
-    try:
-        return ams.get_ams_info(calc_dir)
-    except:  # noqa
-        pass
-
-    try:
+def _get_engine_info(engine: str, calc_dir: str, lazy: bool = False, guess_bonds: bool = False) -> Result:
+    if engine == "ams":
+        return ams.get_ams_info(calc_dir, lazy=lazy, guess_bonds=guess_bonds)
+    if engine == "orca":
         return orca.get_info(calc_dir)
-    except:  # noqa
-        pass
-
-    try:
+    if engine == "xtb":
         return xtb.get_info(calc_dir)
-    except:  # noqa
-        pass
-
-    try:
+    if engine == "crest":
         return crest.get_info(calc_dir)
-    except:  # noqa
-        pass
+
+
+def get_info(calc_dir: str, lazy: bool = False, guess_bonds: bool = False):
+    # the directory is scanned only once and the file index is shared with all engines
+    with scan.shared_scan(calc_dir) as index:
+        # first try the engine that matches the files in the directory
+        detected_engine = scan.detect_engine(index)
+        if detected_engine is not None:
+            try:
+                return _get_engine_info(detected_engine, calc_dir, lazy=lazy, guess_bonds=guess_bonds)
+            except:  # noqa
+                pass
+
+        # if that did not work we try the other engines one by one
+        for engine in ["ams", "orca", "xtb", "crest"]:
+            if engine == detected_engine:
+                continue
+
+            try:
+                return _get_engine_info(engine, calc_dir, lazy=lazy, guess_bonds=guess_bonds)
+            except:  # noqa
+                pass
 
     res = Result()
 
     # if we cannot correctly read the info, we return some generic result object
     # before that, we check the job status by checking slurm
-    if slurm.workdir_info(os.path.abspath(calc_dir)):
+    job = slurm.workdir_info(os.path.abspath(calc_dir))
+    if job:
         res.engine = "unknown"
 
-        state = slurm.workdir_info(os.path.abspath(calc_dir)).statuscode
+        state = job.statuscode
         state_name = {"CG": "COMPLETING", "CF": "CONFIGURING", "PD": "PENDING", "R": "RUNNING"}.get(state, "UNKNOWN")
 
         res.status.fatal = False
@@ -69,63 +83,206 @@ def get_info(calc_dir: str):
     return res
 
 
-def read(calc_dir: Union[str, pl.Path]) -> Result:
+def _read_section(info: Result, key: str, getter, calc_dir: str, lazy: bool = False, catch_errors: bool = True):
+    """Read a section of the results using an engine-specific getter and store it in ``info``.
+
+    Args:
+        info: the results read so far, they are passed to the getter.
+        key: the key to store the section at.
+        getter: the function used to read the section.
+        calc_dir: the calculation directory. rkf files associated with it are unloaded after reading a lazy section.
+        lazy: whether to only read the section when it is first accessed.
+        catch_errors: whether to set the section to ``None`` if reading fails, instead of raising the error.
+    """
+
+    def read_section():
+        try:
+            return getter(info)
+        except:  # noqa
+            if not catch_errors:
+                raise
+            return None
+        finally:
+            # sections that are read lazily must clean up their own rkf readers
+            if lazy:
+                cache.unload_directory(calc_dir)
+
+    if lazy:
+        info.set_lazy(key, read_section)
+    else:
+        info[key] = read_section()
+
+
+def read(calc_dir: Union[str, pl.Path], persistent_cache: bool = False, lazy: bool = False, server: "connect.Server" = None, guess_bonds: bool = False) -> Result:
     """Master function for reading data from calculations. It reads general information as well as engine-specific information.
 
     Args:
         calc_dir: path pointing to the working directory for the desired calculation
+        persistent_cache: whether to store the results on disk and reuse them in later calls, see :mod:`tcutility.results.result_cache`.
+            Results are only reused if the files of the calculation did not change.
+        lazy: whether to read expensive sections (e.g. ``properties``, ``history`` and ``molecule``) only when they are first accessed.
+            This is useful if you only need a small part of the results of many calculations, for example only ``res.properties.energy.bond``.
+            Storing the results using ``persistent_cache`` will load all sections.
+        server: the server the calculation is stored on. If given, the calculation is read on the server and only the results are transferred, see :mod:`tcutility.results.remote`.
+            Results read on a server are never lazy.
+        guess_bonds: whether to guess the bonds of the molecules in ``history.molecule``. Guessing bonds is slow for long trajectories, so it is disabled by default.
+            Results read with bond guessing enabled are not stored using ``persistent_cache``, and results read on a server never have guessed bonds.
 
     Returns:
         dictionary containing information about the calculation
     """
     calc_dir = str(calc_dir) if isinstance(calc_dir, pl.Path) else calc_dir
 
-    ret = Result()
+    if server is not None and not isinstance(server, connect.Local):
+        return remote.read(calc_dir, server, persistent_cache=persistent_cache)
 
-    ret.update(get_info(calc_dir))
-    if ret.engine == "adf":
-        try:
-            ret.adf = adf.get_calc_settings(ret)
-        except:  # noqa
-            ret.adf = None
+    # the stored results do not have guessed bonds
+    persistent_cache = persistent_cache and not guess_bonds
+    if persistent_cache:
+        ret = result_cache.get(calc_dir)
+        if ret is not None:
+            return ret
 
-        try:
-            ret.properties = adf.get_properties(ret)
-        except:  # noqa
-            ret.properties = None
+    ret = Result()
 
-        try:
-            ret.level = adf.get_level_of_theory(ret)
-        except:  # noqa
-            ret.level = None
+    ret.update(get_info(calc_dir, lazy=lazy, guess_bonds=guess_bonds))
+
+    if ret.engine == "adf":
+        _read_section(ret, "adf", adf.get_calc_settings, calc_dir, lazy=lazy)
+        _read_section(ret, "properties", adf.get_properties, calc_dir, lazy=lazy)
+        _read_section(ret, "level", adf.get_level_of_theory, calc_dir, lazy=lazy)
 
     elif ret.engine == "dftb":
-        ret.dftb = dftb.get_calc_settings(ret)
-        ret.properties = dftb.get_properties(ret)
+        _read_section(ret, "dftb", dftb.get_calc_settings, calc_dir, lazy=lazy, catch_errors=False)
+        _read_section(ret, "properties", dftb.get_properties, calc_dir, lazy=lazy, catch_errors=False)
     elif ret.engine == "xtb":
         # ret.xtb = xtb.get_calc_settings(ret)
-        ret.properties = xtb.get_properties(ret)
+        _read_section(ret, "properties", xtb.get_properties, calc_dir, lazy=lazy, catch_errors=False)
 
     elif ret.engine == "orca":
-        try:
-            ret.orca = orca.get_calc_settings(ret)
-        except:  # noqa
-            ret.orca = None
-
-        try:
-            ret.properties = orca.get_properties(ret)
-        except:  # noqa
-            ret.properties = None
+        _read_section(ret, "orca", orca.get_calc_settings, calc_dir, lazy=lazy)
+        _read_section(ret, "properties", orca.get_properties, calc_dir, lazy=lazy)
 
     # unload cached KFReaders associated with this calc_dir
-    to_delete = [key for key in cache._cache if key.startswith(os.path.abspath(calc_dir))]
-    [cache.unload(key) for key in to_delete]
+    cache.unload_directory(calc_dir)
+
+    if persistent_cache:
+        result_cache.store(calc_dir, ret)
+
     return ret
 
 
+def _init_read_worker():
+    """Give every worker process its own empty KFReader cache, instead of a copy of the cache of the parent process."""
+    cache.clear()
+
+
+def read_many(calc_dirs: Iterable[Union[str, pl.Path]], workers: int = None, backend: str = "process", persistent_cache: bool = False, server: "connect.Server" = None) -> Iterator[Tuple[str, Result]]:
+    """Read many calculations in parallel using :func:`read`. Results are yielded as soon as they are finished, which means that they are not necessarily in the same order as ``calc_dirs``.
+
+    Args:
+        calc_dirs: paths pointing to the working directories of the calculations to read.
+        workers: the number of workers to read with. Defaults to the number of CPUs on this machine.
+            If set to ``1`` the calculations are read serially in the current process.
+        backend: the type of worker to use, either ``"process"`` or ``"thread"``.
+            Processes circumvent the global interpreter lock and are therefore faster for large numbers of calculations.
+            Threads have lower overhead and are useful when reading is limited by the speed of the filesystem.
+        persistent_cache: whether to store the results on disk and reuse them in later calls, see :func:`read`.
+        server: the server the calculations are stored on. If given, the calculations are read on the server in a single batch and only the results are transferred,
+            see :func:`tcutility.results.remote.read_many`. In that case ``workers`` is the number of processes used on the server and defaults to ``1``.
+
+    Yields:
+        Tuples of the calculation directory and the :class:`Result <tcutility.results.result.Result>` object obtained by :func:`read`.
+
+    Example:
+        .. code-block:: python
+
+            from tcutility import pathfunc, results
+
+            calc_dirs = pathfunc.get_subdirectories('calculations')
+            for calc_dir, res in results.read.read_many(calc_dirs, workers=8):
+                print(calc_dir, res.properties.energy.bond)
+    """
+    if backend not in ["process", "thread"]:
+        raise ValueError(f'Unknown backend "{backend}", must be one of "process" or "thread"')
+
+    if server is not None and not isinstance(server, connect.Local):
+        yield from remote.read_many(calc_dirs, server, workers=workers or 1, persistent_cache=persistent_cache)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    calc_dirs = iter(str(calc_dir) for calc_dir in calc_dirs)
+    read_ = functools.partial(read, persistent_cache=persistent_cache)
+
+    if workers == 1:
+        for calc_dir in calc_dirs:
+            yield calc_dir, read_(calc_dir)
+        return
+
+    if backend == "process":
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_read_worker)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        # we only keep a limited number of calculations in flight
+        # this prevents us from having to hold all results in memory when reading many calculations
+        pending = {}
+        for calc_dir in calc_dirs:
+            pending[executor.submit(read_, calc_dir)] = calc_dir
+            if len(pending) < 4 * workers:
+                continue
+
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+        for future in concurrent.futures.as_completed(pending):
+            yield pending[future], future.result()
+
+
+def _quick_status(calc_dir: str, slurm_snapshot: slurm.SlurmSnapshot) -> Result:
+    status = Result()
+    status.name = "UNKNOWN"
+    status.reasons = []
+    status.fatal = True
+    status.code = "U"
+
+    engines = {"ams": ams, "orca": orca, "crest": crest, "xtb": xtb}
+    with scan.shared_scan(calc_dir) as index:
+        # we first try the engine that matches the files in the directory
+        detected_engine = scan.detect_engine(index)
+        order = sorted(engines, key=lambda engine: engine != detected_engine)
+        for engine in order:
+            try:
+                status = engines[engine].get_quick_status(calc_dir)
+                if status.name != "UNKNOWN":
+                    break
+            except Exception:
+                pass
+
+    # calculations that did not finish successfully could still be managed by slurm
+    job = slurm_snapshot.get_workdir(os.path.abspath(calc_dir))
+    if status.name not in ["UNKNOWN", "FAILED"] or job is None:
+        return status
+
+    state = job.statuscode
+    state_name = {"CG": "COMPLETING", "CF": "CONFIGURING", "PD": "PENDING", "R": "RUNNING"}.get(state, "UNKNOWN")
+
+    status = Result()
+    status.fatal = False
+    status.name = state_name
+    status.code = state
+    status.reasons = []
+
+    return status
+
+
 def quick_status(calc_dir: Union[str, pl.Path]) -> Result:
     """
     Quickly check the status of a calculation.
+    Only the start and end of output files, or the termination status in rkf files, are read.
+    If the calculation did not finish successfully we check if it is being managed by slurm.
 
     Args:
         calc_dir: the directory of the calculation to check.
@@ -140,30 +297,27 @@ def quick_status(calc_dir: Union[str, pl.Path]) -> Result:
             - **code (str)** – calculation status written as one or two characters, one of ("S", "R", "U", "W" "F")
                 If the job is being managed by slurm it can also take values of ("CG", "CF", "PD").
     """
-    status = Result()
-    status.name = "UNKNOWN"
-    status.reasons = []
-    status.fatal = True
-    status.code = "U"
-    for engine in [ams, orca, crest, xtb]:
-        try:
-            status = engine.get_calculation_status(calc_dir)
-            if status.name != "UNKNOWN":
-                return status
-        except Exception:
-            pass
-
-    # otherwise we check if the job is being managed by slurm
-    if not slurm.workdir_info(calc_dir):
-        return status
+    return _quick_status(str(calc_dir), slurm.snapshot())
 
-    # get the statuscode from the workdir
-    state = slurm.workdir_info(calc_dir).statuscode
-    state_name = {"CG": "COMPLETING", "CF": "CONFIGURING", "PD": "PENDING", "R": "RUNNING"}.get(state, "UNKNOWN")
 
-    status.fatal = False
-    status.name = state_name
-    status.code = state
-    status.reasons = []
+def quick_status_many(calc_dirs: Iterable[Union[str, pl.Path]], workers: int = 1) -> Dict[str, Result]:
+    """
+    Quickly check the status of many calculations, see :func:`quick_status`.
+    squeue is only called once and its output is shared by all calculations.
 
-    return status
+    Args:
+        calc_dirs: the directories of the calculations to check.
+        workers: the number of threads used to check the calculations.
+            Using multiple threads can be beneficial on network filesystems, where most time is spent waiting for files.
+
+    Returns:
+        A dictionary with the calculation directories as keys and their statuses as values.
+    """
+    calc_dirs = [str(calc_dir) for calc_dir in calc_dirs]
+    quick_status_ = functools.partial(_quick_status, slurm_snapshot=slurm.snapshot())
+
+    if workers == 1:
+        return {calc_dir: quick_status_(calc_dir) for calc_dir in calc_dirs}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(calc_dirs, executor.map(quick_status_, calc_dirs)))
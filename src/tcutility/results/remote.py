@@ -0,0 +1,169 @@
+"""
+Module used to read calculations that are stored on a remote server, without downloading their files.
+Calculation files, such as ``adf.rkf``, can be hundreds of MB in size, while the results obtained from them are usually small.
+
+Instead of downloading the files, a small worker is started on the server using the existing connection (see :class:`tcutility.connect.Server`).
+The worker reads the calculations using :func:`tcutility.results.read.read` and sends the results back one at a time as compressed, serialized :class:`Result <tcutility.results.result.Result>` objects.
+This requires TCutility to be installed for the Python interpreter on the server.
+
+Example:
+    .. code-block:: python
+
+        import tcutility
+        from tcutility.connect import Snellius
+        from tcutility.results.read import read_many
+
+        with Snellius() as server:
+            res = tcutility.read("calculations/water_GO", server=server)
+
+            for calc_dir, res in read_many(calc_dirs, server=server):
+                print(calc_dir, res.properties.energy.bond)
+
+.. note::
+    Results are serialized using :mod:`pickle`. Only read calculations from servers you trust.
+"""
+
+import argparse
+import base64
+import concurrent.futures
+import os
+import pickle
+import sys
+import traceback
+import zlib
+from typing import Iterable, Iterator, Tuple, Union
+
+from tcutility import connect, log
+from tcutility.results.result import Result
+
+# lines sent by the worker that contain results start with this marker, other lines (for example printed by the remote environment) are ignored
+_marker = "TCUTILITY_REMOTE_RESULT"
+
+
+def _encode(obj) -> str:
+    return base64.b64encode(zlib.compress(pickle.dumps(obj))).decode()
+
+
+def _decode(data: str):
+    return pickle.loads(zlib.decompress(base64.b64decode(data)))
+
+
+def _read_safe(calc_dir: str, persistent_cache: bool = False) -> Tuple[Union[Result, None], Union[str, None]]:
+    """Read a calculation and return the result together with the error message if reading failed."""
+    # imported here to prevent circular imports, the read module imports this module
+    from tcutility.results.read import read
+
+    try:
+        return read(os.path.expanduser(calc_dir), persistent_cache=persistent_cache), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _serve(calc_dirs: Iterable[str], workers: int = 1, persistent_cache: bool = False, stream=None):
+    """Read calculations and write the results to a stream, in the same order as the calculation directories. This is run on the server."""
+    stream = stream or sys.stdout
+    calc_dirs = list(calc_dirs)
+
+    if workers == 1:
+        results = (_read_safe(calc_dir, persistent_cache) for calc_dir in calc_dirs)
+        for calc_dir, (res, error) in zip(calc_dirs, results):
+            # the result starts on a new line, in case something was printed without a newline while reading
+            stream.write(f"\n{_marker} {_encode((calc_dir, res, error))}\n")
+            stream.flush()
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_read_safe, calc_dirs, [persistent_cache] * len(calc_dirs))
+        for calc_dir, (res, error) in zip(calc_dirs, results):
+            stream.write(f"\n{_marker} {_encode((calc_dir, res, error))}\n")
+            stream.flush()
+
+
+def read_many(calc_dirs: Iterable[str], server: connect.Server, workers: int = 1, persistent_cache: bool = False, python: str = None) -> Iterator[Tuple[str, Result]]:
+    """
+    Read calculations stored on a server. The calculations are read on the server and only the results are sent back.
+
+    Args:
+        calc_dirs: paths on the server pointing to the working directories of the calculations. Relative paths are relative to the current directory of the server.
+        server: the server the calculations are stored on. If it is not connected yet, a connection is opened for the duration of this call.
+        workers: the number of processes used to read the calculations on the server. Keep this low when running on a login node.
+        persistent_cache: whether to use the persistent cache on the server, see :func:`tcutility.results.read.read`.
+        python: the Python interpreter on the server that has TCutility installed. By default the interpreter found using ``which python`` is used.
+
+    Yields:
+        Tuples of the calculation directory and the :class:`Result <tcutility.results.result.Result>` object, in the same order as ``calc_dirs``.
+        Results are yielded as soon as they are received.
+
+    Raises:
+        RuntimeError: if some calculations could not be read. The error is raised after all other results were yielded.
+    """
+    # imported here to prevent circular imports, the job module depends on the results module
+    from tcutility.job.generic import _python_path
+
+    calc_dirs = [str(calc_dir) for calc_dir in calc_dirs]
+    if not calc_dirs:
+        return
+
+    # calculations on this machine can be read directly
+    if isinstance(server, connect.Local):
+        from tcutility.results.read import read
+
+        for calc_dir in calc_dirs:
+            yield calc_dir, read(calc_dir, persistent_cache=persistent_cache)
+        return
+
+    opened = not hasattr(server, "client")
+    if opened:
+        server.__enter__()
+
+    try:
+        python = python or _python_path(server)
+        command = f"cd {server.currdir} && {python} -m tcutility.results.remote --workers {workers}"
+        if persistent_cache:
+            command += " --persistent-cache"
+        log.debug(f"{server}: reading {len(calc_dirs)} calculations")
+        stdout, stderr = server._exec_with_input(command, "".join(f"{calc_dir}\n" for calc_dir in calc_dirs).encode())
+
+        received = 0
+        errors = []
+        for line in stdout:
+            if isinstance(line, bytes):
+                line = line.decode()
+            if not line.startswith(_marker):
+                continue
+
+            calc_dir, res, error = _decode(line.split(" ", 1)[1])
+            received += 1
+            if error is not None:
+                errors.append(f"{calc_dir}:\n{error}")
+                continue
+            yield calc_dir, res
+
+        if received < len(calc_dirs):
+            errors.append(stderr.read().decode())
+        if errors:
+            raise RuntimeError(f"Could not read {len(errors)} calculation(s) on {server}:\n" + "\n".join(errors))
+    finally:
+        if opened:
+            server.__exit__()
+
+
+def read(calc_dir: str, server: connect.Server, persistent_cache: bool = False, python: str = None) -> Result:
+    """
+    Read a single calculation stored on a server, see :func:`read_many`.
+    """
+    for _, res in read_many([calc_dir], server, persistent_cache=persistent_cache, python=python):
+        return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read calculations whose directories are given on the standard input and write the serialized results to the standard output.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--persistent-cache", action="store_true")
+    args = parser.parse_args()
+
+    _serve((line.rstrip("\n") for line in sys.stdin if line.strip()), workers=args.workers, persistent_cache=args.persistent_cache)
+
+
+if __name__ == "__main__":
+    main()
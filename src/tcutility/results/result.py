@@ -1,8 +1,10 @@
 """Module containing the TCutility.results.result.Result class."""
 
+import collections.abc
 import copy
 import sys
-from typing import Optional, TypeVar
+import weakref
+from typing import Any, Callable, Iterator, Optional, Tuple, TypeVar
 
 import dictfunc
 from scm import plams
@@ -10,6 +12,94 @@ from scm import plams
 T = TypeVar("T")
 
 
+class _LazyValue:
+    """Wrapper around a function whose return value is only computed once it is accessed from a Result object, see :meth:`Result.set_lazy`."""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], Any]):
+        self.func = func
+
+    def __repr__(self):
+        return "<not loaded>"
+
+
+def _is_hidden(key: str) -> bool:
+    return key.startswith("__") and key.endswith("__")
+
+
+class _ParentRef:
+    """Weak reference to the parent of a Result object that was created automatically, see :meth:`Result.get_parent_tree`.
+    Parents are not copied when the reference is created and they are not compared when comparing Result objects."""
+
+    __slots__ = ("ref",)
+
+    def __init__(self, parent: "Result"):
+        self.ref = weakref.ref(parent)
+
+    def __call__(self) -> Optional["Result"]:
+        return self.ref()
+
+    def __eq__(self, other):
+        return isinstance(other, _ParentRef)
+
+    def __repr__(self):
+        return "<parent>"
+
+
+class _ResultKeysView(collections.abc.KeysView):
+    """View on the keys of a Result object that skips hidden keys."""
+
+    def __iter__(self) -> Iterator[str]:
+        for key in dict.__iter__(self._mapping):
+            if not _is_hidden(key):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key) -> bool:
+        return dict.__contains__(self._mapping, key) and not _is_hidden(key)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+
+class _ResultItemsView(collections.abc.ItemsView):
+    """View on the items of a Result object that skips hidden keys. Values are retrieved using :meth:`Result.__getitem__`, so lazy values are loaded."""
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for key in _ResultKeysView(self._mapping):
+            yield key, self._mapping[key]
+
+    def __len__(self) -> int:
+        return len(_ResultKeysView(self._mapping))
+
+    def __contains__(self, item) -> bool:
+        key, value = item
+        if key not in _ResultKeysView(self._mapping):
+            return False
+        val = self._mapping[key]
+        return val is value or val == value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+
+class _ResultValuesView(collections.abc.ValuesView):
+    """View on the values of a Result object that skips hidden keys. Values are retrieved using :meth:`Result.__getitem__`, so lazy values are loaded."""
+
+    def __iter__(self) -> Iterator[Any]:
+        for key in _ResultKeysView(self._mapping):
+            yield self._mapping[key]
+
+    def __len__(self) -> int:
+        return len(_ResultKeysView(self._mapping))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+
 class Result(dict):
     """Class used for storing results from AMS calculations. The class is functionally a dictionary, but allows dot notation to access variables in the dictionary.
     The class works case-insensitively, but will retain the case of the key when it was first set."""
@@ -17,14 +107,18 @@ class Result(dict):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # the index maps lowercase keys to the keys as they are stored in this object
+        # it is used for case-insensitive lookups and is kept up-to-date whenever keys are added or removed
+        object.__setattr__(self, "_Result__index", {})
+
         # if we are casting an object to a Result object
         # we will copy all data to this one and all dictionaries will be turned into Result object
-        # turn every value into a Result object if possible
-        for key, value in self.items():
+        for key, value in list(super().items()):
+            key_ = self.__index.setdefault(key.lower(), key)
             if isinstance(value, dict):
-                self[key] = Result(value)
-            else:
-                self[key] = value
+                value = Result(value)
+            if isinstance(value, dict) or key_ != key:
+                super().__setitem__(key_, value)
 
     def __call__(self):
         """Calling of a dictionary subclass should not be possible, instead we raise an error with information about the key and method that were attempted to be called."""
@@ -38,12 +132,23 @@ class Result(dict):
     def items(self):
         """We override the items method from dict in order to skip certain keys. We want to hide keys starting and ending
         with dunders, as they should not be exposed to the user.
+        Just like :meth:`dict.items` this returns a view, so the Result object should not be resized while iterating over it.
         """
-        return [(key, self[key]) for key in self.keys()]
+        return _ResultItemsView(self)
 
     def keys(self):
-        original_keys = super().keys()
-        return [key for key in original_keys if not (key.startswith("__") and key.endswith("__"))]
+        """Return a view on the keys of this object, skipping hidden keys that start and end with dunders."""
+        return _ResultKeysView(self)
+
+    def values(self):
+        """Return a view on the values of this object, skipping hidden keys that start and end with dunders. Lazy values are loaded, see :meth:`set_lazy`."""
+        return _ResultValuesView(self)
+
+    def get(self, key, default=None):
+        """Return the value of a key if it is set, otherwise return ``default``. Like item access this is case-insensitive and lazy values are loaded."""
+        if isinstance(key, str) and not _is_hidden(key) and key.lower() in self.__index:
+            return self.__getitem__(key)
+        return super().get(key, default)
 
     def multi_keys(self):
         """
@@ -74,10 +179,18 @@ class Result(dict):
         return mks
 
     def __getitem__(self, key):
-        if key.startswith("__") and key.endswith("__"):
+        if _is_hidden(key):
             return None
-        self.__set_empty(key)
-        val = super().__getitem__(self.__get_case(key))
+
+        key_ = self.__index.get(key.lower())
+        if key_ is None:
+            return self.__set_empty(key)
+
+        val = super().__getitem__(key_)
+        # lazy values are computed the first time they are accessed and then replace the lazy value
+        if isinstance(val, _LazyValue):
+            self.__setitem__(key_, val.func())
+            val = super().__getitem__(key_)
         return val
 
     def __getattr__(self, key) -> Optional[T]:
@@ -87,14 +200,76 @@ class Result(dict):
         # we set the item, but if it is a dict we convert the dict to a Result first
         if isinstance(val, dict):
             val = Result(val)
-        super().__setitem__(self.__get_case(key), val)
+        super().__setitem__(self.__index.setdefault(key.lower(), key), val)
+
+    def __delitem__(self, key):
+        key_ = self.__get_case(key)
+        super().__delitem__(key_)
+        del self.__index[key_.lower()]
+
+    def pop(self, key, *args):
+        key_ = self.__get_case(key)
+        if super().__contains__(key_):
+            del self.__index[key_.lower()]
+        return super().pop(key_, *args)
+
+    def popitem(self):
+        key, val = super().popitem()
+        if self.__index.get(key.lower()) == key:
+            del self.__index[key.lower()]
+        return key, val
+
+    def setdefault(self, key, default=None):
+        if self.__get_case(key) not in self.keys():
+            self.__setitem__(key, default)
+        return self.__getitem__(key)
+
+    def update(self, *args, **kwargs):
+        # entries of dictionaries are copied as they are stored, so that lazy values stay lazy
+        for other in args + (kwargs,):
+            items = dict.items(other) if isinstance(other, dict) else dict(other).items()
+            for key, val in items:
+                self.__setitem__(key, val)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self.__index.clear()
 
     def __setattr__(self, key, val):
         self.__setitem__(key, val)
 
+    def set_lazy(self, key: str, func: Callable[[], Any]):
+        """
+        Set a value that is only computed when it is first accessed.
+        This is useful for values that are expensive to obtain, but are not always needed.
+
+        Args:
+            key: the key to set the value to.
+            func: function without arguments that returns the value. It is called the first time the key is accessed.
+
+        Example:
+            .. code-block:: python
+
+                >>> res = Result()
+                >>> res.set_lazy('history', lambda: ams.get_history(calc_dir))
+                >>> res.history  # get_history is only called here
+        """
+        super().__setitem__(self.__index.setdefault(key.lower(), key), _LazyValue(func))
+
+    def is_loaded(self, key: str) -> bool:
+        """
+        Check whether a key has been loaded. Only values set using :meth:`set_lazy` that have not been accessed yet are not loaded.
+        """
+        return not isinstance(super().get(self.__get_case(key)), _LazyValue)
+
     def __contains__(self, key):
         # Custom method to check if the key is defined in this object and is also non-empty, case-insensitive.
-        return key.lower() in [key_.lower() for key_ in self.keys()] and self[key]
+        key_ = self.__index.get(key.lower())
+        return key_ is not None and not _is_hidden(key_) and self[key]
 
     def __hash__(self):
         """Hashing of a dictionary subclass should not be possible, instead we should raise an error to let the user know
@@ -103,11 +278,13 @@ class Result(dict):
         raise KeyError(f"Tried to hash {self.get_parent_tree()}, but it is empty")
 
     def __reduce__(self):
-        return "TCutility.results.result.Result"
+        """Pickle this object as a plain dictionary of its visible items.
+        Hidden keys (such as ``__parent__``) are skipped, so that objects can be sent between processes without dragging their parents along."""
+        return (self.__class__, (dict(self.items()),))
 
     def __bool__(self):
         """Make sure that keys starting and ending in "__" are skipped"""
-        return len([key for key in self.keys() if not (key.startswith("__") and key.endswith("__"))]) > 0
+        return any(True for _ in self.keys())
 
     def __sizeof__(self):
         """
@@ -127,30 +304,30 @@ class Result(dict):
     def get_parent_tree(self):
         """Method to get the path from this object to the parent object. The result is presented in a formatted string"""
         # every parent except the top-most parent has defined a __parent__ attribute
-        if "__parent__" not in self:
+        parent = super().get("__parent__")
+        if not isinstance(parent, _ParentRef) or parent() is None:
             return "Head"
         # iteratively build the tree using the __name__ attribute.
-        parent_names = self.__parent__.get_parent_tree()
-        parent_names += "." + self.__name__
+        parent_names = parent().get_parent_tree()
+        parent_names += "." + super().get("__name__")
         return parent_names
 
     def __set_empty(self, key):
-        # This function checks if the key has been set.
-        # If it has not, we create a new Result object and set it at the desired key
-        if self.__get_case(key) not in self.keys():
-            val = Result()
-            # we also keep track of the parent of this object and also the name it was assigned to for later bookkeeping
-            val.__parent__ = self
-            val.__name__ = key
-            self.__setitem__(key, val)
+        # This function is called when a key has not been set yet.
+        # We create a new Result object and set it at the desired key
+        val = Result()
+        # we also keep track of the parent of this object and also the name it was assigned to for later bookkeeping
+        # the parent is stored as a weak reference, so that we do not have to copy it
+        val.__parent__ = _ParentRef(self)
+        val.__name__ = key
+        # val is already a Result object, so we can store it without converting it
+        super().__setitem__(self.__index.setdefault(key.lower(), key), val)
+        return val
 
     def __get_case(self, key):
         # Get the case of the key as it has been set in this object.
         # The first time a key-value pair has been assigned the case of the key will be set.
-        for key_ in self:
-            if key_.lower() == key.lower():
-                return key_
-        return key
+        return self.__index.get(key.lower(), key)
 
     def prune(self):
         """Remove empty paths of this object."""
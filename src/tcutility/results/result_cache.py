@@ -0,0 +1,148 @@
+"""
+Module that stores fully read calculations on disk, so that they can be loaded without opening any rkf or output files again.
+Calculations are stored in an SQLite database in the platform dependent cache directory that is also used by :func:`tcutility.cache_file`.
+A stored calculation is only returned if none of the files found for it (see e.g. :func:`tcutility.results.ams.get_calc_files`)
+and none of the directories containing them have changed size or modification time since they were stored.
+Calculations stored by a different version of TCutility are not returned either, as the readers may have changed.
+"""
+
+import contextlib
+import importlib.metadata
+import json
+import os
+import pickle
+import sqlite3
+from typing import Iterator, List, Union
+
+from tcutility.cache import _cache_dir
+from tcutility.results.result import Result
+
+# path to the database file, can be changed to store results in a different location
+database_path = os.path.join(_cache_dir, "results.sqlite")
+
+# only calculations with these statuses are stored, as running or pending calculations will still change
+_finished_statuses = ["SUCCESS", "SUCCESS(W)", "FAILED"]
+
+# stored calculations are only returned if they were stored using the same version, see :func:`_version`
+# increase the format version when the readers or the Result class change in a way that invalidates stored calculations
+_format_version = 1
+try:
+    _tcutility_version = importlib.metadata.version("TCutility")
+except importlib.metadata.PackageNotFoundError:
+    _tcutility_version = "unknown"
+
+
+def _version() -> str:
+    """The version stored together with the calculations. It consists of the version of TCutility and the format version."""
+    return f"{_tcutility_version}-{_format_version}"
+
+
+@contextlib.contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """Open the database. Changes are committed and the connection is closed when the context is closed."""
+    connection = sqlite3.connect(database_path, timeout=60)
+    try:
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS results (path TEXT PRIMARY KEY, version TEXT, files TEXT, fingerprint TEXT, data BLOB)")
+            # databases written by older versions do not store the version of the calculations, so we start over
+            if "version" not in [column[1] for column in connection.execute("PRAGMA table_info(results)")]:
+                connection.execute("DROP TABLE results")
+                connection.execute("CREATE TABLE results (path TEXT PRIMARY KEY, version TEXT, files TEXT, fingerprint TEXT, data BLOB)")
+            yield connection
+    finally:
+        connection.close()
+
+
+def _get_file_paths(files: Result) -> List[str]:
+    """Collect the paths to the files of a calculation, together with the directories they are stored in.
+    Including the directories ensures that we also notice newly created files."""
+    paths = []
+    for key, val in files.items():
+        if key == "root":
+            continue
+        # some engines (e.g. xtb) store a list of extra files
+        paths.extend(val if isinstance(val, list) else [val])
+
+    paths.extend({os.path.dirname(path) for path in paths})
+    return sorted(paths)
+
+
+def _fingerprint(paths: List[str]) -> Union[str, None]:
+    """Get the fingerprint for a list of files. It is built from the modification times and sizes of the files.
+    Returns ``None`` if one of the files does not exist anymore."""
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stats.append((path, stat.st_mtime_ns, stat.st_size))
+    return json.dumps(stats)
+
+
+def get(calc_dir: str) -> Union[Result, None]:
+    """Retrieve a previously stored calculation.
+
+    Args:
+        calc_dir: path pointing to the working directory of the calculation.
+
+    Returns:
+        The stored :class:`Result <tcutility.results.result.Result>` object, or ``None`` if the calculation was not stored, if its files changed since it was stored
+        or if it was stored using a different version of TCutility.
+    """
+    if not os.path.exists(database_path):
+        return None
+
+    with _connect() as connection:
+        row = connection.execute("SELECT version, files, fingerprint, data FROM results WHERE path = ?", (os.path.abspath(calc_dir),)).fetchone()
+
+    if row is None:
+        return None
+
+    version, files, fingerprint, data = row
+    if version != _version() or _fingerprint(json.loads(files)) != fingerprint:
+        return None
+
+    return pickle.loads(data)
+
+
+def store(calc_dir: str, res: Result) -> bool:
+    """Store a calculation on disk. Calculations that are not finished yet or whose files could not be determined are not stored.
+
+    Args:
+        calc_dir: path pointing to the working directory of the calculation.
+        res: the :class:`Result <tcutility.results.result.Result>` object obtained by reading the calculation.
+
+    Returns:
+        Whether the calculation was stored.
+    """
+    if res.status.name not in _finished_statuses or not res.files:
+        return False
+
+    paths = _get_file_paths(res.files)
+    fingerprint = _fingerprint(paths)
+    if fingerprint is None:
+        return False
+
+    with _connect() as connection:
+        connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (os.path.abspath(calc_dir), _version(), json.dumps(paths), fingerprint, pickle.dumps(res)))
+
+    return True
+
+
+def unload(calc_dir: str) -> None:
+    """Remove a calculation from the on-disk storage.
+
+    Args:
+        calc_dir: path pointing to the working directory of the calculation."""
+    if not os.path.exists(database_path):
+        return
+
+    with _connect() as connection:
+        connection.execute("DELETE FROM results WHERE path = ?", (os.path.abspath(calc_dir),))
+
+
+def clear() -> None:
+    """Remove all stored calculations."""
+    if os.path.exists(database_path):
+        os.remove(database_path)
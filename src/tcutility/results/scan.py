@@ -0,0 +1,181 @@
+"""
+Module that scans calculation directories for files.
+Every engine needs to know which files are present in a calculation directory (see e.g. :func:`tcutility.results.ams.get_calc_files`).
+Scanning a directory is slow on network filesystems, so :func:`shared_scan` can be used to scan a directory once and share the file index with all functions that need it.
+The file index is also used to detect which engine was used for a calculation, without having to try to read it with every engine.
+To quickly check files for markers, such as termination messages, :func:`read_head` and :func:`read_tail` only read the start or end of a file.
+"""
+
+import collections
+import contextlib
+import fnmatch
+import os
+import threading
+from typing import Iterator, List, Optional, Tuple, Union
+
+from tcutility import pathindex
+
+# a file index is a list of directories and the names of the files they contain
+FileIndex = List[Tuple[str, List[str]]]
+
+# file indices that are currently shared, indexed by their absolute directory path
+_shared = {}
+_refcounts = collections.Counter()
+_lock = threading.RLock()
+
+# the number of bytes read by read_head and read_tail
+head_size = 4 * 1024
+tail_size = 16 * 1024
+
+# file name patterns that are unique to each engine, the engines are checked in this order
+# CREST runs xTB internally, so it must be checked before xTB
+engine_signatures = {
+    "ams": ["ams.rkf", "*.ams.rkf"],
+    "crest": ["crest_best.xyz", "crest_conformers.xyz", "crest_rotamers.xyz", "crest.energies"],
+    "xtb": ["xtbopt.xyz", "xtbopt.log", "xtbscan.log", "xtbrestart", "xtbtopo.mol", ".xtboptok"],
+    "orca": ["*.gbw", "*.inp", "*_property.txt", "*.engrad", "*_trj.xyz"],
+}
+
+
+def _scan(calc_dir: str) -> FileIndex:
+    """Scan a directory and its subdirectories using :func:`os.scandir`. The order of the directories is the same as for :func:`os.walk`."""
+    index = []
+
+    def scan_directory(path: str):
+        dirs = []
+        files = []
+        try:
+            with os.scandir(path) as scanner:
+                for entry in scanner:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        dirs.append(entry)
+                    else:
+                        files.append(entry.name)
+        except OSError:
+            return
+
+        index.append((path, files))
+        # just like os.walk we do not follow symbolic links to directories
+        for entry in dirs:
+            if not entry.is_symlink():
+                scan_directory(entry.path)
+
+    scan_directory(os.path.abspath(calc_dir))
+    return index
+
+
+def scan(calc_dir: str) -> FileIndex:
+    """Get the files that are present in a directory and its subdirectories.
+    If the directory is being shared using :func:`shared_scan` or is part of an index opened using :func:`tcutility.pathindex.open` the directory is not scanned again.
+
+    Args:
+        calc_dir: path pointing to the directory to scan.
+
+    Returns:
+        A list of tuples containing absolute paths to directories and the names of the files stored in them, similar to :func:`os.walk`.
+    """
+    with _lock:
+        if os.path.abspath(calc_dir) in _shared:
+            return _shared[os.path.abspath(calc_dir)]
+
+    index = pathindex.get(calc_dir)
+    if index is not None:
+        return index.files(calc_dir)
+
+    return _scan(calc_dir)
+
+
+@contextlib.contextmanager
+def shared_scan(calc_dir: str) -> Iterator[FileIndex]:
+    """Context manager that scans a directory once and shares the result with every call to :func:`scan` for the same directory until the context is closed.
+
+    Args:
+        calc_dir: path pointing to the directory to scan.
+
+    Example:
+        .. code-block:: python
+
+            with scan.shared_scan(calc_dir):
+                # the directory is only scanned once
+                ams.get_calc_files(calc_dir)
+                ams.get_calculation_status(calc_dir)
+    """
+    path = os.path.abspath(calc_dir)
+    with _lock:
+        index = _shared.get(path)
+
+    # the directory is scanned without holding the lock, so that other threads can scan other directories at the same time
+    if index is None:
+        index = scan(path)
+
+    with _lock:
+        # another thread could have started sharing the same directory in the meantime
+        index = _shared.setdefault(path, index)
+        _refcounts[path] += 1
+
+    try:
+        yield index
+    finally:
+        with _lock:
+            _refcounts[path] -= 1
+            if _refcounts[path] <= 0:
+                del _shared[path]
+                del _refcounts[path]
+
+
+def detect_engine(index: FileIndex) -> Union[str, None]:
+    """Detect the engine used for a calculation from the names of its files.
+
+    Args:
+        index: the file index of the calculation directory, see :func:`scan`.
+
+    Returns:
+        The name of the engine ("ams", "crest", "xtb" or "orca"), or ``None`` if the engine could not be detected.
+    """
+    filenames = {filename for _, files in index for filename in files}
+    for engine, patterns in engine_signatures.items():
+        if any(fnmatch.filter(filenames, pattern) for pattern in patterns):
+            return engine
+
+
+def read_head(path: str, size: Optional[int] = None) -> str:
+    """Read the start of a file. Bytes that cannot be decoded are ignored.
+
+    Args:
+        path: path to the file to read.
+        size: the number of bytes to read. Defaults to :data:`head_size`.
+
+    Returns:
+        The first ``size`` bytes of the file as a string.
+    """
+    size = size or head_size
+    with open(path, "rb") as file:
+        data = file.read(size)
+    return data.decode(errors="ignore")
+
+
+def read_tail(path: str, size: Optional[int] = None) -> str:
+    """Read the end of a file by seeking from the end. Bytes that cannot be decoded are ignored.
+
+    Args:
+        path: path to the file to read.
+        size: the number of bytes to read. Defaults to :data:`tail_size`.
+
+    Returns:
+        The last ``size`` bytes of the file as a string. If the file is larger than ``size`` the first, possibly incomplete, line is skipped.
+    """
+    size = size or tail_size
+    with open(path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        file_size = file.tell()
+        file.seek(max(0, file_size - size))
+        data = file.read()
+
+    if file_size > size:
+        data = data.split(b"\n", 1)[-1]
+    return data.decode(errors="ignore")
@@ -0,0 +1,402 @@
+"""
+Module used to convert many :class:`Result <tcutility.results.result.Result>` objects into tables.
+Values are selected using multi-keys (e.g. ``"properties.energy.bond"``, see :meth:`Result.get_multi_key <tcutility.results.result.Result.get_multi_key>`) and are collected column by column in batches.
+Array-like values, such as coordinates, vibrational frequencies and VDD charges, are stored as NumPy arrays.
+The tables can be written to Parquet, Feather or HDF5 files, which can later be (memory-mapped and) loaded without having to read the calculations again.
+
+Example:
+    .. code-block:: python
+
+        from tcutility import pathfunc
+        from tcutility.results import table
+
+        calc_dirs = pathfunc.get_subdirectories("calculations")
+        table.write("calculations.feather", calc_dirs, ["files.root", "properties.energy.bond", "molecule.output", "properties.vibrations.frequencies"])
+
+        # the data can then be loaded with e.g. pandas or pyarrow
+        import pyarrow.feather
+        data = pyarrow.feather.read_table("calculations.feather", memory_map=True)
+"""
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from scm import plams
+
+from tcutility import environment
+from tcutility.results.read import read
+from tcutility.results.result import Result
+
+# file extensions that are recognized by write
+_formats = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".h5": "hdf5",
+    ".hdf5": "hdf5",
+    ".hdf": "hdf5",
+}
+
+# the maximum number of rows that are merged into the first batch to determine the column types, see _typed_batches
+type_lookahead_rows = 10000
+
+Batch = Dict[str, List[Any]]
+
+
+def _get_value(res: Result, key: str) -> Any:
+    """Get the value of a multi-key without creating empty Result objects for missing keys."""
+    data = res
+    for keypart in key.split("."):
+        if not isinstance(data, dict):
+            return None
+        # Result objects look up keys case-insensitively and get does not create empty Result objects
+        data = data.get(keypart)
+
+    return _convert_value(data, key)
+
+
+def _convert_value(value: Any, key: str) -> Any:
+    """Convert a value to a type that can be stored in a column. Sequences and molecules are converted to NumPy arrays."""
+    if isinstance(value, dict):
+        if not value:
+            return None
+        raise ValueError(f'The value of key "{key}" is not a single value, please use one of its multi-keys instead')
+
+    if isinstance(value, plams.Molecule):
+        return value.as_array()
+
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value)
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+def iter_batches(results: Iterable[Union[Result, str]], keys: List[str], batch_size: int = 1000) -> Iterator[Batch]:
+    """Collect values from Result objects in column batches.
+
+    Args:
+        results: the Result objects to collect the values from. Paths to calculation directories are read using :func:`tcutility.results.read`.
+        keys: the multi-keys of the values to collect, they are also used as column names.
+        batch_size: the maximum number of rows in each batch.
+
+    Yields:
+        Dictionaries with the keys as column names and lists of values as columns.
+        Missing values are ``None`` and array-like values are NumPy arrays.
+    """
+    batch = {key: [] for key in keys}
+    nrows = 0
+    for res in results:
+        if not isinstance(res, dict):
+            res = read(res)
+
+        for key in keys:
+            batch[key].append(_get_value(res, key))
+        nrows += 1
+
+        if nrows == batch_size:
+            yield batch
+            batch = {key: [] for key in keys}
+            nrows = 0
+
+    if nrows > 0:
+        yield batch
+
+
+def _is_array_column(values: List[Any]) -> bool:
+    return any(isinstance(value, np.ndarray) for value in values)
+
+
+def _has_values(values: List[Any]) -> bool:
+    return any(value is not None and not (isinstance(value, np.ndarray) and value.size == 0) for value in values)
+
+
+def _typed_batches(batches: Iterable[Batch]) -> Iterator[Batch]:
+    """The column types are determined from the first batch that is written.
+    To make sure we know the type of every column, we merge the first batches until every column contains at least one value.
+    At most :data:`type_lookahead_rows` rows are merged, columns that are still empty after that are stored as floats."""
+    batches = iter(batches)
+    first = None
+    nrows = 0
+    for batch in batches:
+        if first is None:
+            first = batch
+        else:
+            for key, values in batch.items():
+                first[key].extend(values)
+        nrows += len(next(iter(batch.values()), []))
+
+        if all(_has_values(values) for values in first.values()) or nrows >= type_lookahead_rows:
+            break
+
+    if first is not None:
+        yield first
+    yield from batches
+
+
+def _array_column_parts(values: List[Any], key: str):
+    """Split a column of arrays into the concatenated arrays, the offsets of each row and a mask for missing rows.
+    The arrays are concatenated along their first axis, so all other dimensions should be the same for every row."""
+    arrays = [np.asarray(value) if value is not None else None for value in values]
+    arrays = [array.reshape(1) if array is not None and array.ndim == 0 else array for array in arrays]
+    # empty arrays do not contribute any values and could have a different type and shape
+    present = [array for array in arrays if array is not None and array.size > 0]
+    present = present or [array for array in arrays if array is not None]
+
+    trailing_shape = present[0].shape[1:]
+    if any(array.shape[1:] != trailing_shape for array in present):
+        raise ValueError(f'Arrays of key "{key}" must have the same shape except for their first dimension')
+
+    lengths = [len(array) if array is not None and array.size > 0 else 0 for array in arrays]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    flat = np.concatenate(present)
+    mask = np.array([array is None for array in arrays])
+    return flat, offsets, mask
+
+
+def _arrow_column(values: List[Any], key: str, type=None):
+    import pyarrow as pa
+
+    if not _is_array_column(values):
+        # columns that are completely empty are stored as floats
+        if type is None and all(value is None for value in values):
+            type = pa.float64()
+        return pa.array(values, type=type)
+
+    flat, offsets, mask = _array_column_parts(values, key)
+    inner = pa.array(flat.reshape(-1))
+    # extra dimensions are stored as fixed size lists, e.g. coordinates are stored as lists of 3 numbers
+    for dim in reversed(flat.shape[1:]):
+        inner = pa.FixedSizeListArray.from_arrays(inner, dim)
+
+    column = pa.LargeListArray.from_arrays(pa.array(offsets, pa.int64()), inner, mask=pa.array(mask))
+    if type is not None:
+        column = column.cast(type)
+    return column
+
+
+def _arrow_batches(batches: Iterable[Batch]):
+    """Convert column batches to Arrow record batches. The schema is determined from the first batch, see :func:`_typed_batches`."""
+    import pyarrow as pa
+
+    schema = None
+    for batch in batches:
+        if schema is None:
+            columns = [_arrow_column(values, key) for key, values in batch.items()]
+            record_batch = pa.RecordBatch.from_arrays(columns, names=list(batch))
+            schema = record_batch.schema
+        else:
+            columns = [_arrow_column(values, key, type=schema.field(key).type) for key, values in batch.items()]
+            record_batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+        yield record_batch
+
+
+@environment.requires_optional_package("pyarrow")
+def write_parquet(path: str, batches: Iterable[Batch]) -> None:
+    """Write column batches (see :func:`iter_batches`) to a Parquet file.
+
+    Args:
+        path: the path to the Parquet file.
+        batches: the column batches to write. Only one batch is kept in memory at a time.
+    """
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for record_batch in _arrow_batches(_typed_batches(batches)):
+            if writer is None:
+                writer = pq.ParquetWriter(path, record_batch.schema)
+            writer.write_batch(record_batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+@environment.requires_optional_package("pyarrow")
+def write_feather(path: str, batches: Iterable[Batch]) -> None:
+    """Write column batches (see :func:`iter_batches`) to a Feather (Arrow IPC) file. These files can be memory-mapped when reading.
+
+    Args:
+        path: the path to the Feather file.
+        batches: the column batches to write. Only one batch is kept in memory at a time.
+    """
+    import pyarrow as pa
+
+    writer = None
+    try:
+        for record_batch in _arrow_batches(_typed_batches(batches)):
+            if writer is None:
+                writer = pa.ipc.new_file(path, record_batch.schema)
+            writer.write_batch(record_batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _hdf5_scalar_dtype(values: List[Any]):
+    import h5py
+
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, (bool, np.bool_)) for value in present):
+        return np.dtype(bool)
+    if present and all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in present):
+        return np.dtype(np.int64)
+    if all(isinstance(value, (int, float, np.number)) for value in present):
+        return np.dtype(np.float64)
+    return h5py.string_dtype()
+
+
+def _is_masked_dtype(dtype) -> bool:
+    """Integers and booleans do not have a value for missing data, so their columns are stored together with a mask."""
+    return np.dtype(dtype).kind in "biu"
+
+
+def _hdf5_scalar_column(values: List[Any], dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a column of single values to an array of type ``dtype`` and a mask that is True for missing values."""
+    import h5py
+
+    mask = np.array([value is None for value in values], dtype=bool)
+    if h5py.check_string_dtype(np.dtype(dtype)) is not None:
+        return np.array(["" if value is None else str(value) for value in values], dtype=object), mask
+
+    if np.issubdtype(np.dtype(dtype), np.floating):
+        return np.array([np.nan if value is None else value for value in values], dtype=dtype), mask
+
+    return np.array([0 if value is None else value for value in values], dtype=dtype), mask
+
+
+def _hdf5_append(dataset, data: np.ndarray) -> None:
+    start = dataset.shape[0]
+    dataset.resize(start + len(data), axis=0)
+    dataset[start:] = data
+
+
+def _hdf5_write_array_column(file, key: str, values: List[Any]) -> None:
+    import h5py
+
+    if not _is_array_column(values):
+        # all rows in this batch are missing, so they all get an empty array
+        group = file[key]
+        _hdf5_append(group["offsets"], np.full(len(values), group["values"].shape[0], dtype=np.int64))
+        return
+
+    flat, offsets, _ = _array_column_parts(values, key)
+    if flat.dtype.kind == "U":
+        flat = flat.astype(object)
+
+    if key not in file:
+        group = file.create_group(key)
+        dtype = h5py.string_dtype() if flat.dtype == object else flat.dtype
+        group.create_dataset("values", shape=(0, *flat.shape[1:]), maxshape=(None, *flat.shape[1:]), dtype=dtype, chunks=True)
+        group.create_dataset("offsets", data=[0], maxshape=(None,), dtype=np.int64, chunks=True)
+
+    group = file[key]
+    _hdf5_append(group["offsets"], offsets[1:] + group["values"].shape[0])
+    _hdf5_append(group["values"], flat)
+
+
+def _hdf5_write_scalar_column(file, key: str, values: List[Any]) -> None:
+    import h5py
+
+    if key not in file:
+        dtype = _hdf5_scalar_dtype(values)
+        data, mask = _hdf5_scalar_column(values, dtype)
+        if _is_masked_dtype(dtype):
+            group = file.create_group(key)
+            group.create_dataset("values", data=data, maxshape=(None,), dtype=dtype, chunks=True)
+            group.create_dataset("mask", data=mask, maxshape=(None,), dtype=bool, chunks=True)
+        else:
+            file.create_dataset(key, data=data, maxshape=(None,), dtype=dtype, chunks=True)
+        return
+
+    if isinstance(file[key], h5py.Group):
+        group = file[key]
+        data, mask = _hdf5_scalar_column(values, group["values"].dtype)
+        _hdf5_append(group["values"], data)
+        _hdf5_append(group["mask"], mask)
+        return
+
+    dataset = file[key]
+    _hdf5_append(dataset, _hdf5_scalar_column(values, dataset.dtype)[0])
+
+
+@environment.requires_optional_package("h5py")
+def write_hdf5(path: str, batches: Iterable[Batch]) -> None:
+    """Write column batches (see :func:`iter_batches`) to an HDF5 file.
+    Every column is stored as a dataset with the key as its name. Missing numbers are stored as NaN and missing strings as empty strings.
+    Integer and boolean columns are stored as groups with a ``values`` dataset and a ``mask`` dataset, which is True for missing values.
+    Array columns are stored as groups with a ``values`` dataset containing the arrays concatenated along their first axis
+    and an ``offsets`` dataset, such that the array in row ``i`` is ``values[offsets[i]:offsets[i + 1]]``. Missing arrays are stored as empty arrays.
+
+    Args:
+        path: the path to the HDF5 file.
+        batches: the column batches to write. Only one batch is kept in memory at a time.
+    """
+    import h5py
+
+    with h5py.File(path, "w") as file:
+        for batch in _typed_batches(batches):
+            for key, values in batch.items():
+                # later batches of array columns can contain only missing values
+                is_array_column = "offsets" in file[key] if key in file and isinstance(file[key], h5py.Group) else _is_array_column(values)
+                if is_array_column:
+                    _hdf5_write_array_column(file, key, values)
+                else:
+                    _hdf5_write_scalar_column(file, key, values)
+
+
+def write(path: str, results: Iterable[Union[Result, str]], keys: List[str], format: Optional[str] = None, batch_size: int = 1000) -> None:
+    """Write values from many Result objects to a table file. The results are processed in batches, so that they do not all have to be kept in memory.
+
+    Args:
+        path: the path to the file to write.
+        results: the Result objects to write. Paths to calculation directories are read using :func:`tcutility.results.read`.
+        keys: the multi-keys of the values to write, they are also used as column names.
+        format: the file format, one of ``"parquet"``, ``"feather"`` or ``"hdf5"``. Defaults to the format belonging to the file extension of ``path``.
+        batch_size: the number of results to write at once.
+
+    .. note::
+
+        The column types are determined from the first values that are found. Columns without any values are stored as floats.
+        Values can be missing in any row, also for integer and boolean columns.
+    """
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in _formats:
+            raise ValueError(f'Could not determine the file format from extension "{extension}", please provide the format')
+        format = _formats[extension]
+
+    batches = iter_batches(results, keys, batch_size=batch_size)
+    if format == "parquet":
+        write_parquet(path, batches)
+    elif format == "feather":
+        write_feather(path, batches)
+    elif format == "hdf5":
+        write_hdf5(path, batches)
+    else:
+        raise ValueError(f'Unknown format "{format}", must be one of "parquet", "feather" or "hdf5"')
+
+
+@environment.requires_optional_package("pandas")
+def to_dataframe(results: Iterable[Union[Result, str]], keys: List[str]):
+    """Collect values from many Result objects in a pandas DataFrame.
+
+    Args:
+        results: the Result objects to collect the values from. Paths to calculation directories are read using :func:`tcutility.results.read`.
+        keys: the multi-keys of the values to collect, they are also used as column names.
+
+    Returns:
+        A DataFrame with one row per Result object. Array-like values are stored as NumPy arrays.
+    """
+    import pandas as pd
+
+    columns = {key: [] for key in keys}
+    for batch in iter_batches(results, keys):
+        for key, values in batch.items():
+            columns[key].extend(values)
+
+    return pd.DataFrame(columns, columns=keys)
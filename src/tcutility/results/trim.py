@@ -0,0 +1,274 @@
+"""
+Module for trimming rkf files, so that they only contain the variables that are actually used.
+Our analyses usually only read a small part of the data stored in rkf files. Slim copies of the files take up much less storage space and are faster to transfer.
+
+First collect the variables that are accessed when reading a representative set of calculations using :func:`collect_accessed_variables`.
+The resulting access log can then be used to trim other calculations using :func:`trim_file` or :func:`trim_directory`.
+Indices in variable names, such as in ``("History", "Coords(12)")``, are replaced by wildcards, so that calculations with more steps or vibrational modes than the representative calculations are trimmed correctly.
+Variables whose names depend on the calculation in another way, such as the symmetry labels in ``("Energy", "Orb.Int. A1")``, are only kept if a calculation with the same symmetry was part of the representative set.
+
+Trimmed files can be read using :class:`plams.KFReader` and the readers in :mod:`tcutility.results.cache`, but should not be modified using AMS tools.
+
+Example:
+    .. code-block:: python
+
+        from tcutility.results import trim
+
+        log = trim.collect_accessed_variables(["calculations/reference_1", "calculations/reference_2"])
+        trim.save_access_log(log, "access_log.json")
+        trim.trim_directory("calculations/big_calculation", "slim/big_calculation", log)
+"""
+
+import json
+import os
+import re
+import shutil
+import struct
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+from scm import plams
+
+from tcutility.results import cache
+from tcutility.results.result import Result
+
+# an access log stores for each rkf file name the (section, variable) pairs that were accessed
+AccessLog = Dict[str, Set[Tuple[str, str]]]
+
+# record types in the superindex of rkf files
+_SUPERINDEX = 2
+_INDEX = 3
+_DATA = 4
+
+
+def generalize(variable: str) -> str:
+    """Replace indices between brackets in a variable name by wildcards. E.g. ``"Coords(12)"`` becomes ``"Coords(*)"``."""
+    return re.sub(r"\(\d+\)", "(*)", variable)
+
+
+def collect_accessed_variables(calc_dirs: Iterable[str]) -> AccessLog:
+    """Read calculations using :func:`tcutility.results.read` and collect the rkf variables that were accessed.
+
+    Args:
+        calc_dirs: paths pointing to a representative set of calculations.
+
+    Returns:
+        A dictionary with rkf file names (e.g. "adf.rkf") as keys and sets of accessed (section, variable) pairs as values.
+        Indices in the variable names are replaced by wildcards, see :func:`generalize`.
+    """
+    from tcutility.results.read import read
+
+    with cache.track_access() as accessed:
+        for calc_dir in calc_dirs:
+            read(calc_dir)
+
+    log = {}
+    for path, section, variable in accessed:
+        log.setdefault(os.path.basename(path), set()).add((section, generalize(variable)))
+    return log
+
+
+def merge_access_logs(*logs: AccessLog) -> AccessLog:
+    """Merge multiple access logs into one containing all accessed variables."""
+    merged = {}
+    for log in logs:
+        for name, variables in log.items():
+            merged.setdefault(name, set()).update(variables)
+    return merged
+
+
+def save_access_log(log: AccessLog, path: str):
+    """Write an access log to a JSON file."""
+    with open(path, "w") as file:
+        json.dump({name: sorted(variables) for name, variables in log.items()}, file, indent=4)
+
+
+def load_access_log(path: str) -> AccessLog:
+    """Read an access log written by :func:`save_access_log`."""
+    with open(path) as file:
+        return {name: {tuple(variable) for variable in variables} for name, variables in json.load(file).items()}
+
+
+def _pack_records(reader: plams.KFReader, records: List[Tuple[Union[str, bytes], int]]) -> bytes:
+    """Pack superindex or index records, consisting of a name and integers, into bytes. Names are padded to 32 characters."""
+    data = b""
+    for name, *values in records:
+        name = name.encode() if isinstance(name, str) else name
+        data += struct.pack(f"{reader.endian}32s{len(values)}{reader.word}", name.ljust(32), *values)
+    return data
+
+
+def _data_blocks_used(reader: plams.KFReader, file, section: str, variable: str) -> List[int]:
+    """Get the logical blocks in which the data of a variable is stored."""
+    vtype, vlb, vstart, vlen = reader._sections[section][variable]
+    (lbs, pbs) = reader._data[section]
+
+    used = []
+    remaining = vlen + vstart - 1
+    # logical blocks are numbered sequentially, so we convert the physical blocks back to logical ones
+    for physical in plams.KFReader._datablocks(reader._data[section], vlb):
+        run = max(i for i, (first, last) in enumerate(pbs) if first <= physical < last)
+        used.append(lbs[run] + physical - pbs[run][0])
+
+        header = reader._parse(reader._read_block(file, physical)[: 4 * reader._sizes[reader.word]], [(4, reader.word)])[0]
+        remaining -= header[vtype - 1]
+        if remaining <= 0:
+            break
+    return used
+
+
+def trim_file(path: str, output: str, variables: Iterable[Tuple[str, str]]) -> Result:
+    """Write a copy of an rkf file that only contains the given variables.
+    Data blocks that do not contain any of the variables are not copied and sections without any of the variables are removed completely.
+    Other variables stored in the copied blocks are removed from the index of the file, so that they cannot be read anymore.
+
+    Args:
+        path: path to the rkf file to trim.
+        output: path to write the trimmed rkf file to.
+        variables: the (section, variable) pairs to keep. Variable names can contain wildcards for indices, see :func:`generalize`.
+
+    Returns:
+        :Result object containing:
+
+            - **original_size (int)** – size of the original file in bytes.
+            - **trimmed_size (int)** – size of the trimmed file in bytes.
+            - **variables (int)** – number of variables kept in the trimmed file.
+    """
+    keep = {(section, generalize(variable)) for section, variable in variables}
+
+    reader = plams.KFReader(path)
+    reader._create_index()
+    blocksize = reader._blocksize
+    wordsize = reader._sizes[reader.word]
+    record_format = [(32, "s"), (4, reader.word)]
+    record_size = 32 + 4 * wordsize
+    index_format = [(32, "s"), (6, reader.word)]
+    index_header_size = 32 + 7 * wordsize
+
+    with open(path, "rb") as file:
+        # the name of the first record can also store the block size, so we copy it
+        first_name = reader._read_block(file, 1)[:32]
+
+        # collect the records of all superindex blocks
+        superindex = []
+        position = 1
+        while True:
+            records = reader._parse(reader._read_block(file, position), record_format)
+            superindex.extend(records)
+            position = records[0][4]
+            if position == 1:
+                break
+
+        # the variables that are kept for each section
+        kept = {}
+        for section, variables_ in reader._sections.items():
+            names = [variable for variable in variables_ if (section, generalize(variable)) in keep]
+            if names:
+                kept[section] = names
+
+        # the logical data blocks that should be kept for each section
+        data_blocks = {section: sorted({block for variable in names for block in _data_blocks_used(reader, file, section, variable)}) for section, names in kept.items()}
+
+        # the blocks that will be written after the superindex, stored as (name, logical block, type, data)
+        blocks = []
+        for name, pb, lb, le, ty in superindex:
+            section = name.decode("Latin-1").rstrip(" ")
+            if ty != _INDEX or section not in kept:
+                continue
+
+            for i in range(le):
+                block = bytearray(reader._read_block(file, pb + i))
+                # variables that are not kept are replaced by empty entries
+                entries = reader._parse(bytes(block[index_header_size:]), index_format)
+                for j, (variable, *_) in enumerate(entries):
+                    variable = variable.decode("Latin-1").rstrip(" ")
+                    if variable == "EMPTY" or variable in kept[section]:
+                        continue
+                    start = index_header_size + j * (32 + 6 * wordsize)
+                    block[start : start + 32 + 6 * wordsize] = _pack_records(reader, [("EMPTY", 0, 0, 0, 0, 0, 0)])
+                blocks.append((section, lb + i, _INDEX, bytes(block)))
+
+        for section, logical_blocks in data_blocks.items():
+            for logical in logical_blocks:
+                physical = next(plams.KFReader._datablocks(reader._data[section], logical))
+                blocks.append((section, logical, _DATA, reader._read_block(file, physical)))
+
+    # the superindex contains two records for each superindex block, followed by one record for each run of consecutive blocks
+    # we first determine the runs, so that we know how many superindex blocks we need
+    runs = []
+    for name, logical, ty, _ in blocks:
+        if runs and runs[-1][0] == name and runs[-1][3] == ty and runs[-1][1] + runs[-1][2] == logical:
+            runs[-1][2] += 1
+        else:
+            runs.append([name, logical, 1, ty])
+
+    records_per_block = blocksize // record_size
+    nsuper = max(1, -(-len(runs) // (records_per_block - 2)))
+
+    # physical blocks of the data are numbered after the superindex blocks
+    position = nsuper + 1
+    records = []
+    for name, logical, length, ty in runs:
+        records.append((name, position, logical, length, ty))
+        position += length
+    last_block = position - 1
+
+    superindex_blocks = []
+    for i in range(nsuper):
+        next_block = i + 2 if i + 1 < nsuper else 1
+        if i == 0:
+            header = [(first_name, last_block, nsuper, len(kept), next_block)]
+        else:
+            header = [("SUPERINDEX", 0, 0, 0, next_block)]
+        block_records = header + [("SUPERINDEX", i + 1, i + 1, 1, _SUPERINDEX)] + records[i * (records_per_block - 2) : (i + 1) * (records_per_block - 2)]
+        block_records += [("EMPTY", 0, 0, 0, 0)] * (records_per_block - len(block_records))
+        superindex_blocks.append(_pack_records(reader, block_records).ljust(blocksize, b"\0"))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "wb") as file:
+        for block in superindex_blocks:
+            file.write(block)
+        for *_, block in blocks:
+            file.write(block.ljust(blocksize, b"\0"))
+
+    ret = Result()
+    ret.original_size = os.path.getsize(path)
+    ret.trimmed_size = os.path.getsize(output)
+    ret.variables = sum(len(names) for names in kept.values())
+    return ret
+
+
+def trim_directory(calc_dir: str, output_dir: str, log: AccessLog) -> Result:
+    """Copy a calculation directory and replace its rkf files by trimmed copies, see :func:`trim_file`.
+    Rkf files that do not appear in the access log and all other files are copied as they are.
+
+    Args:
+        calc_dir: path pointing to the calculation to trim.
+        output_dir: path to write the trimmed calculation to.
+        log: access log used to determine which variables to keep, see :func:`collect_accessed_variables`.
+
+    Returns:
+        :Result object containing:
+
+            - **original_size (int)** – total size of the original rkf files in bytes.
+            - **trimmed_size (int)** – total size of the trimmed rkf files in bytes.
+            - **files (list[str])** – paths to the trimmed rkf files.
+    """
+    ret = Result()
+    ret.original_size = 0
+    ret.trimmed_size = 0
+    ret.files = []
+    for root, _, files in os.walk(calc_dir):
+        output_root = os.path.join(output_dir, os.path.relpath(root, calc_dir))
+        os.makedirs(output_root, exist_ok=True)
+        for name in files:
+            path = os.path.join(root, name)
+            output = os.path.join(output_root, name)
+            if not name.endswith(".rkf") or name not in log:
+                shutil.copy2(path, output)
+                continue
+
+            trimmed = trim_file(path, output, log[name])
+            ret.original_size += trimmed.original_size
+            ret.trimmed_size += trimmed.trimmed_size
+            ret.files.append(output)
+    return ret
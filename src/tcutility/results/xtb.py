@@ -1,9 +1,11 @@
 import os
+from typing import List, Optional
 
 import numpy as np
 
 import tcutility.constants as constants
 import tcutility.molecule as molecule
+from tcutility.results import scan
 from tcutility.results.result import Result
 
 j = os.path.join
@@ -20,7 +22,7 @@ def get_calc_files(calc_dir: str) -> Result:
     """
     # collect all files in the current directory and subdirectories
     files = []
-    for root, _, files_ in os.walk(calc_dir):
+    for root, files_ in scan.scan(calc_dir):
         files.extend([j(root, file) for file in files_])
 
     # parse the filenames
@@ -202,6 +204,43 @@ def get_input(info: Result) -> Result:
     return ret
 
 
+def _get_calculation_status(lines: Optional[List[str]]) -> Result:
+    """Determine the status of the calculation from the lines of its output file, see :func:`get_calculation_status`.
+    The lines can also be just the end of the output file, see :func:`get_quick_status`. If there is no output file ``lines`` should be ``None``."""
+    ret = Result()
+    ret.fatal = True
+    ret.name = None
+    ret.code = None
+    ret.reasons = []
+
+    if lines is None:
+        ret.reasons.append("Calculation status unknown")
+        ret.name = "UNKNOWN"
+        ret.code = "U"
+        return ret
+
+    if any(["[WARNING] Runtime exception occurred" in line for line in lines]):
+        ret.name = "FAILED"
+        ret.code = "F"
+
+        line_index = [i for i, line in enumerate(lines) if "[WARNING] Runtime exception occurred" in line][0]
+        for line in lines[line_index + 1 :]:
+            if "##########" in line:
+                break
+            ret.reasons.append(line.strip())
+        return ret
+
+    if any(["* finished run" in line for line in lines]):
+        ret.fatal = False
+        ret.name = "SUCCESS"
+        ret.code = "S"
+        return ret
+
+    ret.name = "FAILED"
+    ret.code = "F"
+    return ret
+
+
 def get_calculation_status(info: Result) -> Result:
     """Function that returns the status of the ORCA calculation described in reader. In case of non-succes it will also give possible reasons for the errors/warnings.
 
@@ -216,41 +255,27 @@ def get_calculation_status(info: Result) -> Result:
             - **name (str)** – calculation status written as a string, one of ("SUCCESS", "RUNNING", "UNKNOWN", "SUCCESS(W)", "FAILED")
             - **code (str)** – calculation status written as a single character, one of ("S", "R", "U", "W" "F")
     """
-    ret = Result()
-    ret.fatal = True
-    ret.name = None
-    ret.code = None
-    ret.reasons = []
-
     if "out" not in info.files:
-        ret.reasons.append("Calculation status unknown")
-        ret.name = "UNKNOWN"
-        ret.code = "U"
-        return ret
+        return _get_calculation_status(None)
 
     with open(info.files.out) as out:
-        lines = out.readlines()
-        if any(["[WARNING] Runtime exception occurred" in line for line in lines]):
-            ret.fatal = True
-            ret.name = "FAILED"
-            ret.code = "F"
-
-            line_index = [i for i, line in enumerate(lines) if "[WARNING] Runtime exception occurred" in line][0]
-            for line in lines[line_index + 1 :]:
-                if "##########" in line:
-                    break
-                ret.reasons.append(line.strip())
-            return ret
+        return _get_calculation_status(out.readlines())
 
-        if any(["* finished run" in line for line in lines]):
-            ret.fatal = False
-            ret.name = "SUCCESS"
-            ret.code = "S"
-            return ret
 
-    ret.name = "FAILED"
-    ret.code = "F"
-    return ret
+def get_quick_status(calc_dir: str) -> Result:
+    """Function that quickly returns the status of the xTB calculation. Unlike :func:`get_calculation_status` only the end of the output file is read.
+
+    Args:
+        calc_dir: path pointing to the desired calculation.
+
+    Returns:
+        :Result object containing information about the calculation status, see :func:`get_calculation_status`.
+    """
+    files = get_calc_files(calc_dir)
+    if "out" not in files:
+        return _get_calculation_status(None)
+
+    return _get_calculation_status(scan.read_tail(files.out).splitlines())
 
 
 def get_molecules(info: Result) -> Result:
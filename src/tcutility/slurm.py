@@ -1,13 +1,59 @@
+import concurrent.futures
 import os
 import platform
 import subprocess as sp
+import threading
 import time
+from typing import Dict, List, Tuple, Union
 
-from tcutility import cache, timed_cache
+from tcutility import cache
 import tcutility.connect as connect
 import tcutility.log as log
 from tcutility.results.result import Result
 
+# the number of seconds a snapshot of the slurm queue is reused before squeue is called again, see :func:`snapshot`
+snapshot_lifetime = 3
+# finished jobs are retrieved using sacct starting from this time, see the sacct documentation for the format
+sacct_starttime = "now-7days"
+# the minimum and maximum number of seconds between two checks of the slurm queue and the factor by which the interval grows, see :class:`JobWaiter`
+wait_min_interval = 5
+wait_max_interval = 60
+wait_backoff = 1.5
+# the number of seconds between two checks of the working directories of jobs that are watched, see :class:`JobWaiter`
+wait_watch_interval = 5
+
+# compact state codes for the job states reported by sacct, these are the same codes as used by squeue
+_state_codes = {
+    "BOOT_FAIL": "BF",
+    "CANCELLED": "CA",
+    "COMPLETED": "CD",
+    "COMPLETING": "CG",
+    "CONFIGURING": "CF",
+    "DEADLINE": "DL",
+    "FAILED": "F",
+    "NODE_FAIL": "NF",
+    "OUT_OF_MEMORY": "OOM",
+    "PENDING": "PD",
+    "PREEMPTED": "PR",
+    "REQUEUED": "RQ",
+    "RESIZING": "RS",
+    "RUNNING": "R",
+    "SUSPENDED": "S",
+    "TIMEOUT": "TO",
+}
+
+# marker used to separate the outputs of jobs submitted together, see :func:`sbatch_many`
+_sbatch_marker = "TCUTILITY_SBATCH"
+
+# the working directories of the tasks of job arrays, indexed by server and array job id, see :func:`_get_array_workdirs`
+_array_workdirs = {}
+
+# snapshots that are currently reused, indexed by server, see :func:`_server_key`
+_snapshots = {}
+# each server has its own lock, so that a slow query on one server does not block taking snapshots of other servers
+_snapshot_locks = {}
+_snapshot_lock = threading.Lock()
+
 
 @cache
 def has_slurm(server: connect.Server = connect.Local()) -> bool:
@@ -33,61 +79,230 @@ def has_slurm(server: connect.Server = connect.Local()) -> bool:
         return False
 
 
-@timed_cache(3)
-def squeue(server: connect.Server = connect.Local()) -> Result:
+class SlurmSnapshot:
     """
-    Get information about jobs managed by slurm using squeue.
+    Snapshot of the jobs managed by slurm, taken using a single call to squeue (and optionally sacct).
+    Jobs are indexed by their job id and working directory, so that looking up many jobs or directories is cheap.
+    Snapshots only contain plain data, so they can be shared between threads and sent to other processes.
 
-    Returns:
-        : A :class:`Result <tcutility.results.result.Result>` object containing information about the calculation status:
-
-            - ``directory`` **(list[str])** – path to slurm directories.
-            - ``id`` **(list[str])** – slurm job id's.
-            - ``status`` **(list[str])** – slurm job status name. See squeue documentation.
-            - ``statuscode`` **(list[str])** – slurm job status codes. See squeue documentation
+    Args:
+        queued: jobs that are currently managed by slurm, see :meth:`from_squeue`.
+        finished: jobs that have finished, see :meth:`from_sacct`. If not given, sacct was not used to take this snapshot.
+        timestamp: the time at which the snapshot was taken, as given by :func:`time.time`.
 
-    .. note::
+    Each job is stored as a :class:`Result <tcutility.results.result.Result>` object containing:
 
-        By default this function uses a timed cache (see :func:`timed_cache <tcutility.timed_cache>`) with a 3 second delay to lessen the load on HPC systems.
+        - ``directory`` **(str)** – path to the working directory of the job.
+        - ``id`` **(str)** – slurm job id.
+        - ``status`` **(str)** – slurm job status name. See squeue documentation.
+        - ``statuscode`` **(str)** – slurm job status code. See squeue documentation.
     """
-    ret = Result()
 
-    if not has_slurm(server=server):
+    def __init__(self, queued: List[Result] = None, finished: List[Result] = None, timestamp: float = None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.queued: Dict[str, Result] = {job.id: job for job in queued or []}
+        self.finished: Dict[str, Result] = {job.id: job for job in finished or []}
+        self.include_finished = finished is not None
+
+        # just like squeue we keep the first queued job for each directory
+        self._queued_directories = {}
+        for job in self.queued.values():
+            self._queued_directories.setdefault(os.path.normpath(job.directory), job)
+        # sacct lists jobs in the order they were submitted, so we keep the last finished job for each directory
+        self._finished_directories = {os.path.normpath(job.directory): job for job in self.finished.values()}
+
+    def __repr__(self):
+        return f"SlurmSnapshot(queued={len(self.queued)}, finished={len(self.finished)})"
+
+    @staticmethod
+    def _job(directory: str, id: str, statuscode: str, status: str) -> Result:
+        job = Result()
+        job.directory = directory
+        job.id = id
+        job.statuscode = statuscode
+        job.status = status
+        return job
+
+    @classmethod
+    def from_squeue(cls, output: str) -> List[Result]:
+        """Parse the output of ``squeue --array --noheader --format "%i|%t|%T|%Z"`` into a list of jobs."""
+        jobs = []
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            id, statuscode, status, directory = line.strip().split("|", 3)
+            jobs.append(cls._job(directory, id, statuscode, status))
+        return jobs
+
+    @classmethod
+    def from_sacct(cls, output: str) -> List[Result]:
+        """Parse the output of ``sacct --noheader --parsable2 --allocations --format JobID,State,WorkDir`` into a list of jobs."""
+        jobs = []
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            id, status, directory = line.strip().split("|", 2)
+            # states can have extra information, e.g. "CANCELLED by 1234"
+            status = status.split()[0] if status.strip() else "UNKNOWN"
+            jobs.append(cls._job(directory, id, _state_codes.get(status, "U"), status))
+        return jobs
+
+    def get_job(self, job_id: Union[str, int], include_finished: bool = False) -> Union[Result, None]:
+        """
+        Get a job by its slurm job id.
+
+        Args:
+            job_id: the slurm job id.
+            include_finished: whether to also look at finished jobs. Queued jobs take precedence over finished jobs.
+
+        Returns:
+            The job, or ``None`` if it is not part of this snapshot.
+        """
+        job = self.queued.get(str(job_id))
+        if job is None and include_finished:
+            job = self.finished.get(str(job_id))
+        return job
+
+    def get_workdir(self, workdir: str, include_finished: bool = False) -> Union[Result, None]:
+        """
+        Get the job running in a working directory.
+
+        Args:
+            workdir: the working directory of the job.
+            include_finished: whether to also look at finished jobs. Queued jobs take precedence over finished jobs.
+
+        Returns:
+            The job, or ``None`` if there is no job for this directory in this snapshot.
+        """
+        workdir = os.path.normpath(workdir)
+        job = self._queued_directories.get(workdir)
+        if job is None and include_finished:
+            job = self._finished_directories.get(workdir)
+        return job
+
+    def statuscodes(self) -> Dict[str, str]:
+        """Get the statuscodes of the queued jobs, indexed by their working directories."""
+        return {directory: job.statuscode for directory, job in self._queued_directories.items()}
+
+    def as_squeue(self) -> Result:
+        """Get the queued jobs in the format returned by :func:`squeue`."""
+        ret = Result()
+        for col in ["directory", "id", "statuscode", "status"]:
+            ret[col] = [job[col] for job in self.queued.values()]
         return ret
 
-    # specify the columns to get here
-    columns = ["directory", "id", "statuscode", "status"]
-    options = ["%Z", "%A", "%t", "%T"]  # these are the squeue format codes
 
-    # set each column as an empty list in the return object
-    for col in columns:
-        ret[col] = []
+def _server_key(server: connect.Server) -> Tuple:
+    """Get a key that identifies a server. Every job creates its own server objects, so objects that connect to the same server are compared using this key."""
+    return type(server), server.server, getattr(server, "username", None)
 
-    # run the squeue command with the formatting options
-    output = server.execute("squeue --me --format " + '"' + " ".join(options) + '"')
-    output = [line for line in output.splitlines()[1:] if line.strip()]
 
-    # then add the data to the return object's lists
-    for line in output:
-        [ret[col].append(val) for col, val in zip(columns, line.split())]
+def _array_workdirs_file(array_id: str) -> str:
+    """The name of the file storing the working directories of the tasks of a job array, see :func:`tcutility.job.array.submit_array`."""
+    return f"array_{array_id}.workdirs"
 
-    return ret
 
+def _expand_home(path: str, server: connect.Server) -> str:
+    """Replace a leading ``~`` by the home directory on the server, so that paths can be compared with the absolute paths used by slurm."""
+    if not path.startswith("~"):
+        return path
+    home = os.path.expanduser("~") if server.home == "~" else server.home
+    return home + path[1:]
 
-def sbatch(runfile: str, server: connect.Server = connect.Local(), **options: dict) -> Result:
+
+def _get_array_workdirs(array_id: str, directory: str, server: connect.Server) -> List[str]:
+    """Get the working directories of the tasks of a job array. They do not change, so they are only read once for each array."""
+    key = (_server_key(server), array_id)
+    if key not in _array_workdirs:
+        output = server.execute(f"cat {os.path.join(directory, _array_workdirs_file(array_id))} 2>/dev/null; true")
+        # files written by older versions can contain paths relative to the home directory
+        _array_workdirs[key] = [_expand_home(line, server) for line in output.splitlines() if line.strip()]
+    return _array_workdirs[key]
+
+
+def _set_array_workdirs(jobs: List[Result], server: connect.Server):
+    """All tasks of a job array share the same working directory in slurm. If the array was submitted by TCutility, we replace it by the working directory of the task."""
+    for job in jobs:
+        array_id, _, task = job.id.partition("_")
+        # tasks that are still pending together are listed as e.g. 1234_[5-10], they do not have their own working directory yet
+        if not task.isdigit():
+            continue
+
+        workdirs = _get_array_workdirs(array_id, job.directory, server)
+        if int(task) < len(workdirs):
+            job.directory = workdirs[int(task)]
+
+
+def snapshot(server: connect.Server = connect.Local(), include_finished: bool = False, max_age: float = None) -> SlurmSnapshot:
     """
-    Submit a job to slurm using sbatch.
+    Take a snapshot of the jobs managed by slurm. Snapshots are reused for :data:`snapshot_lifetime` seconds, so that many jobs and directories
+    can be checked using a single call to squeue.
 
     Args:
-        runfile: the path to the filename to be submitted.
-        options: options to be used for sbatch.
+        server: the server to get the jobs from.
+        include_finished: whether to also get the jobs that finished since :data:`sacct_starttime` using sacct.
+        max_age: the maximum age in seconds of a reused snapshot. Defaults to :data:`snapshot_lifetime`.
+            Use ``0`` to always take a new snapshot.
 
     Returns:
-        : A :class:`Result <tcutility.results.result.Result>` object containing information about the newly submitted slurm job
+        A :class:`SlurmSnapshot` object. If slurm is not available an empty snapshot is returned.
 
-            - ``id`` **(str)** - the ID for the submitted slurm job.
-            - ``command`` **(str)** - the command used to submit the job.
+    Example:
+        .. code-block:: python
+
+            sq = slurm.snapshot()
+            for calc_dir in calc_dirs:
+                job = sq.get_workdir(os.path.abspath(calc_dir))
+    """
+    max_age = snapshot_lifetime if max_age is None else max_age
+    key = _server_key(server)
+    with _snapshot_lock:
+        server_lock = _snapshot_locks.setdefault(key, threading.Lock())
+
+    with server_lock:
+        cached = _snapshots.get(key)
+        if cached is not None and time.time() - cached.timestamp < max_age and (cached.include_finished or not include_finished):
+            return cached
+
+        if not has_slurm(server=server):
+            sq = SlurmSnapshot()
+        else:
+            queued = SlurmSnapshot.from_squeue(server.execute('squeue --me --array --noheader --format "%i|%t|%T|%Z"'))
+            finished = None
+            if include_finished:
+                finished = SlurmSnapshot.from_sacct(server.execute(f"sacct --noheader --parsable2 --allocations --starttime {sacct_starttime} --format JobID,State,WorkDir"))
+            _set_array_workdirs(queued + (finished or []), server)
+            sq = SlurmSnapshot(queued, finished)
+
+        _snapshots[key] = sq
+        return sq
+
+
+def squeue(server: connect.Server = connect.Local()) -> Result:
     """
+    Get information about jobs managed by slurm using squeue.
+
+    Returns:
+        : A :class:`Result <tcutility.results.result.Result>` object containing information about the calculation status:
+
+            - ``directory`` **(list[str])** – path to slurm directories.
+            - ``id`` **(list[str])** – slurm job id's.
+            - ``status`` **(list[str])** – slurm job status name. See squeue documentation.
+            - ``statuscode`` **(list[str])** – slurm job status codes. See squeue documentation
+
+    .. note::
+
+        This function uses a snapshot of the queue (see :func:`snapshot`) that is reused for :data:`snapshot_lifetime` seconds to lessen the load on HPC systems.
+        Use :func:`snapshot` directly to look up jobs by their id or working directory.
+    """
+    if not has_slurm(server=server):
+        return Result()
+
+    return snapshot(server=server).as_squeue()
+
+
+def _sbatch_command(runfile: str, **options: dict) -> str:
+    """Build the sbatch command used to submit a runfile with the given options, see :func:`sbatch`."""
     cmd = "sbatch "
     for key, val in options.items():
         key = key.replace("_", "-")
@@ -103,56 +318,335 @@ def sbatch(runfile: str, server: connect.Server = connect.Local(), **options: di
             else:
                 cmd += f"-{key} {val} "
 
-    cmd = cmd + runfile
+    return cmd + runfile
+
+
+def _parse_sbatch_output(output: str) -> Union[str, None]:
+    """Get the slurm job id from the output of sbatch."""
+    for line in output.splitlines():
+        if "Submitted batch job" in line:
+            return line.strip().split()[-1]
+
+
+def sbatch(runfile: str, server: connect.Server = connect.Local(), **options: dict) -> Result:
+    """
+    Submit a job to slurm using sbatch.
+
+    Args:
+        runfile: the path to the filename to be submitted.
+        options: options to be used for sbatch.
+
+    Returns:
+        : A :class:`Result <tcutility.results.result.Result>` object containing information about the newly submitted slurm job
 
+            - ``id`` **(str)** - the ID for the submitted slurm job.
+            - ``command`` **(str)** - the command used to submit the job.
+    """
     ret = Result()
-    ret.command = cmd
+    ret.command = _sbatch_command(runfile, **options)
 
     # run the job
-    sbatch_out = server.execute(cmd)
+    sbatch_out = server.execute(ret.command)
     # get the slurm job id from the output
-    for line in sbatch_out.splitlines():
-        if "Submitted batch job" in line:
-            # set the slurm job id for this calculation, we use this in order to set dependencies between jobs.
-            ret.id = line.strip().split()[-1]
-            break
+    # we use the slurm job id for this calculation in order to set dependencies between jobs.
+    job_id = _parse_sbatch_output(sbatch_out)
+    if job_id is not None:
+        ret.id = job_id
 
     return ret
 
 
+def sbatch_many(jobs: List[Tuple[str, dict]], server: connect.Server = connect.Local()) -> List[Result]:
+    """
+    Submit many jobs to slurm using a single call to the server. Each job is still submitted using its own sbatch command.
+
+    Args:
+        jobs: a list of tuples containing the path to the runfile and a dictionary of sbatch options for each job, see :func:`sbatch`.
+
+    Returns:
+        A list of :class:`Result <tcutility.results.result.Result>` objects for each job, see :func:`sbatch`.
+        If a job could not be submitted its ``id`` key is not set.
+    """
+    rets = []
+    for runfile, options in jobs:
+        ret = Result()
+        ret.command = _sbatch_command(runfile, **options)
+        rets.append(ret)
+
+    if not rets:
+        return rets
+
+    # the outputs of the commands are separated using markers, so that a failed submission does not affect the other jobs
+    # failing commands should not stop the remaining commands, so we make sure the script always succeeds
+    script = "; ".join(f"echo {_sbatch_marker} {i}; {ret.command} 2>&1" for i, ret in enumerate(rets)) + "; true"
+    output = server.execute(script)
+
+    parts = output.split(_sbatch_marker)[1:]
+    for part in parts:
+        index, _, part_output = part.strip().partition("\n")
+        job_id = _parse_sbatch_output(part_output)
+        if job_id is not None:
+            rets[int(index)].id = job_id
+
+    return rets
+
+
 def workdir_info(workdir: str, server: connect.Server = connect.Local()) -> Result:
     """
     Function that gets squeue information given a working directory. This will return None if the directory is not being actively referenced by slurm.
 
     Returns:
-        :Result object containing information about the calculation status, see :func:`squeue`.
+        :Result object containing information about the calculation status, see :class:`SlurmSnapshot`.
     """
-    if not has_slurm(server=server):
+    job = snapshot(server=server).get_workdir(workdir)
+    if job is None:
         return None
 
-    sq = squeue(server=server)
-    if workdir not in sq.directory:
+    return job.copy()
+
+
+class JobWaiter:
+    """
+    Waits for many slurm jobs at once. The waiter runs a single background thread that checks all jobs on a server using one call to squeue,
+    so waiting for a thousand jobs costs the same as waiting for one.
+    Checks are done every ``min_interval`` seconds at first. While no job finishes, the interval grows by a factor ``backoff`` up to ``max_interval`` seconds,
+    and it is reset as soon as a job finishes.
+
+    Jobs that run on the local machine can also be detected by watching their working directory.
+    Every ``watch_interval`` seconds the modification times of the files in the directory are checked and, if they changed, the status of the calculation is read (see :func:`tcutility.results.read.quick_status`).
+    A job is considered finished as soon as its calculation has finished, even if slurm has not yet removed it from the queue.
+
+    Args:
+        min_interval: the minimum number of seconds between two checks of the slurm queue. Defaults to :data:`wait_min_interval`.
+        max_interval: the maximum number of seconds between two checks of the slurm queue. Defaults to :data:`wait_max_interval`.
+        backoff: the factor by which the interval grows when no jobs finished. Defaults to :data:`wait_backoff`.
+        watch_interval: the number of seconds between two checks of watched working directories. Defaults to :data:`wait_watch_interval`.
+
+    Example:
+        .. code-block:: python
+
+            waiter = slurm.get_waiter()
+            futures = [waiter.add(job_id) for job_id in job_ids]
+            futures[0].add_done_callback(lambda future: print(future.result().status))
+            concurrent.futures.wait(futures)
+    """
+
+    def __init__(self, min_interval: float = None, max_interval: float = None, backoff: float = None, watch_interval: float = None):
+        self.min_interval = wait_min_interval if min_interval is None else min_interval
+        self.max_interval = wait_max_interval if max_interval is None else max_interval
+        self.backoff = wait_backoff if backoff is None else backoff
+        self.watch_interval = wait_watch_interval if watch_interval is None else watch_interval
+
+        self._condition = threading.Condition()
+        self._thread = None
+        # jobs that are being waited for, indexed by server and job id, see :func:`_server_key`
+        self._jobs: Dict[Tuple[Tuple, str], Result] = {}
+        # the server objects used to check the queue, the current check interval and the time of the next check, indexed by server
+        self._servers: Dict[Tuple, connect.Server] = {}
+        self._intervals: Dict[Tuple, float] = {}
+        self._next_checks: Dict[Tuple, float] = {}
+        self._next_watch = 0
+
+    def __len__(self):
+        with self._condition:
+            return len(self._jobs)
+
+    def add(self, job_id: Union[str, int], server: connect.Server = connect.Local(), workdir: str = None, max_interval: float = None) -> concurrent.futures.Future:
+        """
+        Start waiting for a slurm job.
+
+        Args:
+            job_id: the slurm job id of the job.
+            server: the server the job was submitted to.
+            workdir: the working directory of the job. If given and the job runs on the local machine, the directory is watched for the calculation to finish.
+            max_interval: the maximum number of seconds between two checks of the slurm queue for this job. Defaults to the ``max_interval`` of the waiter.
+
+        Returns:
+            A future that is resolved when the job has finished. Its result is a :Result object containing:
+
+                - **id (str)** – the slurm job id.
+                - **status (str)** – the final slurm state of the job, e.g. ``"COMPLETED"``. If the job finished before slurm removed it from the queue, this is the status of the calculation instead.
+                - **statuscode (str)** – the compact code of the final state, e.g. ``"CD"``. ``"U"`` if the final state could not be determined.
+                - **directory (str)** – the working directory of the job, if known.
+
+            Use ``future.add_done_callback`` to start dependent work as soon as the job finishes.
+        """
+        job = Result()
+        job.id = str(job_id)
+        job.server = server
+        job.workdir = workdir if isinstance(server, connect.Local) else None
+        job.max_interval = self.max_interval if max_interval is None else max_interval
+        job.future = concurrent.futures.Future()
+        job.mtime = None
+
+        with self._condition:
+            server_key = _server_key(server)
+            key = (server_key, job.id)
+            # the same job can be waited for multiple times, in that case we share the future
+            if key in self._jobs:
+                return self._jobs[key].future
+
+            self._jobs[key] = job
+            self._servers.setdefault(server_key, server)
+            self._intervals[server_key] = min(self.min_interval, job.max_interval)
+            self._next_checks[server_key] = time.time() + self._intervals[server_key]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job.future
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                if not self._jobs:
+                    self._thread = None
+                    return
+
+                now = time.time()
+                due = [server_key for server_key, next_check in self._next_checks.items() if next_check <= now]
+                watch = now >= self._next_watch and any(job.workdir for job in self._jobs.values())
+                if not due and not watch:
+                    next_event = min(self._next_checks.values())
+                    if any(job.workdir for job in self._jobs.values()):
+                        next_event = min(next_event, self._next_watch)
+                    self._condition.wait(max(next_event - now, 0))
+                    continue
+
+            for server_key in due:
+                self._check_server(server_key)
+
+            if watch:
+                self._next_watch = time.time() + self.watch_interval
+                self._check_workdirs()
+
+    def _server_jobs(self, server_key: Tuple) -> List[Result]:
+        with self._condition:
+            return [job for (job_server_key, _), job in self._jobs.items() if job_server_key == server_key]
+
+    def _finish(self, job: Result, state: Result = None):
+        server_key = _server_key(job.server)
+        with self._condition:
+            if self._jobs.pop((server_key, job.id), None) is None:
+                return
+            if not any(job_server_key == server_key for job_server_key, _ in self._jobs):
+                self._servers.pop(server_key, None)
+                self._intervals.pop(server_key, None)
+                self._next_checks.pop(server_key, None)
+
+        ret = Result()
+        ret.id = job.id
+        ret.status = "UNKNOWN" if state is None else state.status
+        ret.statuscode = "U" if state is None else state.statuscode
+        ret.directory = job.workdir if state is None else state.directory
+        job.future.set_result(ret)
+
+    def _check_server(self, server_key: Tuple):
+        with self._condition:
+            server = self._servers.get(server_key)
+        if server is None:
+            return
+
+        jobs = self._server_jobs(server_key)
+        finished = []
+        try:
+            sq = snapshot(server=server, max_age=0)
+            finished = [job for job in jobs if sq.get_job(job.id) is None]
+            # get the final states of the finished jobs using a single call to sacct
+            if finished:
+                try:
+                    sq = snapshot(server=server, include_finished=True, max_age=0)
+                except Exception:
+                    pass
+        except Exception as exp:
+            log.warn(f"Could not check the slurm queue: {exp}")
+
+        for job in finished:
+            self._finish(job, sq.get_job(job.id, include_finished=True))
+
+        with self._condition:
+            remaining = [job.max_interval for (job_server_key, _), job in self._jobs.items() if job_server_key == server_key]
+            if not remaining:
+                return
+            max_interval = min(remaining)
+            if finished:
+                interval = min(self.min_interval, max_interval)
+            else:
+                interval = min(self._intervals[server_key] * self.backoff, max_interval)
+            self._intervals[server_key] = interval
+            self._next_checks[server_key] = time.time() + interval
+
+    def _check_workdirs(self):
+        # imported here to prevent circular imports, the results module depends on this module
+        from tcutility.results import read
+
+        with self._condition:
+            jobs = [job for job in self._jobs.values() if job.workdir]
+
+        for job in jobs:
+            mtime = _latest_mtime(job.workdir)
+            if mtime is None or mtime == job.mtime:
+                continue
+            job.mtime = mtime
+
+            # we only look at the files of the calculation, not at the slurm queue
+            status = read._quick_status(job.workdir, SlurmSnapshot())
+            if status.name not in ["SUCCESS", "SUCCESS(W)", "FAILED"]:
+                continue
+
+            state = Result()
+            state.status = status.name
+            state.statuscode = status.code
+            state.directory = job.workdir
+            self._finish(job, state)
+
+
+def _latest_mtime(directory: str) -> Union[float, None]:
+    """Get the latest modification time of a directory and the files in it. Returns None if the directory does not exist."""
+    try:
+        latest = os.stat(directory).st_mtime
+    except OSError:
         return None
 
-    workdir_index = sq.directory.index(workdir)
-    ret = Result()
-    for key, vals in sq.items():
-        ret[key] = vals[workdir_index]
+    for root, dirs, files in os.walk(directory):
+        for name in dirs + files:
+            try:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                pass
+    return latest
 
-    return ret
+
+_waiter = None
+_waiter_lock = threading.Lock()
 
 
-def wait_for_job(slurmid: int, check_every: int = 60, server: connect.Server = connect.Local()):
+def get_waiter() -> JobWaiter:
     """
-    Wait for a slurm job to finish. We check every `check_every` seconds if the slurm job id is still present in squeue.
+    Get the :class:`JobWaiter` shared by this process. Sharing a waiter makes sure that all jobs are checked using one call to squeue.
+    """
+    global _waiter
+    with _waiter_lock:
+        if _waiter is None:
+            _waiter = JobWaiter()
+        return _waiter
+
+
+def wait_for_job(slurmid: int, check_every: int = 60, server: connect.Server = connect.Local(), workdir: str = None) -> Result:
+    """
+    Wait for a slurm job to finish. The job is checked together with all other jobs that are being waited for, see :class:`JobWaiter`.
 
     Args:
         slurmid: the ID of the slurm job we are waiting for.
-        check_every: the amount of seconds to wait before checking squeue again.
+        check_every: the maximum amount of seconds to wait before checking squeue again.
             Don't put this too low, or you will anger the cluster people.
+        server: the server the job was submitted to.
+        workdir: the working directory of the job, which is watched for the calculation to finish if given.
+
+    Returns:
+        :Result object containing the final state of the job, see :meth:`JobWaiter.add`.
     """
-    while slurmid in squeue(server=server).id:
-        time.sleep(check_every)
+    return get_waiter().add(slurmid, server=server, workdir=workdir, max_interval=check_every).result()
 
 
 if __name__ == "__main__":
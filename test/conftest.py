@@ -0,0 +1,92 @@
+import copy
+import io
+import itertools
+import subprocess as sp
+
+import pytest
+
+from tcutility import connect, slurm
+
+
+class FakeClient:
+    """SSH client that runs its commands on the local machine."""
+
+    instances = []
+    home = "/tmp"
+
+    def __init__(self):
+        self.closed = False
+        self.exec_commands = []
+        FakeClient.instances.append(self)
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, *args, **kwargs):
+        pass
+
+    def exec_command(self, command):
+        self.exec_commands.append(command)
+        if command == "bash -s":
+            process = sp.Popen(["bash", "-s"], stdin=sp.PIPE, stdout=sp.PIPE, text=True)
+            return process.stdin, process.stdout, None
+        if command == "pwd":
+            return None, io.BytesIO(f"{self.home}\n".encode()), io.BytesIO()
+        process = sp.Popen(command, shell=True, stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.PIPE)
+        return process.stdin, process.stdout, process.stderr
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def ssh_client(monkeypatch):
+    """Replace the SSH client of paramiko by :class:`FakeClient`. The class is returned, so that tests can change the home directory or inspect the clients."""
+    paramiko = pytest.importorskip("paramiko")
+    monkeypatch.setattr(FakeClient, "instances", [])
+    monkeypatch.setattr(paramiko, "SSHClient", FakeClient)
+    return FakeClient
+
+
+class FakeSlurm(connect.Local):
+    """Local server that pretends to have slurm. Submitted jobs get increasing job ids, but are not run."""
+
+    def __init__(self, squeue_output: str = "", sacct_output: str = ""):
+        super().__init__()
+        self.squeue_output = squeue_output
+        self.sacct_output = sacct_output
+        self.commands = []
+        self._job_ids = itertools.count(100)
+
+    def clone(self) -> "FakeSlurm":
+        """Get a separate server object for the same cluster, like the server objects that every job creates for itself.
+        The clone shares the commands and job ids with this server."""
+        return copy.copy(self)
+
+    def calls(self, program: str) -> int:
+        """The number of commands that were run using the given program."""
+        return sum(command.startswith(program) for command in self.commands)
+
+    def execute(self, command: str) -> str:
+        self.commands.append(command)
+        if command.startswith("which sbatch"):
+            return ""
+        if command.startswith(f"echo {slurm._sbatch_marker}"):
+            # the outputs of the commands are separated by the markers written by slurm.sbatch_many
+            return "".join(f"{slurm._sbatch_marker} {i}\nSubmitted batch job {next(self._job_ids)}\n" for i in range(command.count("sbatch ")))
+        if command.startswith("sbatch"):
+            return f"Submitted batch job {next(self._job_ids)}\n"
+        if command.startswith("squeue"):
+            return self.squeue_output
+        if command.startswith("sacct"):
+            return self.sacct_output
+        return super().execute(command)
+
+
+@pytest.fixture
+def slurm_server():
+    # snapshots of the queue are reused between tests otherwise
+    slurm._snapshots.clear()
+    slurm._snapshot_locks.clear()
+    slurm._array_workdirs.clear()
+    return FakeSlurm()
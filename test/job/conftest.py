@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from tcutility.job.generic import Job
+
+
+class EchoJob(Job):
+    """Job that prints its name. It also appends its name to ``order.txt`` in the run directory, so that we can check the order in which jobs ran."""
+
+    def __init__(self, *args, skip: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.skip = skip
+
+    def _setup_job(self):
+        os.makedirs(self.workdir, exist_ok=True)
+        with open(self.runfile_path, "w") as runfile:
+            runfile.write(f"#!/bin/sh\necho {self.name}\necho {self.name} >> ../order.txt\n")
+        return True
+
+    def can_skip(self):
+        return self.skip
+
+
+@pytest.fixture
+def make_job(tmp_path):
+    """Make an :class:`EchoJob` in the temporary directory. The job uses slurm if a server is given."""
+
+    def make_job(name: str, server=None, **kwargs) -> EchoJob:
+        job = EchoJob(use_slurm=server is not None, **kwargs)
+        job.rundir = str(tmp_path)
+        job.name = name
+        if server is not None:
+            job.add_server(server)
+        return job
+
+    return make_job
+
+
+@pytest.fixture
+def make_jobs(make_job):
+    """Make ``n`` jobs called ``job0``, ``job1``, ..., see :func:`make_job`."""
+
+    def make_jobs(n: int, server=None, **kwargs) -> list:
+        return [make_job(f"job{i}", server, **kwargs) for i in range(n)]
+
+    return make_jobs
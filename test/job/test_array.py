@@ -0,0 +1,90 @@
+import os
+import subprocess as sp
+
+import pytest
+
+from tcutility import slurm
+from tcutility.job import array
+from tcutility.job.queue import JobQueue
+
+j = os.path.join
+
+
+@pytest.fixture
+def make_array_jobs(make_jobs):
+    def make_array_jobs(n, server):
+        jobs = make_jobs(n, server)
+        for job in jobs:
+            job.sbatch(p="tc")
+        return jobs
+
+    return make_array_jobs
+
+
+def test_group_compatible(make_array_jobs, slurm_server):
+    jobs = make_array_jobs(3, slurm_server)
+    jobs[2].sbatch(n=16)
+    assert array.group_compatible(jobs) == [jobs[:2], jobs[2:]]
+
+
+def test_group_compatible_separate_servers(make_array_jobs, slurm_server):
+    # every job normally has its own server object
+    jobs = make_array_jobs(5, slurm_server)
+    for job in jobs:
+        job.add_server(slurm_server.clone())
+    assert array.group_compatible(jobs) == [jobs]
+
+    array.JobArray(*jobs, name="test").run()
+    assert sum(command.startswith("sbatch") for command in slurm_server.commands) == 1
+
+
+def test_job_array(tmp_path, make_array_jobs, slurm_server):
+    jobs = make_array_jobs(3, slurm_server)
+    array.JobArray(*jobs, name="test").run()
+
+    # all jobs are submitted using a single sbatch call
+    assert sum(command.startswith("sbatch") for command in slurm_server.commands) == 1
+    assert any("--array=0-2" in command for command in slurm_server.commands)
+    assert [job.slurm_job_id for job in jobs] == ["100_0", "100_1", "100_2"]
+
+    # the runscript runs the job belonging to the task
+    sp.run(["bash", j(tmp_path, "test.array.run")], env={**os.environ, "SLURM_ARRAY_TASK_ID": "1"}, check=True)
+    with open(j(tmp_path, "job1", "job1.out")) as out:
+        assert out.read().strip() == "job1"
+    assert not os.path.exists(j(tmp_path, "job0", "job0.out"))
+
+
+def test_snapshot_array_workdirs(tmp_path, make_array_jobs, slurm_server):
+    slurm_server.squeue_output = f"100_1|R|RUNNING|{tmp_path}\n100_[2]|PD|PENDING|{tmp_path}\n"
+    jobs = make_array_jobs(3, slurm_server)
+    array.JobArray(*jobs, name="test").run()
+
+    sq = slurm.snapshot(server=slurm_server)
+    assert sq.get_workdir(jobs[1].workdir).id == "100_1"
+    assert sq.get_workdir(jobs[0].workdir) is None
+
+
+def test_snapshot_array_workdirs_home(tmp_path, slurm_server):
+    # on remote servers the working directories of jobs are relative to the home directory
+    slurm_server.squeue_output = f"100_1|R|RUNNING|{tmp_path}\n"
+    slurm_server.home = "/home/user"
+    with open(j(tmp_path, slurm._array_workdirs_file("100")), "w") as workdirs:
+        workdirs.write("~/calcs/job0\n~/calcs/job1\n")
+
+    sq = slurm.snapshot(server=slurm_server)
+    assert sq.get_workdir("/home/user/calcs/job1").id == "100_1"
+    assert slurm._expand_home("~/calcs/job1", slurm_server) == "/home/user/calcs/job1"
+
+
+def test_queue_arrays(make_array_jobs, slurm_server):
+    jobs = make_array_jobs(4, slurm_server)
+    with JobQueue(use_arrays=True, batch_size=3) as queue:
+        for job in jobs:
+            queue.add(job)
+
+    assert sum(command.startswith("sbatch") for command in slurm_server.commands) == 2
+    assert all(job.slurm_job_id is not None for job in jobs)
+
+
+if __name__ == "__main__":
+    pytest.main()
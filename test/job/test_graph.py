@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from tcutility.job.graph import JobGraph
+
+j = os.path.join
+
+
+@pytest.fixture
+def make_graph_job(make_job):
+    def make_graph_job(name, server=None, skip=False):
+        return make_job(name, server, wait_for_finish=False, skip=skip)
+
+    return make_graph_job
+
+
+def test_stages(make_graph_job):
+    graph = JobGraph()
+    frag1 = graph.add(make_graph_job("frag1"))
+    frag2 = graph.add(make_graph_job("frag2"))
+    complex_ = graph.add(make_graph_job("complex"), depends_on=[frag1, frag2])
+    extra = graph.add(make_graph_job("extra"), depends_on=[complex_])
+    assert graph.stages() == [[frag1, frag2], [complex_], [extra]]
+
+    graph.add(frag1, depends_on=[extra])
+    with pytest.raises(ValueError):
+        graph.stages()
+
+
+def test_run_locally(tmp_path, make_graph_job):
+    graph = JobGraph()
+    frag1 = make_graph_job("frag1")
+    frag2 = make_graph_job("frag2", skip=True)
+    # dependencies are added to the graph automatically
+    graph.add(make_graph_job("complex"), depends_on=[frag1, frag2])
+    plan = graph.run()
+
+    assert [step.skip for step in plan] == [False, True, False]
+    with open(j(tmp_path, "order.txt")) as order:
+        assert order.read().split() == ["frag1", "complex"]
+
+
+def test_run_slurm(make_graph_job, slurm_server):
+    graph = JobGraph()
+    frags = [graph.add(make_graph_job(f"frag{i}", slurm_server)) for i in range(3)]
+    complex_ = graph.add(make_graph_job("complex", slurm_server), depends_on=frags)
+    graph.run()
+
+    # each stage is submitted using a single call
+    submissions = [command for command in slurm_server.commands if "sbatch " in command]
+    assert len(submissions) == 2
+    assert [frag.slurm_job_id for frag in frags] == ["100", "101", "102"]
+    assert complex_.slurm_job_id == "103"
+    assert "--dependency=100,101,102" in submissions[1]
+
+
+def test_run_slurm_separate_servers(make_graph_job, slurm_server):
+    # every job normally has its own server object, jobs in a stage are still submitted together
+    graph = JobGraph()
+    frags = [graph.add(make_graph_job(f"frag{i}", slurm_server.clone())) for i in range(3)]
+    graph.add(make_graph_job("complex", slurm_server.clone()), depends_on=frags)
+    graph.run()
+
+    assert sum("sbatch " in command for command in slurm_server.commands) == 2
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from tcutility.job.queue import JobQueue
+
+j = os.path.join
+
+
+def test_queue_local(tmp_path, make_jobs):
+    with JobQueue(wait_for_finish=True) as queue:
+        futures = [queue.add(job) for job in make_jobs(3)]
+
+    for i, future in enumerate(futures):
+        assert future.done()
+        with open(j(tmp_path, f"job{i}", f"job{i}.out")) as out:
+            assert out.read().strip() == f"job{i}"
+
+
+def test_queue_slurm(tmp_path, make_jobs, slurm_server):
+    jobs = make_jobs(5, slurm_server)
+    with JobQueue(batch_size=3, check_every=0, wait_for_finish=True) as queue:
+        futures = [queue.add(job) for job in jobs]
+
+    # the jobs are submitted in two batches
+    assert sum("sbatch " in command for command in slurm_server.commands) == 2
+    assert sorted(job.slurm_job_id for job in jobs) == ["100", "101", "102", "103", "104"]
+    assert all(future.done() for future in futures)
+    assert os.path.exists(j(tmp_path, "job0", "submit.sh"))
+
+
+def test_queue_separate_servers(make_jobs, slurm_server):
+    # every job normally has its own server object, jobs on the same server are still submitted together
+    jobs = make_jobs(5, slurm_server)
+    for job in jobs:
+        job.add_server(slurm_server.clone())
+    with JobQueue(batch_size=5, check_every=0, wait_for_finish=True) as queue:
+        for job in jobs:
+            queue.add(job)
+
+    assert sum("sbatch " in command for command in slurm_server.commands) == 1
+    assert all(job.slurm_job_id is not None for job in jobs)
+
+
+def test_queue_error(make_jobs):
+    # the threads of the queue are also stopped when an error occurs in the with-block
+    with pytest.raises(ValueError):
+        with JobQueue() as queue:
+            queue.add(make_jobs(1)[0])
+            raise ValueError
+
+    with pytest.raises(RuntimeError):
+        queue.add(make_jobs(1)[0])
+
+
+if __name__ == "__main__":
+    pytest.main()
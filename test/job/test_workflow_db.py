@@ -0,0 +1,64 @@
+import concurrent.futures
+import os
+
+import pytest
+
+from tcutility.job import workflow_db
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(workflow_db, "DBPATH", str(tmp_path / "workflows.sqlite"))
+    monkeypatch.setattr(workflow_db, "CSV_DBPATH", str(tmp_path / "workflows.csv"))
+    return tmp_path
+
+
+def test_write_read():
+    workflow_db.write("abc", workflow_name="test", status="PENDING")
+    assert workflow_db.read("abc") == {"workflow_name": "test", "status": "PENDING"}
+    assert workflow_db.read("def") == {}
+    assert workflow_db.get_status("def") is None
+
+
+def test_update():
+    workflow_db.write("abc", workflow_name="test", status="PENDING")
+    workflow_db.update("abc", status="RUNNING", slurm_job_id=123)
+    assert workflow_db.read("abc") == {"workflow_name": "test", "status": "RUNNING", "slurm_job_id": "123"}
+    assert workflow_db.get_workflow_name("abc") == "test"
+
+
+def test_delete():
+    workflow_db.write("abc", status="SUCCESS")
+    workflow_db.write("def", status="FAILED")
+    workflow_db.delete("abc")
+    assert list(workflow_db.read_all()) == ["def"]
+
+
+def test_can_skip():
+    workflow_db.set_finished("abc")
+    workflow_db.set_running("def")
+    assert workflow_db.can_skip("abc")
+    # running workflows without a slurm job can be run again
+    assert not workflow_db.can_skip("def")
+
+
+def test_concurrent_updates():
+    workflow_db.write("abc")
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: workflow_db.update("abc", **{f"key{i}": i}), range(50)))
+    # none of the updates are lost
+    assert len(workflow_db.read("abc")) == 50
+
+
+def test_migrate_csv(database):
+    with open(database / "workflows.csv", "w") as csv:
+        csv.write("abc, workflow_name=test, status=PENDING\n")
+        csv.write("def, status=FAILED\n")
+        csv.write("abc, workflow_name=test, status=SUCCESS\n")
+
+    assert workflow_db.read_all() == {"abc": {"workflow_name": "test", "status": "SUCCESS"}, "def": {"status": "FAILED"}}
+    assert not os.path.exists(database / "workflows.csv")
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,107 @@
+import os
+import subprocess as sp
+
+import pytest
+
+from tcutility import connect
+
+paramiko = pytest.importorskip("paramiko")
+
+
+@pytest.fixture
+def shell():
+    process = sp.Popen(["bash", "-s"], stdin=sp.PIPE, stdout=sp.PIPE, text=True)
+    yield connect.Shell(process.stdin, process.stdout)
+    process.stdin.close()
+    process.wait()
+
+
+def test_shell(shell):
+    assert shell.run("echo output; echo error >&2; exit 3") == ("output\n", "error\n", 3)
+    # the shell is not affected by the previous command
+    assert shell.run("pwd", directory="/tmp") == ("/tmp\n", "", 0)
+    assert shell.run("printf 'no newline'")[0] == "no newline"
+
+
+def test_shell_many(shell):
+    outputs = shell.run_many([f"echo {i}" for i in range(200)])
+    assert [output[0] for output in outputs] == [f"{i}\n" for i in range(200)]
+
+
+def test_shell_large_output(shell):
+    outputs = shell.run_many(["head -c 200000 /dev/zero"] * 5)
+    assert all(len(output[0]) == 200000 for output in outputs)
+
+
+def test_shared_session(ssh_client):
+    with connect.Connection("user@server") as conn1:
+        with connect.Connection("user@server") as conn2:
+            assert conn1.client is conn2.client
+            assert conn2.execute_many(["echo a", "pwd"]) == ["a", "/tmp"]
+        assert not conn1.client.closed
+        assert conn1.execute("echo b") == "b"
+    assert len(ssh_client.instances) == 1
+    assert ssh_client.instances[0].closed
+    # only a single shell was opened for all commands
+    assert ssh_client.instances[0].exec_commands.count("bash -s") == 1
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "remote"
+    for calc in ["a", "b", "c/d"]:
+        os.makedirs(root / calc)
+        (root / calc / "adf.rkf").write_bytes(os.urandom(1000))
+        (root / calc / "ams.log").write_text(f"log of {calc}\n")
+        (root / calc / "t21.H").write_bytes(os.urandom(5000))
+    return root
+
+
+def files_in(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, filename), root) for dirpath, _, filenames in os.walk(root) for filename in filenames)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_download_tree(ssh_client, tree, tmp_path, compress):
+    local = tmp_path / "local"
+    with connect.Connection("user@server") as server:
+        ret = server.download_tree(str(tree), str(local), include=["adf.rkf", "ams.log"], compress=compress, workers=2)
+        assert len(ret.transferred) == 6
+        assert files_in(local) == [path for path in files_in(tree) if not path.endswith("t21.H")]
+        assert (local / "c" / "d" / "adf.rkf").read_bytes() == (tree / "c" / "d" / "adf.rkf").read_bytes()
+
+        # only changed files are downloaded again
+        assert server.download_tree(str(tree), str(local), include=["adf.rkf", "ams.log"]).skipped == 6
+        (tree / "b" / "ams.log").write_text("changed\n")
+        assert server.download_tree(str(tree), str(local), exclude=["t21.*"]).transferred == ["b/ams.log"]
+
+
+def test_download_tree_checksum(ssh_client, tree, tmp_path):
+    local = tmp_path / "local"
+    with connect.Connection("user@server") as server:
+        server.download_tree(str(tree), str(local))
+        # a file with the same size and modification time, but different contents
+        stat = os.stat(tree / "a" / "adf.rkf")
+        (tree / "a" / "adf.rkf").write_bytes(os.urandom(1000))
+        os.utime(tree / "a" / "adf.rkf", (stat.st_atime, stat.st_mtime))
+        assert server.download_tree(str(tree), str(local)).transferred == []
+        assert server.download_tree(str(tree), str(local), check="checksum").transferred == ["a/adf.rkf"]
+
+
+def test_upload_tree(ssh_client, tree, tmp_path):
+    remote = tmp_path / "uploaded"
+    with connect.Connection("user@server") as server:
+        assert len(server.upload_tree(str(tree), str(remote), compress=True).transferred) == 9
+        assert files_in(remote) == files_in(tree)
+        assert server.upload_tree(str(tree), str(remote)).skipped == 9
+
+
+def test_local_tree(tree, tmp_path):
+    server = connect.Local()
+    ret = server.download_tree(str(tree), str(tmp_path / "local"), include=["c/*"])
+    assert ret.transferred == ["c/d/adf.rkf", "c/d/ams.log", "c/d/t21.H"]
+    assert server.download_tree(str(tree), str(tmp_path / "local"), include=["c/*"]).skipped == 3
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -133,6 +133,37 @@ def test_transform_mol2():
     assert T(mol).atoms[1].coords == (0.0, 0.0, 0.38278869)
 
 
+def test_kabsch_rotmats():
+    X = np.random.rand(4, 10, 3)
+    Y = np.random.rand(4, 10, 3)
+    R = geometry.kabsch_rotmats(X, Y)
+    for i in range(4):
+        T = geometry.KabschTransform(X[i], Y[i])
+        assert np.isclose(R[i], T.get_rotmat()).all()
+        assert np.isclose(np.linalg.det(R[i]), 1)
+
+
+def test_rmsd_matrix():
+    X = np.random.rand(5, 8, 3)
+    Y = np.random.rand(3, 8, 3)
+    rmsd = geometry.RMSD_matrix(X, Y, chunk_size=4)
+    assert rmsd.shape == (5, 3)
+    expected = [[geometry.RMSD(x, y) for y in Y] for x in X]
+    assert np.isclose(rmsd, expected).all()
+
+    expected = [[geometry.RMSD(x, y, include_mirror=True) for y in Y] for x in X]
+    assert np.isclose(geometry.RMSD_matrix(X, Y, include_mirror=True), expected).all()
+
+
+def test_rmsd_matrix_self():
+    X = np.random.rand(6, 8, 3)
+    # a rotated and translated copy of the first structure
+    X[1] = geometry.rotate(X[0], x=1, y=2, z=3) + 1
+    rmsd = geometry.RMSD_matrix(X, workers=2, chunk_size=12)
+    assert np.isclose(rmsd, rmsd.T).all()
+    assert (np.diag(rmsd) == 0).all()
+    assert rmsd[0, 1] < 1e-5
+
 
 if __name__ == "__main__":
     import pytest
@@ -69,6 +69,17 @@ def test_get_subdirectories2(temp_dir):
     assert sorted(pathfunc.get_subdirectories(temp_dir, include_intermediates=True)) == sorted(expected)
 
 
+def test_get_subdirectories_max_depth(temp_dir):
+    expected = [f"{temp_dir}/subdir_a", f"{temp_dir}/subdir_b", f"{temp_dir}/subdir_c"]
+    assert sorted(pathfunc.get_subdirectories(temp_dir, max_depth=0)) == expected
+
+
+def test_iter_subdirectories(temp_dir):
+    for include_intermediates in [True, False]:
+        expected = pathfunc.get_subdirectories(temp_dir, include_intermediates=include_intermediates)
+        assert sorted(pathfunc.iter_subdirectories(temp_dir, include_intermediates=include_intermediates)) == sorted(expected)
+
+
 def test_match(temp_dir2):
     assert len(pathfunc.match(temp_dir2, "{system}/{functional}_{basis_set}")) == 5
 
@@ -81,6 +92,11 @@ def test_match2(temp_dir2):
     assert matches[f"{temp_dir2}/SN2/M06-2X_TZ2P"].basis_set == "TZ2P"
 
 
+def test_iter_match(temp_dir2):
+    matches = dict(pathfunc.iter_match(temp_dir2, "{system}/{functional}_{basis_set}"))
+    assert matches == pathfunc.match(temp_dir2, "{system}/{functional}_{basis_set}")
+
+
 def test_split_all():
     assert pathfunc.split_all("a/b/c") == ["a", "b", "c"]
 
@@ -0,0 +1,104 @@
+import glob
+import os
+
+import pytest
+
+from tcutility import pathfunc, pathindex
+from tcutility.results import scan
+
+j = os.path.join
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    """
+    This will create a directory structure like:
+
+    root
+    |- NH3-BH3
+    |   |- BLYP_QZ4P
+    |   |  |- adf.rkf
+    |   |- BLYP_TZ2P
+    |   |  |- another_dir
+    |- SN2
+    |   |- M06-2X_TZ2P
+    |- .hidden
+    """
+    monkeypatch.setattr(pathindex, "database_path", str(tmp_path / "directory_index.sqlite"))
+    monkeypatch.setattr(pathindex, "racy_interval", 0)
+    root = tmp_path / "root"
+    os.makedirs(root / "NH3-BH3" / "BLYP_QZ4P")
+    os.makedirs(root / "NH3-BH3" / "BLYP_TZ2P" / "another_dir")
+    os.makedirs(root / "SN2" / "M06-2X_TZ2P")
+    os.makedirs(root / ".hidden")
+    (root / "NH3-BH3" / "BLYP_QZ4P" / "adf.rkf").touch()
+    return str(root)
+
+
+def test_update(root):
+    index = pathindex.DirectoryIndex(root)
+    assert index.update().listed == 8
+
+    # only the changed directory and the new directory are listed again
+    os.makedirs(j(root, "SN2", "BLYP_TZ2P"))
+    res = index.update()
+    assert res.listed == 2
+    assert res.unchanged == 7
+    assert "SN2/BLYP_TZ2P" in index.directories
+
+
+def test_update_removed(root):
+    index = pathindex.DirectoryIndex(root)
+    index.update()
+    os.rmdir(j(root, "NH3-BH3", "BLYP_TZ2P", "another_dir"))
+    os.rmdir(j(root, "NH3-BH3", "BLYP_TZ2P"))
+    assert index.update().removed == 2
+    assert j(root, "NH3-BH3", "BLYP_TZ2P") not in index
+
+
+def test_persistent(root):
+    pathindex.DirectoryIndex(root).update()
+    # the index is loaded from the database, so nothing has to be listed again
+    index = pathindex.DirectoryIndex(root)
+    assert index.update().listed == 0
+    assert index.update().unchanged == 8
+
+
+def test_glob(root):
+    patterns = ["*", "*/*", "*/*/*", ".*", "NH3-BH3/*_*", "*/BLYP_QZ4P/adf.rkf"]
+    with pathindex.open(root) as index:
+        for pattern in patterns:
+            assert index.glob(j(root, pattern)) == glob.glob(j(root, pattern))
+
+
+def test_match(root):
+    expected = pathfunc.match(root, "{system}/{functional}_{basis_set}")
+    with pathindex.open(root):
+        assert pathfunc.match(root, "{system}/{functional}_{basis_set}") == expected
+
+
+def test_get_subdirectories(root):
+    expected = pathfunc.get_subdirectories(root, include_intermediates=True)
+    with pathindex.open(root):
+        assert pathfunc.get_subdirectories(root, include_intermediates=True) == expected
+
+
+def test_scan(root):
+    expected = scan.scan(root)
+    with pathindex.open(root):
+        assert scan.scan(root) == expected
+        assert scan.scan(j(root, "NH3-BH3")) == scan._scan(j(root, "NH3-BH3"))
+
+
+def test_open(root):
+    with pathindex.open(root) as index:
+        assert pathindex.get(j(root, "SN2")) is index
+        # opening the same directory twice returns the same index
+        with pathindex.open(root) as index2:
+            assert index2 is index
+        assert pathindex.get(root) is index
+    assert pathindex.get(root) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
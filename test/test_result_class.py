@@ -69,3 +69,88 @@ def test_contains_neg4():
     res = Result()
     res.a
     assert "a" not in res
+
+
+def test_pickle():
+    import pickle
+
+    res = Result()
+    res.a.b = 10
+    res.c = [1, 2]
+    res2 = pickle.loads(pickle.dumps(res))
+    assert isinstance(res2.a, Result) and res2.a.b == 10 and res2.c == [1, 2]
+
+
+def test_set_lazy():
+    calls = []
+    res = Result()
+    res.set_lazy("a", lambda: calls.append(1) or {"b": 10})
+    assert not res.is_loaded("a")
+    assert len(calls) == 0
+    assert res.a.b == 10
+    assert res.A.b == 10
+    assert res.is_loaded("a")
+    assert len(calls) == 1
+
+
+def test_set_lazy_access():
+    res = Result()
+    res.set_lazy("a", lambda: 10)
+    assert res.get("A") == 10
+
+    res.set_lazy("b", lambda: 20)
+    assert list(res.values()) == [10, 20]
+
+    res.set_lazy("c", lambda: 30)
+    assert dict(res.items()) == {"a": 10, "b": 20, "c": 30}
+    assert res.get("d", 40) == 40
+
+
+def test_set_lazy_copy():
+    calls = []
+    res = Result()
+    res.set_lazy("a", lambda: calls.append(1) or 10)
+
+    # copying lazy values into other Result objects does not load them
+    other = Result()
+    other.update(res)
+    other.b = res
+    assert not Result(res).is_loaded("a")
+    assert not other.is_loaded("a")
+    assert not other.b.is_loaded("a")
+    assert len(calls) == 0
+    assert other.a == 10
+
+
+def test_case_insensitive():
+    res = Result({"Energy": {"Bond": 10}})
+    assert res.energy.bond == 10
+    res.ENERGY.bond = 20
+    assert list(res.keys()) == ["Energy"]
+    assert res.Energy.Bond == 20
+
+
+def test_delete():
+    res = Result()
+    res.Energy = 10
+    del res["energy"]
+    assert "energy" not in res
+    res.energy = 20
+    assert list(res.keys()) == ["energy"]
+    assert res.pop("ENERGY") == 20
+    assert not res
+
+
+def test_keys_view():
+    res = Result()
+    keys = res.keys()
+    res.a = 10
+    res.b.c
+    assert list(keys) == ["a", "b"]
+    assert len(keys) == 2
+    assert dict(res.items())["a"] == 10
+
+
+def test_parent_tree():
+    res = Result()
+    assert res.a.b.get_parent_tree() == "Head.a.b"
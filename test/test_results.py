@@ -1,6 +1,12 @@
 import os
+import shutil
+import sqlite3
+import threading
 
-from tcutility.results.read import read
+import pytest
+
+from tcutility.results import result_cache, scan
+from tcutility.results.read import get_info, quick_status, quick_status_many, read, read_many
 from tcutility.results.result import Result
 
 j = os.path.join
@@ -57,6 +63,196 @@ def test_failed_reading3() -> None:
     assert res.status.fatal is True
 
 
+def test_read_many_thread() -> None:
+    calc_dirs = [j(os.path.split(__file__)[0], "fixtures", "DFT_EDA"), "not/a/real/calculation"]
+    res = dict(read_many(calc_dirs, workers=2, backend="thread"))
+    assert res[calc_dirs[0]].engine == "adf"
+    assert res[calc_dirs[1]].engine == "unknown"
+
+
+def test_read_many_process() -> None:
+    calc_dirs = [j(os.path.split(__file__)[0], "fixtures", "DFT_EDA"), j(os.path.split(__file__)[0], "fixtures", "level_of_theory", "M06_2X")]
+    res = dict(read_many(calc_dirs, workers=2, backend="process"))
+    assert res[calc_dirs[0]].level.summary == "OLYP/TZ2P"
+    assert res[calc_dirs[1]].level.summary == "M06-2X/QZ4P"
+
+
+def test_lazy_reading() -> None:
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    res = read(calc_dir, lazy=True)
+    assert not res.is_loaded("properties")
+    assert not res.is_loaded("history")
+    assert res.properties.energy.bond == read(calc_dir).properties.energy.bond
+    assert res.is_loaded("properties")
+    assert not res.is_loaded("history")
+
+
+def test_history_arrays() -> None:
+    res = read(j(os.path.split(__file__)[0], "fixtures", "irc_trajectories", "forward"))
+    nsteps = res.history.number_of_entries
+    natoms = res.molecule.number_of_atoms
+    assert res.history.arrays.coords.shape == (nsteps, natoms, 3)
+    assert res.history.arrays.gradients.shape == (nsteps, natoms, 3)
+    assert res.history.arrays.energy.tolist() == res.history.energy
+    assert len(res.history.molecule) == nsteps
+    assert res.history.molecule[-1][1].coords == tuple(res.history.arrays.coords[-1, 0])
+
+
+def test_history_guess_bonds() -> None:
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "irc_trajectories", "forward")
+    # bonds are not guessed by default, as that is slow for long trajectories
+    assert len(read(calc_dir).history.molecule[-1].bonds) == 0
+    assert len(read(calc_dir, guess_bonds=True).history.molecule[-1].bonds) > 0
+    assert len(read(calc_dir, lazy=True, guess_bonds=True).history.molecule[-1].bonds) > 0
+
+
+def test_persistent_cache(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(result_cache, "database_path", str(tmp_path / "results.sqlite"))
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    assert result_cache.get(calc_dir) is None
+
+    res = read(calc_dir, persistent_cache=True)
+    cached = result_cache.get(calc_dir)
+    assert cached is not None
+    assert cached.properties.energy.bond == res.properties.energy.bond
+    assert read(calc_dir, persistent_cache=True).level.summary == "OLYP/TZ2P"
+
+
+def test_persistent_cache_closes_connections(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(result_cache, "database_path", str(tmp_path / "results.sqlite"))
+    connections = []
+    connect = sqlite3.connect
+
+    def tracked_connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", tracked_connect)
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    read(calc_dir, persistent_cache=True)
+    result_cache.get(calc_dir)
+    result_cache.unload(calc_dir)
+
+    assert len(connections) == 3
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_persistent_cache_invalidated(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(result_cache, "database_path", str(tmp_path / "results.sqlite"))
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    res = read(calc_dir, persistent_cache=True)
+
+    # change the modification time of one of the calculation files
+    stat = os.stat(res.files.log)
+    os.utime(res.files.log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    try:
+        assert result_cache.get(calc_dir) is None
+    finally:
+        os.utime(res.files.log, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_persistent_cache_version(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(result_cache, "database_path", str(tmp_path / "results.sqlite"))
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    read(calc_dir, persistent_cache=True)
+    assert result_cache.get(calc_dir) is not None
+
+    # calculations stored using a different version are not returned
+    monkeypatch.setattr(result_cache, "_format_version", result_cache._format_version + 1)
+    assert result_cache.get(calc_dir) is None
+
+
+def test_persistent_cache_old_database(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(result_cache, "database_path", str(tmp_path / "results.sqlite"))
+    connection = sqlite3.connect(result_cache.database_path)
+    with connection:
+        connection.execute("CREATE TABLE results (path TEXT PRIMARY KEY, files TEXT, fingerprint TEXT, data BLOB)")
+    connection.close()
+
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    assert result_cache.get(calc_dir) is None
+    read(calc_dir, persistent_cache=True)
+    assert result_cache.get(calc_dir) is not None
+
+
+def test_scan_matches_walk() -> None:
+    calc_dir = os.path.abspath(j(os.path.split(__file__)[0], "fixtures", "solvated_EDA"))
+    assert scan.scan(calc_dir) == [(root, files) for root, _, files in os.walk(calc_dir)]
+
+
+def test_shared_scan() -> None:
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    with scan.shared_scan(calc_dir) as index:
+        assert scan.scan(calc_dir) is index
+    assert scan.scan(calc_dir) is not index
+
+
+def test_shared_scan_does_not_block_other_directories(monkeypatch) -> None:
+    fixtures = j(os.path.split(__file__)[0], "fixtures")
+    slow_dir = os.path.abspath(j(fixtures, "DFT_EDA"))
+    scanning = threading.Event()
+    release = threading.Event()
+    scanned = []
+    _scan = scan._scan
+
+    def slow_scan(calc_dir):
+        if calc_dir == slow_dir:
+            scanning.set()
+            release.wait(timeout=5)
+        index = _scan(calc_dir)
+        scanned.append(calc_dir)
+        return index
+
+    def share_slow_dir():
+        with scan.shared_scan(slow_dir):
+            pass
+
+    monkeypatch.setattr(scan, "_scan", slow_scan)
+    thread = threading.Thread(target=share_slow_dir)
+    thread.start()
+    scanning.wait(timeout=5)
+
+    # other directories can be scanned while the first directory is still being scanned
+    with scan.shared_scan(j(fixtures, "DFTB_EDA")) as index:
+        assert len(index) > 0
+    assert scanned == [os.path.abspath(j(fixtures, "DFTB_EDA"))]
+    release.set()
+    thread.join()
+
+
+def test_detect_engine(tmp_path) -> None:
+    fixtures = j(os.path.split(__file__)[0], "fixtures")
+    assert scan.detect_engine(scan.scan(j(fixtures, "DFT_EDA"))) == "ams"
+    assert scan.detect_engine(scan.scan(j(fixtures, "orca", "optimization"))) == "orca"
+
+    # this calculation only has an output file, it is read by trying every engine
+    shutil.copy(j(fixtures, "orca", "sp_freq", "run.out"), tmp_path)
+    assert scan.detect_engine(scan.scan(str(tmp_path))) is None
+    assert read(str(tmp_path)).engine == "orca"
+
+
+def test_quick_status() -> None:
+    fixtures = j(os.path.split(__file__)[0], "fixtures")
+    calc_dirs = [j(fixtures, name) for name in ["1", "2", "DFT_EDA", "DFTB_EDA", "xyz", j("orca", "optimization")]]
+    statuses = quick_status_many(calc_dirs)
+    for calc_dir in calc_dirs:
+        assert quick_status(calc_dir).name == get_info(calc_dir).status.name
+        assert statuses[calc_dir].name == quick_status(calc_dir).name
+
+
+def test_read_tail(tmp_path) -> None:
+    path = str(tmp_path / "test.out")
+    with open(path, "w") as file:
+        file.write("first line\nsecond line\nthird line\n")
+
+    assert scan.read_tail(path) == "first line\nsecond line\nthird line\n"
+    # incomplete lines at the start are skipped
+    assert scan.read_tail(path, size=15) == "third line\n"
+    assert scan.read_head(path, size=5) == "first"
+
+
 if __name__ == "__main__":
     import pytest
 
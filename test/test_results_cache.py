@@ -0,0 +1,158 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from scm import plams
+
+from tcutility.results import cache
+
+j = os.path.join
+
+rkf_dir = j(os.path.split(__file__)[0], "fixtures", "solvated_EDA", "ethane_gas.results")
+rkf_files = [j(rkf_dir, name) for name in ["adf.rkf", "ams.rkf", "left.rkf", "right.rkf"]]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(cache, "max_readers", 64)
+    monkeypatch.setattr(cache, "max_bytes", None)
+    cache.clear()
+    cache.reset_statistics()
+    yield
+    cache.clear()
+
+
+def test_get_hit_and_miss():
+    reader = cache.get(rkf_files[0])
+    assert cache.get(rkf_files[0]) is reader
+    stats = cache.statistics()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.readers == 1
+    assert stats.bytes == os.path.getsize(rkf_files[0])
+
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(cache, "max_readers", 2)
+    cache.get(rkf_files[0])
+    cache.get(rkf_files[1])
+    # using the first reader again makes the second reader the least recently used one
+    cache.get(rkf_files[0])
+    cache.get(rkf_files[2])
+    assert rkf_files[0] in cache._cache
+    assert rkf_files[1] not in cache._cache
+    assert cache.statistics().evictions == 1
+
+
+def test_max_bytes(monkeypatch):
+    monkeypatch.setattr(cache, "max_bytes", os.path.getsize(rkf_files[2]) + os.path.getsize(rkf_files[3]))
+    cache.get(rkf_files[2])
+    cache.get(rkf_files[3])
+    assert cache.statistics().readers == 2
+    cache.get(rkf_files[0])
+    assert cache.statistics().bytes <= cache.max_bytes
+
+
+def test_opened_is_not_evicted(monkeypatch):
+    monkeypatch.setattr(cache, "max_readers", 1)
+    with cache.opened(rkf_files[0]) as reader:
+        cache.get(rkf_files[1])
+        assert cache.get(rkf_files[0]) is reader
+    assert cache.statistics().readers == 1
+
+
+def test_unload_postponed_while_opened():
+    with cache.opened(rkf_files[0]) as reader:
+        with cache.opened(rkf_files[0]):
+            pass
+        cache.unload(reader)
+        assert cache.get(rkf_files[0]) is reader
+    assert rkf_files[0] not in cache._cache
+
+
+def test_unload_directory():
+    cache.get(rkf_files[0])
+    cache.get(j(os.path.split(__file__)[0], "fixtures", "solvated_EDA", "ethane.results", "adf.rkf"))
+    cache.unload_directory(rkf_dir)
+    assert cache.statistics().readers == 1
+
+
+def test_get_does_not_block_other_files(monkeypatch):
+    opening = threading.Event()
+    release = threading.Event()
+    opened = []
+
+    class SlowReader(cache.TrackKFReader):
+        def __init__(self, path):
+            if path == rkf_files[0]:
+                opening.set()
+                release.wait(timeout=5)
+            super().__init__(path)
+            opened.append(path)
+
+    monkeypatch.setitem(cache._backends, "plams", SlowReader)
+    thread = threading.Thread(target=cache.get, args=(rkf_files[0],))
+    thread.start()
+    opening.wait(timeout=5)
+
+    # other files can be opened while the first file is still being opened
+    cache.get(rkf_files[1])
+    assert opened == [rkf_files[1]]
+    release.set()
+    thread.join()
+    assert cache.statistics().readers == 2
+
+
+def test_get_backend():
+    reader = cache.get(rkf_files[0], backend="mmap")
+    assert isinstance(reader, cache.MmapKFReader)
+    assert cache.get(rkf_files[0], backend="mmap") is reader
+    # requesting another backend opens the file again
+    assert not isinstance(cache.get(rkf_files[0]), cache.MmapKFReader)
+    assert cache.statistics().misses == 2
+    with pytest.raises(ValueError):
+        cache.get(rkf_files[0], backend="unknown")
+
+
+def test_mmap_read_matches_plams():
+    reader = plams.KFReader(rkf_files[0])
+    reader_mmap = cache.MmapKFReader(rkf_files[0])
+    for section, variable in reader:
+        expected = reader.read(section, variable)
+        value = reader_mmap.read(section, variable)
+        assert type(value) is type(expected)
+        if isinstance(expected, str):
+            assert value == expected
+        else:
+            assert np.array_equal(value, expected, equal_nan=True)
+
+
+def test_mmap_read_array():
+    reader_mmap = cache.MmapKFReader(rkf_files[0])
+    coords = reader_mmap.read_array("Geometry", "xyz")
+    assert np.allclose(coords, plams.KFReader(rkf_files[0]).read("Geometry", "xyz"))
+    assert not coords.flags.writeable
+    assert ("Geometry", "xyz") in reader_mmap.tracker
+    with pytest.raises(TypeError):
+        reader_mmap.read_array("General", "title")
+
+
+@pytest.mark.parametrize("backend", ["plams", "mmap"])
+def test_read_many(backend):
+    reader = cache.get(rkf_files[0], backend=backend)
+    variables = [(section, variable) for section, variable in reader if section in ["Energy", "Properties", "General"]]
+    expected = [plams.KFReader(rkf_files[0]).read(section, variable) for section, variable in variables]
+    assert reader.read_many(variables) == expected
+
+
+@pytest.mark.parametrize("backend", ["plams", "mmap"])
+def test_read_many_default(backend):
+    reader = cache.get(rkf_files[0], backend=backend)
+    assert reader.read_many([("Energy", "Bond Energy"), ("Energy", "not present")], default=None)[1] is None
+    with pytest.raises(KeyError):
+        reader.read_many([("Energy", "Bond Energy"), ("Energy", "not present")])
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,7 +1,9 @@
 import os
+import shutil
 
 import tcutility.results.read as results
 from tcutility import constants
+from tcutility.results import orca, scan
 from tcutility.results.result import Result
 
 j = os.path.join
@@ -78,6 +80,47 @@ def test_spin_contam() -> None:
     assert round(res.properties.spin_contamination * 100, 2) == 1.25
 
 
+def test_parse_output() -> None:
+    out = j(os.path.split(__file__)[0], "fixtures", "orca", "sp_freq", "run.out")
+    output = orca.parse_output(out)
+    # the output is only parsed once
+    assert orca.parse_output(out) is output
+    assert output.terminated_normally
+    assert output.version == orca.get_version(Result(files={"out": out})).full
+
+
+def test_parse_lines_sections() -> None:
+    with open(j(os.path.split(__file__)[0], "fixtures", "orca", "sp_freq", "run.out")) as out:
+        lines = out.readlines()
+    vibrations = orca.get_vibrations(lines)
+    assert vibrations.frequencies[0] == -47.03
+    assert len(vibrations.modes) == len(vibrations.frequencies) == len(vibrations.intensities)
+
+
+def test_parse_lines_errors() -> None:
+    # the MP2 energy cannot be computed without the HF energy and the bond energy is not a number
+    lines = ["Program Version 5.0.4", "E(MP2) ... -0.5", "FINAL SINGLE POINT ENERGY    not-a-number", "ORCA TERMINATED NORMALLY"]
+    output = orca.parse_lines(lines)
+    assert output.version == "5.0.4"
+    assert output.terminated_normally
+    assert "bond" not in output.energy.keys()
+
+
+def test_quick_status_reads_output_only(tmp_path, monkeypatch) -> None:
+    calc_dir = str(tmp_path / "sp_freq")
+    shutil.copytree(j(os.path.split(__file__)[0], "fixtures", "orca", "sp_freq"), calc_dir)
+    with open(j(calc_dir, "run.gbw"), "wb") as gbw:
+        gbw.write(os.urandom(1000))
+
+    read_files = []
+    read_head = scan.read_head
+    monkeypatch.setattr(scan, "read_head", lambda path, *args: read_files.append(os.path.basename(path)) or read_head(path, *args))
+    assert orca.get_quick_status(calc_dir).name == "SUCCESS"
+    assert "run.gbw" not in read_files
+    # we stop reading files once the output file is found
+    assert read_files[-1] == "run.out"
+
+
 if __name__ == "__main__":
     import pytest
 
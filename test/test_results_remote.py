@@ -0,0 +1,53 @@
+import io
+import os
+import sys
+
+import pytest
+
+from tcutility import connect
+from tcutility.results import read, remote
+
+paramiko = pytest.importorskip("paramiko")
+
+j = os.path.join
+fixtures = j(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture
+def server(ssh_client, monkeypatch):
+    monkeypatch.setattr(ssh_client, "home", fixtures)
+    with connect.Connection("user@server") as server:
+        yield server
+
+
+def test_serve():
+    stream = io.StringIO()
+    remote._serve([j(fixtures, "ethane")], stream=stream)
+    calc_dir, res, error = remote._decode(stream.getvalue().split()[-1])
+    assert calc_dir == j(fixtures, "ethane")
+    assert error is None
+    assert res.status.name == read.read(j(fixtures, "ethane")).status.name
+
+
+def test_read_remote(server):
+    res = remote.read("ethane", server, python=sys.executable)
+    expected = read.read(j(fixtures, "ethane"))
+    assert res.engine == expected.engine
+    assert res.properties.energy.bond == expected.properties.energy.bond
+
+
+def test_read_many_remote(server):
+    calc_dirs = ["ethane", j("orca", "optimization")]
+    results = list(remote.read_many(calc_dirs, server, python=sys.executable))
+    # results are returned in order
+    assert [calc_dir for calc_dir, _ in results] == calc_dirs
+    assert all(res.status.name == "SUCCESS" for _, res in results)
+
+
+def test_read_remote_missing_python(server):
+    with pytest.raises(RuntimeError):
+        remote.read("ethane", server, python="not-a-python")
+
+
+if __name__ == "__main__":
+    pytest.main()
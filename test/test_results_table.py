@@ -0,0 +1,144 @@
+import os
+
+import numpy as np
+import pytest
+
+from tcutility.results import table
+from tcutility.results.result import Result
+
+j = os.path.join
+
+keys = ["name", "energy", "coords", "frequencies"]
+
+
+def make_results():
+    results = []
+    for i in range(5):
+        res = Result()
+        res.name = f"calc_{i}"
+        res.energy = -10.0 * i
+        res.coords = np.ones((i + 1, 3)) * i
+        res.frequencies = [100.0 * i, 200.0 * i]
+        results.append(res)
+
+    # results can have missing values
+    results.append(Result(name="missing"))
+    return results
+
+
+def test_iter_batches():
+    batches = list(table.iter_batches(make_results(), keys, batch_size=4))
+    assert len(batches) == 2
+    assert batches[0]["name"] == ["calc_0", "calc_1", "calc_2", "calc_3"]
+    assert batches[0]["coords"][2].shape == (3, 3)
+    assert batches[1]["energy"] == [-40.0, None]
+
+
+def test_iter_batches_does_not_change_results():
+    res = Result(name="test")
+    list(table.iter_batches([res], ["properties.energy.bond"]))
+    assert list(res.keys()) == ["name"]
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_write_arrow(tmp_path, extension):
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"results{extension}")
+    table.write(path, make_results(), keys, batch_size=2)
+
+    if extension == ".parquet":
+        data = pytest.importorskip("pyarrow.parquet").read_table(path)
+    else:
+        data = pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    assert data.num_rows == 6
+    assert data.column("energy").to_pylist()[-2:] == [-40.0, None]
+    assert data.column("coords").to_pylist()[1] == [[1.0, 1.0, 1.0], [1.0, 1.0, 1.0]]
+    assert data.column("frequencies").to_pylist()[-1] is None
+
+
+def test_write_hdf5(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    path = str(tmp_path / "results.h5")
+    table.write(path, make_results(), keys, batch_size=2)
+
+    with h5py.File(path) as file:
+        assert np.isnan(file["energy"][-1])
+        offsets = file["coords"]["offsets"][:]
+        assert offsets.tolist() == [0, 1, 3, 6, 10, 15, 15]
+        assert np.all(file["coords"]["values"][offsets[2] : offsets[3]] == 2)
+
+
+def make_nullable_results():
+    # the first batch is complete, so the types of the columns are fixed before the missing values are found
+    results = [Result(index=i, converged=i % 2 == 0, coords=np.ones((1, 3))) for i in range(4)]
+    results.append(Result(name="missing"))
+    results.append(Result(name="missing"))
+    return results
+
+
+def test_write_arrow_nullable(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / "results.feather")
+    table.write(path, make_nullable_results(), ["index", "converged", "coords"], batch_size=2)
+
+    data = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    assert data.schema.field("index").type == pa.int64()
+    assert data.column("index").to_pylist() == [0, 1, 2, 3, None, None]
+    assert data.column("converged").to_pylist() == [True, False, True, False, None, None]
+    assert data.column("coords").to_pylist()[-1] is None
+
+
+def test_write_hdf5_nullable(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    path = str(tmp_path / "results.h5")
+    table.write(path, make_nullable_results(), ["index", "converged", "coords"], batch_size=2)
+
+    with h5py.File(path) as file:
+        assert file["index"]["values"].dtype == np.int64
+        assert file["index"]["values"][:4].tolist() == [0, 1, 2, 3]
+        assert file["index"]["mask"][:].tolist() == [False] * 4 + [True] * 2
+        assert file["converged"]["values"][:4].tolist() == [True, False, True, False]
+        assert file["converged"]["mask"][:].tolist() == [False] * 4 + [True] * 2
+        assert file["coords"]["offsets"][:].tolist() == [0, 1, 2, 3, 4, 4, 4]
+
+
+def test_typed_batches_empty_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(table, "type_lookahead_rows", 4)
+    consumed = []
+
+    def batches():
+        for i in range(10):
+            consumed.append(i)
+            yield {"energy": [-10.0 * i, None], "misspelled": [None, None]}
+
+    # the empty column does not cause all batches to be merged
+    typed = table._typed_batches(batches())
+    assert len(next(typed)["misspelled"]) == 4
+    assert consumed == [0, 1]
+    assert len(list(typed)) == 8
+
+    h5py = pytest.importorskip("h5py")
+    path = str(tmp_path / "results.h5")
+    table.write_hdf5(path, batches())
+    with h5py.File(path) as file:
+        assert len(file["misspelled"]) == 20
+        assert np.isnan(file["misspelled"][:]).all()
+
+
+def test_to_dataframe():
+    pytest.importorskip("pandas")
+    df = table.to_dataframe(make_results(), keys)
+    assert list(df.columns) == keys
+    assert df["frequencies"][1].tolist() == [100.0, 200.0]
+
+
+def test_read_directories():
+    calc_dir = j(os.path.split(__file__)[0], "fixtures", "DFT_EDA")
+    batch = next(table.iter_batches([calc_dir], ["engine", "molecule.output"]))
+    assert batch["engine"] == ["adf"]
+    assert batch["molecule.output"][0].shape == (8, 3)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from scm import plams
+
+from tcutility.results import trim
+from tcutility.results.read import read
+
+j = os.path.join
+
+fixtures = j(os.path.split(__file__)[0], "fixtures")
+
+
+def test_trim_file_all_variables(tmp_path):
+    path = j(fixtures, "ethane_adf", "adf.rkf")
+    reader = plams.KFReader(path)
+    res = trim.trim_file(path, j(tmp_path, "adf.rkf"), list(reader))
+    trimmed = plams.KFReader(j(tmp_path, "adf.rkf"))
+    assert sorted(trimmed) == sorted(reader)
+    assert trimmed.read("Energy", "Bond Energy") == reader.read("Energy", "Bond Energy")
+    assert res.trimmed_size <= res.original_size
+
+
+def test_trim_file_removes_variables(tmp_path):
+    path = j(fixtures, "ethane_adf", "adf.rkf")
+    trim.trim_file(path, j(tmp_path, "adf.rkf"), [("Energy", "Bond Energy"), ("Geometry", "xyz")])
+    trimmed = plams.KFReader(j(tmp_path, "adf.rkf"))
+    assert sorted(trimmed) == [("Energy", "Bond Energy"), ("Geometry", "xyz")]
+    assert trimmed.read("Geometry", "xyz") == plams.KFReader(path).read("Geometry", "xyz")
+    with pytest.raises(KeyError):
+        trimmed.read("Energy", "Pauli Total")
+
+
+def test_trim_directory(tmp_path):
+    calc_dir = j(fixtures, "ethane_adf")
+    log = trim.collect_accessed_variables([calc_dir])
+    assert ("Energy", "Bond Energy") in log["adf.rkf"]
+    res = trim.trim_directory(calc_dir, j(tmp_path, "ethane_adf"), log)
+    assert res.trimmed_size < res.original_size / 10
+
+    original = read(calc_dir)
+    trimmed = read(j(tmp_path, "ethane_adf"))
+    assert trimmed.properties.energy.bond == original.properties.energy.bond
+    assert trimmed.properties.vibrations.frequencies == original.properties.vibrations.frequencies
+    assert trimmed.level.summary == original.level.summary
+
+
+def test_trim_directory_unlogged_rkf(tmp_path):
+    calc_dir = j(fixtures, "solvated_EDA", "ethane_gas.results")
+    log = {"adf.rkf": {("Energy", "Bond Energy")}}
+    res = trim.trim_directory(calc_dir, j(tmp_path, "ethane_gas.results"), log)
+    assert [os.path.basename(path) for path in res.files] == ["adf.rkf"]
+
+    for name in ["ams.rkf", "left.rkf", "right.rkf"]:
+        original = plams.KFReader(j(calc_dir, name))
+        copied = plams.KFReader(j(tmp_path, "ethane_gas.results", name))
+        assert sorted(copied) == sorted(original)
+        assert len(list(copied)) > 0
+
+
+def test_access_log(tmp_path):
+    log = {"ams.rkf": {("History", trim.generalize("Coords(12)")), ("General", "engine")}}
+    trim.save_access_log(log, j(tmp_path, "log.json"))
+    assert trim.load_access_log(j(tmp_path, "log.json")) == log
+    assert ("History", "Coords(*)") in log["ams.rkf"]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from tcutility import slurm
+
+squeue_output = """\
+1001|R|RUNNING|/home/user/calcs/a
+1002|PD|PENDING|/home/user/calcs/b
+1003|PD|PENDING|/home/user/calcs/with space
+"""
+
+sacct_output = """\
+990|COMPLETED|/home/user/calcs/c
+991|CANCELLED by 1234|/home/user/calcs/d
+992|FAILED|/home/user/calcs/d
+"""
+
+
+@pytest.fixture
+def server(slurm_server):
+    slurm_server.squeue_output = squeue_output
+    slurm_server.sacct_output = sacct_output
+    return slurm_server
+
+
+def test_snapshot(server):
+    sq = slurm.snapshot(server=server)
+    assert sq.get_job("1001").directory == "/home/user/calcs/a"
+    assert sq.get_job(1002).statuscode == "PD"
+    assert sq.get_workdir("/home/user/calcs/with space/").id == "1003"
+    assert sq.get_workdir("/home/user/calcs/c") is None
+
+
+def test_snapshot_reused(server):
+    slurm.snapshot(server=server)
+    slurm.workdir_info("/home/user/calcs/a", server=server)
+    slurm.squeue(server=server)
+    assert server.calls("squeue") == 1
+
+    slurm.snapshot(server=server, max_age=0)
+    assert server.calls("squeue") == 2
+
+
+def test_snapshot_shared_between_server_objects(server):
+    # jobs create their own server objects, they should still share the snapshots
+    slurm.snapshot(server=server)
+    other = type(server)(squeue_output=squeue_output)
+    assert slurm.snapshot(server=other).get_job("1001") is not None
+    assert slurm.snapshot(server=server.clone()).get_job("1001") is not None
+    assert server.calls("squeue") == 1
+    assert other.calls("squeue") == 0
+    assert len(slurm._snapshots) == len(slurm._snapshot_locks) == 1
+
+
+def test_snapshot_does_not_block_other_servers(server):
+    querying = threading.Event()
+    release = threading.Event()
+
+    class SlowSlurm(type(server)):
+        def execute(self, command: str) -> str:
+            if command.startswith("squeue"):
+                querying.set()
+                release.wait(timeout=5)
+            return super().execute(command)
+
+    slow_server = SlowSlurm(squeue_output=squeue_output)
+    thread = threading.Thread(target=slurm.snapshot, kwargs={"server": slow_server, "max_age": 0})
+    thread.start()
+    querying.wait(timeout=5)
+
+    # other servers can be queried while the first query is still running
+    assert slurm.snapshot(server=server, max_age=0).get_job("1001") is not None
+    assert slow_server.calls("squeue") == 0
+    release.set()
+    thread.join()
+    assert slow_server.calls("squeue") == 1
+
+
+def test_snapshot_finished(server):
+    sq = slurm.snapshot(server=server, include_finished=True)
+    assert sq.get_job("990") is None
+    assert sq.get_job("990", include_finished=True).statuscode == "CD"
+    # the last job in a directory is used
+    assert sq.get_workdir("/home/user/calcs/d", include_finished=True).status == "FAILED"
+    assert sq.get_job("991", include_finished=True).statuscode == "CA"
+
+
+def test_squeue(server):
+    sq = slurm.squeue(server=server)
+    assert sq.id == ["1001", "1002", "1003"]
+    assert sq.directory[2] == "/home/user/calcs/with space"
+
+
+def test_workdir_info(server):
+    assert slurm.workdir_info("/home/user/calcs/a", server=server).statuscode == "R"
+    assert slurm.workdir_info("/home/user/calcs/e", server=server) is None
+
+
+def test_waiter(server):
+    waiter = slurm.JobWaiter(min_interval=0.01, max_interval=0.05)
+    running = waiter.add("1001", server=server)
+    finished = waiter.add("990", server=server)
+    assert finished.result(timeout=5).statuscode == "CD"
+    assert not running.done()
+
+    # the job is finished once it is removed from the queue
+    server.squeue_output = ""
+    assert running.result(timeout=5).id == "1001"
+    assert len(waiter) == 0
+
+
+def test_waiter_backoff(server):
+    waiter = slurm.JobWaiter(min_interval=0.01, max_interval=0.04, backoff=2)
+    future = waiter.add("1001", server=server)
+    while server.calls("squeue") < 5:
+        time.sleep(0.01)
+    assert waiter._intervals[slurm._server_key(server)] == 0.04
+    server.squeue_output = ""
+    future.result(timeout=5)
+
+
+def test_waiter_separate_servers(server):
+    # every job normally has its own server object, all jobs on a server are still checked using a single squeue call
+    waiter = slurm.JobWaiter(min_interval=60)
+    futures = [waiter.add(job_id, server=server.clone()) for job_id in ["1001", "1002", "1003"]]
+    assert len(waiter._next_checks) == 1
+
+    waiter._check_server(slurm._server_key(server))
+    assert server.calls("squeue") == 1
+    assert not any(future.done() for future in futures)
+
+
+def test_waiter_workdir(server, tmp_path):
+    waiter = slurm.JobWaiter(min_interval=60, watch_interval=0.01)
+    workdir = str(tmp_path / "ethane")
+    future = waiter.add("1001", server=server, workdir=workdir)
+    # the calculation finishes while the job is still in the queue
+    shutil.copytree(os.path.join(os.path.dirname(__file__), "fixtures", "ethane"), workdir)
+    assert future.result(timeout=5).status == "SUCCESS"
+    assert server.calls("squeue") == 0
+
+
+if __name__ == "__main__":
+    pytest.main()